@@ -1,21 +1,132 @@
-from typing import List
+from typing import AsyncIterator, List, Literal, Optional, Sequence
 
-from fastapi import Depends, APIRouter
+from fastapi import Depends, APIRouter, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from sqlalchemy import Row
 
-from schemas.account import AccountSchema
-from services.account import AccountService
-from utils.helpers import get_account_service
+from config.settings import settings
+from schemas.account import AccountSchema, AccountTreeSchema
+from services.account import AsyncAccountService
+from services.hierarchy import AsyncHierarchyService
+from utils.cache import CachedResponse, account_cache
+from utils.helpers import get_async_account_service, get_async_hierarchy_service
 
 router = APIRouter(prefix='/accounts', tags=['Accounts'])
 
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "json": "application/json"}
+CACHE_CONTROL = f"private, max-age={settings.ACCOUNTS_CACHE_MAX_AGE_SECONDS}, must-revalidate"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weakly compare an If-None-Match header against the current ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def _dump_accounts(accounts: Sequence[Row]) -> bytes:
+    """Serialize account rows as a JSON array straight from their columns, without validating them again"""
+    return to_json([account._asdict() for account in accounts])
+
+
+async def _ndjson_lines(accounts: AsyncIterator[Row]) -> AsyncIterator[bytes]:
+    """Serialize account rows as one JSON document per line"""
+    async for account in accounts:
+        yield to_json(account._asdict()) + b"\n"
+
+
+async def _json_array_chunks(accounts: AsyncIterator[Row]) -> AsyncIterator[bytes]:
+    """Serialize account rows as a single JSON array, one element per chunk"""
+    separator = b"["
+    async for account in accounts:
+        yield separator + to_json(account._asdict())
+        separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
 
 @router.get("", response_model=List[AccountSchema])
 async def get_accounts(
+    request: Request,
     name_prefix: str = None,
     from_api: str = None,
-    account_service: AccountService = Depends(get_account_service),
+    q: str = None,
+    fuzzy: bool = False,
+    after: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.ACCOUNTS_MAX_PAGE_SIZE),
+    stream: Optional[Literal["ndjson", "json"]] = None,
+    account_service: AsyncAccountService = Depends(get_async_account_service),
     response_model=List[AccountSchema]
 ):
-    """Get accounts with optional name prefix filter"""
-    accounts = account_service.get_accounts_with_sync(name_prefix, from_api)
-    return accounts
+    """Get accounts with optional name prefix filter, or substring/fuzzy name search with q.
+
+    Pages are ordered by id: pass limit, then the Link header's after cursor for the next page.
+    stream=ndjson or stream=json sends rows as they are read from a server-side cursor.
+    The ETag only changes when a sync writes accounts, so If-None-Match is answered from sync_logs.
+    Serialized pages are cached in process until a sync of their realm commits.
+    Rows are selected as plain columns and serialized directly, skipping ORM objects and schema validation.
+    """
+    await account_service.sync_if_requested(from_api)
+    if_none_match = request.headers.get("If-None-Match")
+
+    use_cache = settings.ACCOUNT_CACHE_ENABLED and not stream
+    cache_key = (account_service.realm_id, name_prefix, q, fuzzy, after, limit)
+    cached = account_cache.get(cache_key) if use_cache else None
+    if cached:
+        if _etag_matches(if_none_match, cached.headers["ETag"]):
+            return Response(status_code=304, headers=cached.headers)
+        return Response(cached.body, media_type="application/json", headers={**cached.headers, "X-Cache": "HIT"})
+
+    # Read the generation first, so a sync committing mid-read keeps this response out of the cache
+    generation = account_cache.generation
+    etag = await account_service.accounts_etag()
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    if stream:
+        accounts = account_service.stream_accounts(name_prefix, q=q, fuzzy=fuzzy, after=after, limit=limit)
+        serialize = _ndjson_lines if stream == "ndjson" else _json_array_chunks
+        return StreamingResponse(serialize(accounts), media_type=STREAM_MEDIA_TYPES[stream], headers=headers)
+
+    accounts = await account_service.get_accounts(name_prefix, q=q, fuzzy=fuzzy, after=after, limit=limit)
+    if limit is not None and len(accounts) == limit and not (q and fuzzy):
+        next_url = request.url.include_query_params(after=accounts[-1].id)
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    body = _dump_accounts(accounts)
+    if use_cache:
+        account_cache.set(cache_key, CachedResponse(body, headers), generation)
+    return Response(body, media_type="application/json", headers={**headers, "X-Cache": "MISS"})
+
+
+@router.get("/cache")
+async def get_account_cache_stats():
+    """Get hit, miss and eviction counters of the account response cache"""
+    return account_cache.stats()
+
+
+@router.get("/tree", response_model=List[AccountTreeSchema])
+async def get_account_tree(hierarchy_service: AsyncHierarchyService = Depends(get_async_hierarchy_service)):
+    """Get all accounts nested under their parents, with balances rolled up into total_balance"""
+    return await hierarchy_service.get_tree()
+
+
+@router.get("/{qbo_id}/subtree", response_model=AccountTreeSchema)
+async def get_account_subtree(
+    qbo_id: str,
+    hierarchy_service: AsyncHierarchyService = Depends(get_async_hierarchy_service)
+):
+    """Get an account with its descendants nested below it, with rolled-up balances"""
+    return await hierarchy_service.get_subtree(qbo_id)
+
+
+@router.get("/{qbo_id}/ancestors", response_model=List[AccountSchema])
+async def get_account_ancestors(
+    qbo_id: str,
+    hierarchy_service: AsyncHierarchyService = Depends(get_async_hierarchy_service)
+):
+    """Get the ancestors of an account, from the root down to its parent"""
+    return await hierarchy_service.get_ancestors(qbo_id)
@@ -0,0 +1,61 @@
+from typing import Literal, Optional
+
+from fastapi import Depends, APIRouter, Header, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from config.settings import settings
+from services.entities import ENTITY_DESCRIPTORS
+from services.orchestrator import SyncOrchestrator
+from utils.helpers import get_sync_orchestrator
+from utils.profiling import profile_store, token_matches
+
+
+def require_profiling(x_profile: Optional[str] = Header(None)):
+    """Hide profiling unless it is enabled, and require the profiling token"""
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(404, "Not Found")
+    if not token_matches(x_profile):
+        raise HTTPException(403, "Invalid profiling token")
+
+
+router = APIRouter(prefix='/profiles', tags=['Profiling'], dependencies=[Depends(require_profiling)])
+
+
+@router.get("")
+def list_profiles():
+    """List stored profiles, newest first"""
+    return profile_store.list()
+
+
+@router.post("/sync")
+def profile_sync(
+    realm_id: str,
+    entity_type: str = "account",
+    orchestrator: SyncOrchestrator = Depends(get_sync_orchestrator)
+):
+    """Run one sync of an entity of a realm under cProfile and store the profile"""
+    if entity_type not in ENTITY_DESCRIPTORS:
+        raise HTTPException(400, f"Unknown entity type {entity_type}")
+    # Defined without async, so the whole sync runs on this threadpool thread where the profiler is
+    with profile_store.capture(f"sync-{entity_type}-{realm_id}") as capture:
+        if capture is None:
+            raise HTTPException(409, "Another profile is being captured")
+        synced = orchestrator.sync_entity(realm_id, entity_type)
+    return {"profile_id": capture.profile_id, "synced": synced}
+
+
+# Defined without async, so reading the profile directory and pstats reports stays off the event loop
+@router.get("/{profile_id}")
+def get_profile(
+    profile_id: str,
+    format: Literal["prof", "text"] = "prof",
+    sort: Literal["cumulative", "tottime", "calls"] = "cumulative",
+    limit: int = Query(50, ge=1, le=1000)
+):
+    """Download a profile as a pstats dump (for snakeviz or pstats), or as a text report of its top functions"""
+    path = profile_store.path(profile_id)
+    if not path:
+        raise HTTPException(404, f"Profile {profile_id} not found")
+    if format == "text":
+        return PlainTextResponse(profile_store.report(profile_id, sort, limit))
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
@@ -0,0 +1,29 @@
+from typing import Optional
+
+from fastapi import Depends, APIRouter, Header, HTTPException, Request
+from pydantic import ValidationError
+
+from schemas.webhook import WebhookPayloadSchema
+from services.webhook import AsyncWebhookService, verify_signature
+from utils.helpers import get_async_webhook_service
+
+router = APIRouter(prefix='/webhooks', tags=['Webhooks'])
+
+
+@router.post("/quickbooks")
+async def quickbooks_webhook(
+    request: Request,
+    intuit_signature: Optional[str] = Header(None),
+    webhook_service: AsyncWebhookService = Depends(get_async_webhook_service)
+):
+    """Verify a QuickBooks change notification and queue the changed accounts for the batcher"""
+    body = await request.body()
+    if not verify_signature(body, intuit_signature):
+        raise HTTPException(401, "Invalid webhook signature")
+    try:
+        payload = WebhookPayloadSchema.model_validate_json(body)
+    except ValidationError:
+        raise HTTPException(400, "Invalid webhook payload")
+
+    # Acknowledge straight away; Intuit retries notifications that are not answered quickly
+    return {"queued": await webhook_service.enqueue(payload)}
@@ -0,0 +1,222 @@
+import json
+import random
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+# Top-level accounts of a chart of accounts, by classification
+CLASSIFICATIONS = {
+    "Asset": ["Bank", "Accounts Receivable", "Other Current Asset", "Fixed Asset"],
+    "Liability": ["Accounts Payable", "Credit Card", "Other Current Liability", "Long Term Liability"],
+    "Equity": ["Equity"],
+    "Revenue": ["Income", "Other Income"],
+    "Expense": ["Expense", "Other Expense", "Cost of Goods Sold"],
+}
+# Chance of a new account sitting at depth 2, 3, 4 and 5; roots are depth 1
+DEPTH_WEIGHTS = (0.5, 0.3, 0.15, 0.05)
+
+QUERY_PATTERN = re.compile(r"SELECT \* FROM (?P<entity>\w+)(?P<clauses>.*)", re.IGNORECASE | re.DOTALL)
+SINCE_PATTERN = re.compile(r"LastUpdatedTime >= '(?P<since>[^']+)'")
+IDS_PATTERN = re.compile(r"Id IN \((?P<ids>[^)]*)\)")
+POSITION_PATTERN = re.compile(r"STARTPOSITION (?P<position>\d+)")
+MAX_RESULTS_PATTERN = re.compile(r"MAXRESULTS (?P<max_results>\d+)")
+
+
+def _timestamp(value: datetime) -> str:
+    return value.isoformat(timespec="seconds")
+
+
+class FakeChartOfAccounts:
+    """Synthetic QuickBooks accounts of one company: a chart of accounts nested up to five levels.
+
+    Every account's parent has a lower Id, as in QuickBooks, where parents are created first.
+    """
+
+    def __init__(self, count: int, seed: int = 0):
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.accounts: Dict[str, Dict[str, Any]] = {}
+        # Deleted accounts, reported by CDC with only their Id and the time of deletion
+        self.deleted: Dict[str, datetime] = {}
+        self._updated_at: Dict[str, datetime] = {}
+        created_at = datetime.now(timezone.utc) - timedelta(days=7)
+        classifications: Dict[str, str] = {}
+        # Accounts by depth, to pick parents from; most accounts sit two or three levels deep
+        by_depth: List[List[str]] = [[] for _ in DEPTH_WEIGHTS]
+        roots = [
+            (classification, account_type) for classification, types in CLASSIFICATIONS.items() for account_type in types
+        ]
+        for number in range(1, count + 1):
+            qbo_id = str(number)
+            if number <= len(roots):
+                parent_id = None
+                classification, account_type = roots[number - 1]
+                depth = 1
+            else:
+                depth = self._random.choices(range(2, len(DEPTH_WEIGHTS) + 2), DEPTH_WEIGHTS)[0]
+                while not by_depth[depth - 2]:
+                    depth -= 1
+                # Recent accounts are likelier parents, so branches grow together like real charts
+                candidates = by_depth[depth - 2][-500:]
+                parent_id = candidates[int(self._random.triangular(0, len(candidates), len(candidates))) % len(candidates)]
+                classification = classifications[parent_id]
+                account_type = self.accounts[parent_id]["AccountType"]
+            if depth <= len(DEPTH_WEIGHTS):
+                by_depth[depth - 1].append(qbo_id)
+            classifications[qbo_id] = classification
+            # Spread creation over the week, in Id order
+            updated_at = created_at + timedelta(seconds=number * 5)
+            self.accounts[qbo_id] = self._account(qbo_id, classification, account_type, parent_id, updated_at)
+
+    def _account(
+        self,
+        qbo_id: str,
+        classification: str,
+        account_type: str,
+        parent_id: Optional[str],
+        updated_at: datetime
+    ) -> Dict[str, Any]:
+        account = {
+            "Id": qbo_id,
+            "Name": f"{account_type} {qbo_id}",
+            "Classification": classification,
+            "AccountType": account_type,
+            "CurrencyRef": {"value": "USD", "name": "United States Dollar"},
+            "Active": True,
+            "CurrentBalance": round(self._random.uniform(-50000, 50000), 2),
+            "SubAccount": parent_id is not None,
+            "MetaData": {"CreateTime": _timestamp(updated_at), "LastUpdatedTime": _timestamp(updated_at)},
+        }
+        if parent_id:
+            account["ParentRef"] = {"value": parent_id}
+        self._updated_at[qbo_id] = updated_at
+        return account
+
+    def touch(self, count: int, deleted_share: float = 0.1) -> Dict[str, int]:
+        """Change the balances of count random accounts and delete a share of them, as bookkeeping would"""
+        with self._lock:
+            now = datetime.now(timezone.utc)
+            # Leaf accounts only are deleted, as QuickBooks refuses to delete parents
+            parents = {account["ParentRef"]["value"] for account in self.accounts.values() if "ParentRef" in account}
+            chosen = self._random.sample(sorted(self.accounts, key=int), min(count, len(self.accounts)))
+            deleted = 0
+            for qbo_id in chosen:
+                if qbo_id not in parents and self._random.random() < deleted_share:
+                    del self.accounts[qbo_id]
+                    del self._updated_at[qbo_id]
+                    self.deleted[qbo_id] = now
+                    deleted += 1
+                    continue
+                account = self.accounts[qbo_id]
+                account["CurrentBalance"] = round(account["CurrentBalance"] + self._random.uniform(-500, 500), 2)
+                account["MetaData"] = {**account["MetaData"], "LastUpdatedTime": _timestamp(now)}
+                self._updated_at[qbo_id] = now
+            return {"updated": len(chosen) - deleted, "deleted": deleted}
+
+    def query(self, query: str) -> List[Dict[str, Any]]:
+        """Answer a QuickBooks query over the accounts, honouring its filters and paging"""
+        match = QUERY_PATTERN.match(query.strip())
+        if not match or match.group("entity") != "Account":
+            return []
+        clauses = match.group("clauses")
+        with self._lock:
+            # Accounts are created, and so kept, in Id order
+            accounts = list(self.accounts.values())
+            since = SINCE_PATTERN.search(clauses)
+            if since:
+                since_at = datetime.fromisoformat(since.group("since"))
+                accounts = [account for account in accounts if self._updated_at[account["Id"]] >= since_at]
+            ids = IDS_PATTERN.search(clauses)
+            if ids:
+                wanted = {qbo_id.strip(" '") for qbo_id in ids.group("ids").split(",")}
+                accounts = [account for account in accounts if account["Id"] in wanted]
+        position = POSITION_PATTERN.search(clauses)
+        start = int(position.group("position")) - 1 if position else 0
+        max_results = MAX_RESULTS_PATTERN.search(clauses)
+        end = start + (int(max_results.group("max_results")) if max_results else 100)
+        return accounts[start:end]
+
+    def changes(self, since: datetime) -> List[Dict[str, Any]]:
+        """Accounts changed or deleted since, as the CDC endpoint reports them"""
+        with self._lock:
+            changed = [account for qbo_id, account in self.accounts.items() if self._updated_at[qbo_id] >= since]
+            deleted = [
+                {"Id": qbo_id, "status": "Deleted", "MetaData": {"LastUpdatedTime": _timestamp(deleted_at)}}
+                for qbo_id, deleted_at in self.deleted.items() if deleted_at >= since
+            ]
+        return changed + deleted
+
+
+class FakeQboServer:
+    """Local HTTP stand-in for the QuickBooks company API, serving one FakeChartOfAccounts to every realm"""
+
+    def __init__(self, chart: FakeChartOfAccounts, host: str = "127.0.0.1", port: int = 0):
+        self.chart = chart
+        self.requests = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-qbo", daemon=True)
+
+    @property
+    def api_base(self) -> str:
+        """Value for API_BASE that points the app at this server"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v3"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _respond(self, status: int, payload: Dict[str, Any]):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                server.requests += 1
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                query = self.rfile.read(length).decode()
+                if not url.path.endswith("/query"):
+                    self._respond(404, {"Fault": {"Error": [{"code": "404"}]}})
+                    return
+                accounts = server.chart.query(query)
+                self._respond(200, {"QueryResponse": {"Account": accounts, "maxResults": len(accounts)}})
+
+            def do_GET(self):
+                server.requests += 1
+                url = urlparse(self.path)
+                params = parse_qs(url.query)
+                if not url.path.endswith("/cdc") or "Account" not in params.get("entities", [""])[0].split(","):
+                    self._respond(404, {"Fault": {"Error": [{"code": "404"}]}})
+                    return
+                since = datetime.fromisoformat(params["changedSince"][0])
+                changes = server.chart.changes(since)
+                self._respond(200, {
+                    "CDCResponse": [{"QueryResponse": [{"Account": changes}]}],
+                    "time": _timestamp(datetime.now(timezone.utc))
+                })
+
+        return Handler
+
+    def start(self) -> "FakeQboServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+__all__ = ['FakeChartOfAccounts', 'FakeQboServer']
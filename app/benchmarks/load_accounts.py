@@ -0,0 +1,312 @@
+"""Load test GET /accounts at several table sizes, with and without name_prefix and while syncs run.
+
+Run from the app directory, with Postgres reachable through the DB_* settings:
+
+    python -m benchmarks.load_accounts --serve --sizes 1000 10000 100000 --output load-accounts.json
+    python -m benchmarks.load_accounts --serve --sizes 10000 --baseline load-accounts.json
+
+The table is seeded by syncing a synthetic chart of accounts from the local QuickBooks stand-in
+into the benchmark database. --serve runs the app against that database with uvicorn; without
+it, --url must point at an app already using it. With --with-sync every scenario runs a second
+time while another process keeps syncing changes into the table. With --baseline, scenarios
+whose throughput fell, or whose p99 latency grew, by more than --tolerance are reported and the
+exit status is 1.
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import httpx
+from sqlalchemy.engine import make_url
+
+from benchmarks.fake_qbo import FakeChartOfAccounts, FakeQboServer
+from benchmarks.sync import REALM_ID, default_database_url, prepare_database, reset_realm, run_sync
+
+SCENARIOS = ("plain", "name_prefix")
+
+
+def percentile(values: List[float], share: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return 0.0
+    return values[min(len(values), max(1, math.ceil(share * len(values)))) - 1]
+
+
+async def generate_load(
+    base_url: str,
+    next_params: Callable[[], Dict[str, Any]],
+    concurrency: int,
+    duration: float,
+    warmup: float
+) -> Dict[str, Any]:
+    """Send requests from concurrency clients for warmup + duration seconds, measuring those after the warmup"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        loop = asyncio.get_running_loop()
+        measure_from = loop.time() + warmup
+        stop_at = measure_from + duration
+
+        async def worker():
+            while loop.time() < stop_at:
+                started = loop.time()
+                try:
+                    response = await client.get("/accounts", params=next_params())
+                    await response.aread()
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                if started >= measure_from:
+                    latencies.append(loop.time() - started)
+                    statuses[status] = statuses.get(status, 0) + 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": dict(sorted(statuses.items())),
+        "rps": round(len(latencies) / duration, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "mean": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        },
+    }
+
+
+def request_params(chart: FakeChartOfAccounts, scenario: str, limit: int, seed: int) -> Callable[[], Dict[str, Any]]:
+    """Query parameters of the scenario's requests: one fixed listing, or name prefixes drawn from the chart"""
+    params = {"realm_id": REALM_ID, **({"limit": limit} if limit else {})}
+    if scenario == "plain":
+        return lambda: params
+    choose = random.Random(seed)
+    # An account type and the first digits of an Id, such as "Bank 12", each matching a slice of the chart
+    names = [account["Name"] for account in chart.accounts.values()]
+    prefixes = sorted({name[:name.rindex(" ") + 3] for name in choose.sample(names, min(200, len(names)))})
+    return lambda: {**params, "name_prefix": choose.choice(prefixes)}
+
+
+def sync_continuously(database_url: str, size: int, seed: int, changed_share: float, stop, completed):
+    """Keep changing the chart upstream and fully syncing it until stop is set; runs in its own process"""
+    chart = FakeChartOfAccounts(size, seed=seed)
+    server = FakeQboServer(chart).start()
+    try:
+        while not stop.is_set():
+            chart.touch(max(1, int(size * changed_share)))
+            run_sync(database_url, server.api_base, full=True, use_copy=True, verbose=False)
+            with completed.get_lock():
+                completed.value += 1
+    finally:
+        server.stop()
+
+
+@contextmanager
+def background_syncs(database_url: str, size: int, seed: int, changed_share: float) -> Iterator[Any]:
+    """Run full syncs of the benchmark realm back to back in another process for the duration of the block"""
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    completed = context.Value("i", 0)
+    process = context.Process(
+        target=sync_continuously, args=(database_url, size, seed, changed_share, stop, completed), daemon=True
+    )
+    process.start()
+    try:
+        yield completed
+    finally:
+        stop.set()
+        process.join(timeout=300)
+
+
+@contextmanager
+def serve_app(database_url: str, port: int, workers: int, cache: bool) -> Iterator[str]:
+    """Run the app with uvicorn against the benchmark database, without its background jobs"""
+    url = make_url(database_url)
+    env = {
+        **os.environ,
+        "DB_USER": url.username or "",
+        "DB_PASSWORD": url.password or "",
+        "DB_HOST": url.host or "",
+        "DB_PORT": str(url.port or 5432),
+        "DB_NAME": url.database or "",
+        "SYNC_SCHEDULER_ENABLED": "false",
+        "WEBHOOK_BATCHER_ENABLED": "false",
+        "ACCOUNT_CACHE_ENABLED": "true" if cache else "false",
+    }
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log"
+        ],
+        env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                if httpx.get(f"{base_url}/health").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("The app did not start")
+            time.sleep(0.2)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def seed_realm(database_url: str, size: int, seed: int) -> FakeChartOfAccounts:
+    """Fill the benchmark realm with size accounts by syncing them from the stand-in"""
+    chart = FakeChartOfAccounts(size, seed=seed)
+    server = FakeQboServer(chart).start()
+    try:
+        reset_realm(database_url)
+        run_sync(database_url, server.api_base, full=True, use_copy=True, verbose=False)
+    finally:
+        server.stop()
+    return chart
+
+
+def run_load_tests(args: argparse.Namespace, base_url: str) -> List[Dict[str, Any]]:
+    """Seed each size and run every scenario against it, also during syncs when asked"""
+    results = []
+    for size in args.sizes:
+        chart = seed_realm(args.database_url, size, args.seed)
+        for during_sync in (False, True) if args.with_sync else (False,):
+            for scenario in args.scenarios:
+                next_params = request_params(chart, scenario, args.limit, args.seed)
+                if during_sync:
+                    with background_syncs(args.database_url, size, args.seed, args.changed_share) as completed:
+                        load = asyncio.run(generate_load(
+                            base_url, next_params, args.concurrency, args.duration, args.warmup
+                        ))
+                        syncs = completed.value
+                else:
+                    load = asyncio.run(generate_load(
+                        base_url, next_params, args.concurrency, args.duration, args.warmup
+                    ))
+                    syncs = 0
+                result = {
+                    "accounts": size,
+                    "scenario": scenario,
+                    "during_sync": during_sync,
+                    "syncs_completed": syncs,
+                    **load,
+                }
+                print(
+                    f"{size} accounts, {scenario}{' during sync' if during_sync else ''}: {load['rps']} rps, "
+                    f"p50 {load['latency_ms']['p50']} ms, p95 {load['latency_ms']['p95']} ms, "
+                    f"p99 {load['latency_ms']['p99']} ms, {load['errors']} errors",
+                    file=sys.stderr
+                )
+                results.append(result)
+    return results
+
+
+def find_regressions(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float
+) -> List[str]:
+    """Describe scenarios whose throughput fell or whose p99 latency grew by more than tolerance"""
+    previous = {
+        (result["accounts"], result["scenario"], result["during_sync"]): result for result in baseline["results"]
+    }
+    regressions = []
+    for result in results["results"]:
+        key = (result["accounts"], result["scenario"], result["during_sync"])
+        before = previous.get(key)
+        if not before:
+            continue
+        name = f"{result['accounts']} accounts, {result['scenario']}{' during sync' if result['during_sync'] else ''}"
+        if result["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {before['rps']} -> {result['rps']} rps")
+        if result["latency_ms"]["p99"] > before["latency_ms"]["p99"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {before['latency_ms']['p99']} -> {result['latency_ms']['p99']} ms")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test GET /accounts")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30, help="seconds measured per scenario")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of load before measuring")
+    parser.add_argument("--limit", type=int, default=100, help="page size requested, 0 for whole listings")
+    parser.add_argument("--with-sync", action="store_true", help="also run every scenario while syncs run")
+    parser.add_argument("--changed-share", type=float, default=0.005,
+                        help="share of accounts changed upstream before each background sync")
+    parser.add_argument("--database-url", default=default_database_url())
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="app to load, unless --serve")
+    parser.add_argument("--serve", action="store_true", help="run the app on the benchmark database")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--no-cache", action="store_true", help="serve with the account response cache off")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    prepare_database(args.database_url)
+    if args.serve:
+        with serve_app(args.database_url, args.port, args.workers, cache=not args.no_cache) as base_url:
+            results = run_load_tests(args, base_url)
+    else:
+        results = run_load_tests(args, args.url)
+
+    report = {
+        "generated_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "url": None if args.serve else args.url,
+            "workers": args.workers if args.serve else None,
+            "cache": not args.no_cache if args.serve else None,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "limit": args.limit,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = find_regressions(report, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""Benchmark account syncs against a local QuickBooks stand-in.
+
+Run from the app directory, with Postgres reachable through the DB_* settings:
+
+    python -m benchmarks.sync --sizes 1000 10000 100000 --output sync-benchmark.json
+    python -m benchmarks.sync --sizes 10000 --baseline sync-benchmark.json
+
+Each scenario syncs in a freshly spawned process, so its peak RSS is its own, and the results
+are written as JSON. With --baseline, scenarios that took more than --tolerance longer than before
+are reported and the exit status is 1.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy_utils import create_database, database_exists
+
+from benchmarks.fake_qbo import FakeChartOfAccounts, FakeQboServer
+from config.settings import settings
+from database import Base
+from models.auth import Token
+from services.account import AccountService
+from services.auth import AuthService
+from utils.http import get_http_client
+from utils.logger import logger
+from utils.metrics import sync_phase_duration, sync_rows
+from utils.rate_limit import qbo_rate_limiter
+
+REALM_ID = "benchmark"
+MODES = ("full", "full-upsert", "incremental")
+PHASES = ("fetch", "validate", "diff", "write", "commit")
+ROW_OPERATIONS = ("fetched", "inserted", "updated", "unchanged", "deleted")
+
+
+def default_database_url() -> str:
+    """URL of a dedicated benchmark database on the configured server, never the app's own"""
+    return (
+        f"postgresql://{settings.DB_USER}:{settings.DB_PASSWORD}@"
+        f"{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}_benchmark"
+    )
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def prepare_database(database_url: str):
+    """Create the benchmark database and its tables, and a long-lived token for the benchmark realm"""
+    if not database_exists(database_url):
+        create_database(database_url)
+    engine = create_engine(database_url)
+    try:
+        Base.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(Token.__table__.delete().where(Token.realm_id == REALM_ID))
+            connection.execute(Token.__table__.insert().values(
+                realm_id=REALM_ID,
+                access_token="benchmark",
+                refresh_token="benchmark",
+                expires_at=datetime.utcnow() + timedelta(days=365)
+            ))
+    finally:
+        engine.dispose()
+
+
+def reset_realm(database_url: str):
+    """Forget everything synced for the benchmark realm, so the next sync is a first one"""
+    engine = create_engine(database_url)
+    try:
+        with engine.begin() as connection:
+            # The parent foreign key is checked once the statement has removed children and parents alike
+            connection.execute(text("DELETE FROM accounts WHERE realm_id = :realm_id"), {"realm_id": REALM_ID})
+            connection.execute(text("DELETE FROM sync_logs WHERE realm_id = :realm_id"), {"realm_id": REALM_ID})
+    finally:
+        engine.dispose()
+
+
+def run_sync(database_url: str, api_base: str, full: bool, use_copy: bool, verbose: bool) -> Dict[str, Any]:
+    """Run one account sync of the benchmark realm and measure it; runs in its own process"""
+    settings.API_BASE = api_base
+    settings.FULL_SYNC_USE_COPY = use_copy
+    if not verbose:
+        logger.setLevel(logging.WARNING)
+    # The stand-in does not throttle, so neither should the client
+    qbo_rate_limiter.requests_per_minute = 1e9
+    qbo_rate_limiter.burst = 1e6
+
+    engine = create_engine(database_url)
+    queries = Counter()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_query(connection, cursor, statement, parameters, context, executemany):
+        queries[statement.lstrip().split(None, 1)[0].upper()] += 1
+
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        http_client = get_http_client()
+        service = AccountService(db, AuthService(db, http_client), http_client, REALM_ID)
+        baseline_rss_mb = _peak_rss_mb()
+        started = time.perf_counter()
+        service.sync(full=full)
+        seconds = time.perf_counter() - started
+    finally:
+        db.close()
+        engine.dispose()
+
+    rows = {operation: int(sync_rows.value(entity="account", operation=operation)) for operation in ROW_OPERATIONS}
+    return {
+        "seconds": round(seconds, 3),
+        "rows": rows,
+        "rows_per_second": round(rows["fetched"] / seconds, 1) if seconds else None,
+        "phases": {
+            phase: round(sync_phase_duration.total(entity="account", phase=phase), 3) for phase in PHASES
+        },
+        # COPY goes through the raw DBAPI cursor and is not counted
+        "queries": {"total": sum(queries.values()), **dict(sorted(queries.items()))},
+        "baseline_rss_mb": baseline_rss_mb,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run_scenario(
+    server: FakeQboServer,
+    database_url: str,
+    size: int,
+    mode: str,
+    verbose: bool
+) -> Dict[str, Any]:
+    """Run one mode at one size in a fresh process and record what the stand-in served"""
+    server.requests = 0
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        result = executor.submit(
+            run_sync, database_url, server.api_base, mode == "full", mode != "full-upsert", verbose
+        ).result()
+    return {"accounts": size, "mode": mode, "qbo_requests": server.requests, **result}
+
+
+def run_benchmark(
+    sizes: List[int],
+    modes: List[str],
+    database_url: str,
+    changed_share: float,
+    seed: int,
+    verbose: bool = False
+) -> Dict[str, Any]:
+    """Run every mode at every size and collect the results"""
+    prepare_database(database_url)
+    results = []
+    for size in sizes:
+        chart = FakeChartOfAccounts(size, seed=seed)
+        server = FakeQboServer(chart).start()
+        try:
+            reset_realm(database_url)
+            for mode in modes:
+                if mode == "incremental":
+                    if not results or results[-1]["accounts"] != size:
+                        # Incremental syncs need a first sync to build on
+                        results.append(run_scenario(server, database_url, size, "full", verbose))
+                    changes = chart.touch(max(1, int(size * changed_share)))
+                else:
+                    reset_realm(database_url)
+                    changes = None
+                result = run_scenario(server, database_url, size, mode, verbose)
+                if changes:
+                    result["changes"] = changes
+                print(
+                    f"{size} accounts, {mode}: {result['seconds']}s, {result['rows_per_second']} rows/s, "
+                    f"peak RSS {result['peak_rss_mb']} MB, {result['queries']['total']} queries",
+                    file=sys.stderr
+                )
+                results.append(result)
+        finally:
+            server.stop()
+    return {
+        "generated_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "qbo_page_size": settings.QBO_PAGE_SIZE,
+            "upsert_batch_size": settings.UPSERT_BATCH_SIZE,
+            "sync_use_cdc": settings.SYNC_USE_CDC,
+            "changed_share": changed_share,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def find_regressions(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float
+) -> List[str]:
+    """Describe scenarios that got slower than the baseline by more than tolerance"""
+    previous = {(result["accounts"], result["mode"]): result for result in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        before = previous.get((result["accounts"], result["mode"]))
+        if not before or not before["seconds"]:
+            continue
+        if result["seconds"] > before["seconds"] * (1 + tolerance):
+            regressions.append(
+                f"{result['accounts']} accounts, {result['mode']}: {before['seconds']}s -> {result['seconds']}s"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark account syncs against a local QuickBooks stand-in")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--changed-share", type=float, default=0.005,
+                        help="share of accounts changed upstream before an incremental sync")
+    parser.add_argument("--database-url", default=default_database_url())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="slowdown over the baseline reported as a regression")
+    parser.add_argument("--verbose", action="store_true", help="keep the sync's own logging")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.sizes, args.modes, args.database_url, args.changed_share, args.seed, args.verbose)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = find_regressions(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
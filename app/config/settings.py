@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic_settings import BaseSettings
 
 
@@ -13,13 +15,75 @@ class Settings(BaseSettings):
     AUTH_BASE: str = "https://appcenter.intuit.com/connect/oauth2"
     TOKEN_URL: str = "https://oauth.platform.intuit.com/oauth2/v1/tokens/bearer"
     API_BASE: str = "https://sandbox-quickbooks.api.intuit.com/v3"
+
+    # Sync settings
+    QBO_PAGE_SIZE: int = 1000  # QuickBooks caps MAXRESULTS at 1000
+    UPSERT_BATCH_SIZE: int = 500
+    FULL_SYNC_USE_COPY: bool = True
+    # Incremental syncs read the /cdc endpoint, which also reports deletions
+    SYNC_USE_CDC: bool = True
+    QBO_CDC_MAX_RESULTS: int = 1000  # QuickBooks truncates CDC responses at 1000 objects
+    QBO_CDC_MAX_LOOKBACK_DAYS: int = 30
+    # Incremental syncs refetch this much before the watermark, to absorb clock skew and late commits
+    SYNC_WATERMARK_OVERLAP_SECONDS: int = 300
+    # QuickBooks allows 500 requests per minute and 10 concurrent requests per realm and app.
+    # A full bucket adds up to the burst to any minute, so the rate leaves that much headroom.
+    QBO_REQUESTS_PER_MINUTE: float = 490
+    QBO_REQUEST_BURST: int = 10
+    QBO_MAX_CONCURRENT_REQUESTS: int = 10
+    QBO_MAX_RETRIES: int = 5
+    QBO_RETRY_BASE_DELAY_SECONDS: float = 1
+    QBO_RETRY_MAX_DELAY_SECONDS: float = 60
+    # Retries one sync may spend across all of its requests before giving up
+    QBO_SYNC_RETRY_BUDGET: int = 20
+    SYNC_SCHEDULER_ENABLED: bool = True
+    SYNC_INTERVAL_SECONDS: float = 3600
+    SYNC_JITTER_SECONDS: float = 60
+    # Each realm sync holds up to two DB connections, so keep this within the DB pool
+    SYNC_MAX_WORKERS: int = 4
+    SYNC_ENTITY_TYPES: List[str] = ["account", "customer", "vendor", "item", "invoice"]
+
+    # Webhook settings
+    QBO_WEBHOOK_VERIFIER_TOKEN: str = ""
+    WEBHOOK_BATCHER_ENABLED: bool = True
+    WEBHOOK_BATCH_INTERVAL_SECONDS: float = 2
+    WEBHOOK_BATCH_SIZE: int = 500
+    # Failed changes are retried one at a time, up to this many per realm and round, and set aside after
+    # WEBHOOK_MAX_ATTEMPTS failures so one bad account cannot hold up the rest of the queue
+    WEBHOOK_RETRIES_PER_BATCH: int = 10
+    WEBHOOK_MAX_ATTEMPTS: int = 5
+
+    # Account listing settings
+    ACCOUNTS_MAX_PAGE_SIZE: int = 1000
+    ACCOUNT_STREAM_BATCH_SIZE: int = 500
+    # Clients may reuse a listing this long before revalidating it with If-None-Match
+    ACCOUNTS_CACHE_MAX_AGE_SECONDS: int = 0
+    ACCOUNT_CACHE_ENABLED: bool = True
+    ACCOUNT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    ACCOUNT_CACHE_TTL_SECONDS: float = 300
+
+    # HTTP client settings
+    HTTP_TIMEOUT_SECONDS: float = 30
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 60
     
+    # Profiling settings: requests carrying PROFILING_TOKEN in X-Profile are profiled, and
+    # /profiles serves the results. Off by default; nothing is installed on the request path then.
+    PROFILING_ENABLED: bool = False
+    PROFILING_TOKEN: str = ""
+    PROFILE_DIR: str = "/tmp/nominal-profiles"
+    PROFILE_MAX_FILES: int = 50
+
     # Database settings
     DB_USER: str = "postgres"
     DB_PASSWORD: str = "postgres"
     DB_HOST: str = "pgdb"
     DB_PORT: int = 5432
     DB_NAME: str = "postgres"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
     
     class Config:
         env_file = ".env"
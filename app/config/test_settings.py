@@ -9,3 +9,4 @@ class TestSettings(Settings):
     DB_PORT: int = 5432
 
     TEST_DB_URL: str = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    TEST_ASYNC_DB_URL: str = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
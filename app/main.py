@@ -1,16 +1,54 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from api.auth import router as auth_router
 from api.account import router as account_router
-from database import Base, engine
+from api.webhook import router as webhook_router
+from api.profiles import router as profiles_router
+from config.settings import settings
+from database import Base, engine, async_engine, SQLALCHEMY_DATABASE_URL
+from services.scheduler import SyncScheduler
+from services.webhook import WebhookBatcher
+from utils.cache import CacheInvalidationListener
+from utils.http import get_http_client, close_http_client, get_async_http_client, close_async_http_client
+from utils.metrics import PROMETHEUS_CONTENT_TYPE, RequestMetricsMiddleware, registry
+from utils.profiling import ProfilingMiddleware
 
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="QuickBooks Integration API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared HTTP clients and run the background sync scheduler for the lifetime of the app"""
+    get_http_client()
+    get_async_http_client()
+    scheduler = SyncScheduler()
+    if settings.SYNC_SCHEDULER_ENABLED:
+        scheduler.start()
+    # Syncs committed by other workers invalidate this worker's cached account listings
+    cache_listener = CacheInvalidationListener(SQLALCHEMY_DATABASE_URL)
+    if settings.ACCOUNT_CACHE_ENABLED:
+        cache_listener.start()
+    webhook_batcher = WebhookBatcher()
+    if settings.WEBHOOK_BATCHER_ENABLED:
+        webhook_batcher.start()
+    yield
+    await webhook_batcher.stop()
+    await cache_listener.stop()
+    await scheduler.stop()
+    close_http_client()
+    await close_async_http_client()
+    await async_engine.dispose()
+
+
+app = FastAPI(title="QuickBooks Integration API", lifespan=lifespan)
 
 app.include_router(account_router)
 app.include_router(auth_router)
+app.include_router(webhook_router)
+app.include_router(profiles_router)
 
 
 app.add_middleware(
@@ -20,9 +58,20 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.PROFILING_ENABLED:
+    # Added only when enabled, so requests pay nothing for profiling otherwise
+    app.add_middleware(ProfilingMiddleware)
+# Outermost, so the time other middleware takes is counted too
+app.add_middleware(RequestMetricsMiddleware)
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Metrics of this worker process in the Prometheus text format"""
+    return Response(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,4 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey
+from sqlalchemy import (
+    Column, Integer, String, Float, Boolean, DateTime, ForeignKeyConstraint, UniqueConstraint,
+    DDL, Index, event, func
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -6,15 +10,53 @@ from database import Base
 
 class Account(Base):
     __tablename__ = "accounts"
+    __table_args__ = (
+        UniqueConstraint('realm_id', 'qbo_id', name='uq_accounts_realm_id_qbo_id'),
+        ForeignKeyConstraint(
+            ['realm_id', 'parent_id'],
+            ['accounts.realm_id', 'accounts.qbo_id'],
+            name='fk_accounts_parent',
+            # Checked at commit, so a sync may write a child before the parent it was moved under
+            deferrable=True,
+            initially='DEFERRED'
+        ),
+    )
     
     id = Column(Integer, primary_key=True)
-    qbo_id = Column(String, unique=True, nullable=False)
+    realm_id = Column(String, nullable=False)
+    qbo_id = Column(String, nullable=False)
     name = Column(String, nullable=False)
     classification = Column(String)
     currency_ref = Column(String)
     account_type = Column(String)
     active = Column(Boolean, default=True)
     current_balance = Column(Float)
-    parent_id = Column(String, ForeignKey('accounts.qbo_id'), nullable=True)
+    parent_id = Column(String, nullable=True)
+    deleted_at = Column(DateTime, nullable=True)
+    # Hash of the synced fields, so syncs can skip rows QuickBooks returned unchanged
+    content_hash = Column(String(32), nullable=True)
+    # Materialized path: qbo_ids from the root account down to this one, rebuilt after each sync
+    path = Column(ARRAY(String), nullable=True)
 
-    children = relationship("Account", backref="parent", remote_side=[qbo_id])
+    children = relationship("Account", backref="parent", remote_side=[realm_id, qbo_id])
+
+
+# lower(name) with text_pattern_ops serves case-insensitive prefix searches via LIKE 'abc%'
+Index(
+    'ix_accounts_name_lower_pattern',
+    func.lower(Account.name).label('name_lower'),
+    postgresql_ops={'name_lower': 'text_pattern_ops'}
+)
+# Trigram index serves substring (ILIKE '%abc%') and similarity searches
+Index(
+    'ix_accounts_name_trgm',
+    Account.name,
+    postgresql_using='gin',
+    postgresql_ops={'name': 'gin_trgm_ops'}
+)
+# Serves the parent-to-children walk that rebuilds paths
+Index('ix_accounts_realm_id_parent_id', Account.realm_id, Account.parent_id)
+# Serves subtree lookups (path @> ARRAY[qbo_id]) in a single index scan
+Index('ix_accounts_path', Account.path, postgresql_using='gin')
+
+event.listen(Account.__table__, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
@@ -10,7 +10,7 @@ class Token(Base):
     id = Column(Integer, primary_key=True)
     access_token = Column(String, nullable=False)
     refresh_token = Column(String, nullable=False)
-    realm_id = Column(String, nullable=False)
+    realm_id = Column(String, nullable=False, unique=True)
     expires_at = Column(DateTime, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from sqlalchemy.orm import declared_attr
+
+
+class QboEntityMixin:
+    """Columns every synced QuickBooks entity table shares, keyed by (realm_id, qbo_id)"""
+
+    @declared_attr
+    def __table_args__(cls):
+        return (UniqueConstraint('realm_id', 'qbo_id', name=f'uq_{cls.__tablename__}_realm_id_qbo_id'),)
+
+    id = Column(Integer, primary_key=True)
+    realm_id = Column(String, nullable=False)
+    qbo_id = Column(String, nullable=False)
+    deleted_at = Column(DateTime, nullable=True)
+    # Hash of the synced fields, so syncs can skip rows QuickBooks returned unchanged
+    content_hash = Column(String(32), nullable=True)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Float, Date
+
+from database import Base
+from models.entity import QboEntityMixin
+
+
+class Invoice(QboEntityMixin, Base):
+    __tablename__ = "invoices"
+
+    doc_number = Column(String)
+    customer_id = Column(String)
+    txn_date = Column(Date)
+    due_date = Column(Date)
+    currency_ref = Column(String)
+    total_amount = Column(Float)
+    balance = Column(Float)
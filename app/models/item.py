@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, Float, Boolean
+
+from database import Base
+from models.entity import QboEntityMixin
+
+
+class Item(QboEntityMixin, Base):
+    __tablename__ = "items"
+
+    name = Column(String, nullable=False)
+    item_type = Column(String)
+    active = Column(Boolean, default=True)
+    unit_price = Column(Float)
+    purchase_cost = Column(Float)
+    quantity_on_hand = Column(Float)
+    income_account_id = Column(String)
+    parent_id = Column(String, nullable=True)
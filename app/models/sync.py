@@ -1,13 +1,29 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
 
 from database import Base
 
 class SyncLog(Base):
     __tablename__ = "sync_logs"
+    __table_args__ = (
+        UniqueConstraint('realm_id', 'entity_type', name='uq_sync_logs_realm_id_entity_type'),
+    )
     
     id = Column(Integer, primary_key=True)
-    entity_type = Column(String, nullable=False, unique=True)
-    last_sync_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    realm_id = Column(String, nullable=False)
+    entity_type = Column(String, nullable=False)
+    # Null until the first sync finishes
+    last_sync_at = Column(DateTime, nullable=True)
+    # Bumped whenever a sync writes rows, so readers can tell unchanged data apart cheaply
+    version = Column(Integer, nullable=False, default=0, server_default='0')
+    # Where the next CDC request starts: the QuickBooks server time of the last CDC response, or the
+    # time the last paged sync started
+    cdc_cursor = Column(String, nullable=True)
+    # Latest LastUpdatedTime a sync has seen, where incremental queries without CDC start from
+    watermark = Column(String, nullable=True)
+    # Progress of a sync in flight (next STARTPOSITION, watermark so far, start time, rows staged, entities waiting
+    # for their parent), so an interrupted one resumes
+    checkpoint = Column(JSONB, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Float, Boolean
+
+from database import Base
+from models.entity import QboEntityMixin
+
+
+class Vendor(QboEntityMixin, Base):
+    __tablename__ = "vendors"
+
+    display_name = Column(String, nullable=False)
+    company_name = Column(String)
+    primary_email = Column(String)
+    currency_ref = Column(String)
+    active = Column(Boolean, default=True)
+    balance = Column(Float)
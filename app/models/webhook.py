@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from datetime import datetime
+
+from database import Base
+
+
+class PendingAccountChange(Base):
+    """An account QuickBooks reported as changed through a webhook, waiting to be fetched"""
+    __tablename__ = "pending_account_changes"
+    __table_args__ = (
+        # Repeated notifications for the same account collapse into one fetch
+        UniqueConstraint('realm_id', 'qbo_id', name='uq_pending_account_changes_realm_id_qbo_id'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    realm_id = Column(String, nullable=False)
+    qbo_id = Column(String, nullable=False)
+    operation = Column(String, nullable=False)
+    received_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Failed attempts to apply the change; set aside once it reaches WEBHOOK_MAX_ATTEMPTS
+    attempts = Column(Integer, nullable=False, default=0, server_default='0')
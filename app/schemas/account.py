@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 
 class AccountBaseSchema(BaseModel):
@@ -19,9 +19,17 @@ class AccountCreateSchema(AccountBaseSchema):
 
 class AccountSchema(AccountBaseSchema):
     id: int
+    realm_id: Optional[str] = None
 
     class Config:
         from_attributes = True
 
+
+class AccountTreeSchema(AccountSchema):
+    # current_balance of the account plus that of all its descendants
+    total_balance: float = 0.0
+    children: List["AccountTreeSchema"] = []
+
 # This is needed for the self-referential relationship in Account
 AccountSchema.model_rebuild()
+AccountTreeSchema.model_rebuild()
@@ -0,0 +1,41 @@
+from datetime import date
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class CustomerCreateSchema(BaseModel):
+    qbo_id: str
+    display_name: str
+    company_name: Optional[str] = None
+    primary_email: Optional[str] = None
+    currency_ref: Optional[str] = None
+    active: bool = True
+    balance: Optional[float] = None
+
+
+class VendorCreateSchema(CustomerCreateSchema):
+    pass
+
+
+class ItemCreateSchema(BaseModel):
+    qbo_id: str
+    name: str
+    item_type: Optional[str] = None
+    active: bool = True
+    unit_price: Optional[float] = None
+    purchase_cost: Optional[float] = None
+    quantity_on_hand: Optional[float] = None
+    income_account_id: Optional[str] = None
+    parent_id: Optional[str] = None
+
+
+class InvoiceCreateSchema(BaseModel):
+    qbo_id: str
+    doc_number: Optional[str] = None
+    customer_id: Optional[str] = None
+    txn_date: Optional[date] = None
+    due_date: Optional[date] = None
+    currency_ref: Optional[str] = None
+    total_amount: Optional[float] = None
+    balance: Optional[float] = None
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class WebhookEntitySchema(BaseModel):
+    name: str
+    id: str
+    operation: str
+    lastUpdated: Optional[str] = None
+
+
+class DataChangeEventSchema(BaseModel):
+    entities: List[WebhookEntitySchema] = []
+
+
+class EventNotificationSchema(BaseModel):
+    realmId: str
+    dataChangeEvent: DataChangeEventSchema = DataChangeEventSchema()
+
+
+class WebhookPayloadSchema(BaseModel):
+    eventNotifications: List[EventNotificationSchema] = []
@@ -1,186 +1,178 @@
-from datetime import datetime, timedelta
+import hashlib
+from typing import List, Optional, AsyncIterator, TYPE_CHECKING
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-import requests
-from typing import List, Optional, Dict, Any
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Row, Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from models.account import Account
 from models.sync import SyncLog
 from config.settings import settings
-from services.auth import AuthService
-from schemas.account import AccountCreateSchema
+from schemas.account import AccountSchema
+from services.entities import ACCOUNT
+from services.hierarchy import HierarchyService
+from services.sync_engine import EntitySyncService
+from utils.cache import ACCOUNT_CACHE_CHANNEL, account_cache
 from utils.logger import logger
 
+if TYPE_CHECKING:
+    from services.orchestrator import SyncOrchestrator
 
-class AccountService:
-    def __init__(self, db: Session, auth_service: AuthService):
-        self.db = db
-        self.auth_service = auth_service
+# Columns of the listing response, in AccountSchema field order, selected without ORM objects
+ACCOUNT_LIST_COLUMNS = tuple(Account.__table__.c[name] for name in AccountSchema.model_fields)
 
-    @property
-    def last_sync_time(self) -> Optional[datetime]:
-        """Get the last sync time for accounts from the sync_logs table"""
-        sync_log = self.db.query(SyncLog).filter_by(entity_type='account').first()
-        if not sync_log:
-            return None
-        return sync_log.last_sync_at
-    
-    def update_last_sync_time(self, sync_time: datetime):
-        """Update the last sync time in the sync_logs table"""
-        sync_log = self.db.query(SyncLog).filter_by(entity_type='account').first()
-        if not sync_log:
-            sync_log = SyncLog(entity_type='account')
-            self.db.add(sync_log)
-        
-        sync_log.last_sync_at = sync_time
-        self.db.commit()
-    
-    def _fetch_accounts_from_api(self, last_sync_time: Optional[datetime]) -> List[Dict[str, Any]]:
-        """Fetch accounts from QuickBooks API that have been updated since last_sync_time."""
-        token = self.auth_service.get_valid_token()
-
-        url = f"{settings.API_BASE}/company/{token.realm_id}/query"
-        headers = {
-            "Authorization": f"Bearer {token.access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/text"
-        }
-        # Query for accounts updated since the last sync
-        query = (
-            f"SELECT * FROM Account WHERE Metadata.LastUpdatedTime >= '{last_sync_time}'"
-            if last_sync_time
-            else "SELECT * FROM Account"
-        )
-        
-        response = requests.post(url, data=query, headers=headers)
-        if response.status_code != 200:
-            raise HTTPException(400, f"Failed to fetch accounts: {response.text}")
-
-        return response.json().get('QueryResponse', {}).get('Account', [])
-
-    def _get_existing_accounts(self, account_ids: List[str]) -> Dict[str, Account]:
-        """Get existing accounts by qbo_id for efficient lookup"""
-        accounts = {
-            account.qbo_id: account 
-            for account in self.db.query(Account).filter(
-                Account.qbo_id.in_(account_ids)
-            ).all()
-        }
-        return accounts
 
-    @staticmethod
-    def _validate_account(account_data: Dict[str, Any]) -> AccountCreateSchema:
-        """Create an AccountCreateSchema object from API data"""
-        return AccountCreateSchema(
-            qbo_id=account_data['Id'],
-            name=account_data['Name'],
-            classification=account_data.get('Classification'),
-            currency_ref=account_data.get('CurrencyRef', {}).get('value'),
-            account_type=account_data.get('AccountType'),
-            active=account_data.get('Active', True),
-            current_balance=account_data.get('CurrentBalance', 0.0),
-            parent_id=account_data.get('ParentRef', {}).get('value')
-        )
+class AccountService(EntitySyncService):
+    """Sync accounts, keeping their hierarchy paths and cached listings up to date, and read them back"""
+    descriptor = ACCOUNT
+
+    def _commit_changes(self, sync_log: Optional[SyncLog], changed: bool):
+        """Commit, bumping the sync version and invalidating cached listings when accounts changed"""
+        if changed:
+            # Delivered to every worker's cache listener only once this transaction commits
+            self.db.execute(select(func.pg_notify(ACCOUNT_CACHE_CHANNEL, self.realm_id)))
+        super()._commit_changes(sync_log, changed)
+        if changed:
+            account_cache.invalidate(self.realm_id)
+
+    def _after_write(self):
+        """Rebuild the materialized paths hierarchy reads are served from"""
+        moved = HierarchyService(self.db).rebuild_paths(self.realm_id)
+        logger.info(f"Rebuilt {moved} account paths for realm {self.realm_id}")
 
     @staticmethod
-    def _update_account_instance(account: Account, account_create: AccountCreateSchema) -> Account:
-        """Update an existing account with new data"""
-        account.name = account_create.name
-        account.classification = account_create.classification
-        account.currency_ref = account_create.currency_ref
-        account.account_type = account_create.account_type
-        account.active = account_create.active
-        account.current_balance = account_create.current_balance
-        account.parent_id = account_create.parent_id
-        return account
+    def _escape_like(value: str) -> str:
+        """Escape LIKE wildcards so user input is matched literally"""
+        return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
     @staticmethod
-    def _create_account_instance(account_create: AccountCreateSchema) -> Account:
-        """Create a new account from AccountCreateSchema data"""
-        return Account(
-            qbo_id=account_create.qbo_id,
-            name=account_create.name,
-            classification=account_create.classification,
-            currency_ref=account_create.currency_ref,
-            account_type=account_create.account_type,
-            active=account_create.active,
-            current_balance=account_create.current_balance,
-            parent_id=account_create.parent_id
-        )
-    
-    def _process_accounts(self, accounts_data: List[Dict[str, Any]]) -> tuple[List[Account], List[Account]]:
-        """Process accounts data and return lists of accounts to update and create"""
-        account_ids = [acc['Id'] for acc in accounts_data]
-        existing_accounts = self._get_existing_accounts(account_ids)
-        
-        accounts_to_update = []
-        accounts_to_create = []
-        
-        for account_data in accounts_data:
-            qbo_id = account_data['Id']
-            account_create = self._validate_account(account_data)
-            
-            if qbo_id in existing_accounts:
-                # Update existing account
-                account = existing_accounts[qbo_id]
-                updated_account = self._update_account_instance(account, account_create)
-                accounts_to_update.append(updated_account)
-            else:
-                # Create new account
-                new_account = self._create_account_instance(account_create)
-                accounts_to_create.append(new_account)
-        
-        return accounts_to_update, accounts_to_create
-    
-    def _save_accounts_to_db(self, accounts_to_update: List[Account], accounts_to_create: List[Account]):
-        """Save accounts to database using bulk operations"""
-        if accounts_to_create:
-            self.db.bulk_save_objects(accounts_to_create)
-        for account in accounts_to_update:
-            self.db.merge(account)
-        
-        self.db.commit()
-    
-    def sync_accounts(self):
-        """Sync accounts from QuickBooks to database using bulk operations"""
-        logger.info("Syncing accounts...")
-        last_sync_time = self.last_sync_time
-        if last_sync_time:
-            last_sync_time = last_sync_time.strftime("%Y-%m-%dT%H:%M:%SZ")
-        
-        accounts_data = self._fetch_accounts_from_api(last_sync_time)
-        
-        if not accounts_data:
-            logger.info(f"No accounts updated since {last_sync_time}")
-            self.update_last_sync_time(datetime.utcnow())
-            return
-        
-        accounts_to_update, accounts_to_create = self._process_accounts(accounts_data)
-        self._save_accounts_to_db(accounts_to_update, accounts_to_create)
-        
-        self.update_last_sync_time(datetime.utcnow())
-    
-    def get_accounts(self, name_prefix: Optional[str] = None) -> List[Account]:
-        """Get accounts with optional name prefix filter"""
-        query = self.db.query(Account)
+    def _accounts_query(
+        name_prefix: Optional[str] = None,
+        realm_id: Optional[str] = None,
+        q: Optional[str] = None,
+        fuzzy: bool = False,
+        after: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> Select:
+        """Build the account listing query, read as rows by AsyncAccountService"""
+        query = select(Account).where(Account.deleted_at.is_(None))
+        if realm_id:
+            query = query.where(Account.realm_id == realm_id)
         if name_prefix:
-            query = query.filter(Account.name.ilike(f"{name_prefix}%"))
+            # lower(name) LIKE 'abc%' can use the text_pattern_ops index, unlike ILIKE
+            pattern = f"{AccountService._escape_like(name_prefix.lower())}%"
+            query = query.where(func.lower(Account.name).like(pattern, escape="\\"))
+        if q and fuzzy:
+            if after is not None:
+                # Fuzzy results are ranked by similarity, so there is no id cursor to resume from
+                raise HTTPException(status_code=400, detail="after cannot be combined with fuzzy search")
+            # The pg_trgm % operator matches names similar to q, best matches first
+            query = query.where(Account.name.op("%")(q)).order_by(func.similarity(Account.name, q).desc())
+        elif q:
+            query = query.where(Account.name.ilike(f"%{AccountService._escape_like(q)}%", escape="\\"))
+        if after is not None:
+            # Keyset pagination: seek past the last id of the previous page instead of OFFSET
+            query = query.where(Account.id > after)
+        query = query.order_by(Account.id)
+        if limit is not None:
+            query = query.limit(limit)
         
-        return query.all()
-    
-    def should_sync(self) -> bool:
-        """Check if accounts need to be synced (older than 1 hour)"""
-        logger.info("Checking if accounts need to be synced...")
-        last_sync = self.last_sync_time
-        if not last_sync:
-            return True
-        
-        return datetime.utcnow() - last_sync > timedelta(hours=1)
-    
-    def get_accounts_with_sync(self, name_prefix: Optional[str] = None, from_api=False) -> List[Account]:
-        """Get accounts, syncing first if necessary"""
-        if from_api or self.should_sync():
-            self.sync_accounts()
-        
-        return self.get_accounts(name_prefix)
+        return query
+
+
+class AsyncAccountService:
+    """Non-blocking account service for the request path.
+
+    Reads run on an async session; syncs still go through the blocking AccountService,
+    which is run in the threadpool so the event loop keeps serving other requests.
+    """
+
+    def __init__(self, db: AsyncSession, account_service: AccountService, orchestrator: "SyncOrchestrator"):
+        self.db = db
+        self.account_service = account_service
+        self.orchestrator = orchestrator
+
+    async def get_accounts(
+        self,
+        name_prefix: Optional[str] = None,
+        q: Optional[str] = None,
+        fuzzy: bool = False,
+        after: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[Row]:
+        """Get accounts as rows of ACCOUNT_LIST_COLUMNS with optional name prefix, substring or fuzzy filters"""
+        result = await self.db.execute(
+            self._rows_query(name_prefix, self.account_service.realm_id, q, fuzzy, after, limit)
+        )
+        return list(result)
+
+    @staticmethod
+    def _rows_query(
+        name_prefix: Optional[str],
+        realm_id: Optional[str],
+        q: Optional[str],
+        fuzzy: bool,
+        after: Optional[int],
+        limit: Optional[int]
+    ) -> Select:
+        """Select the listing columns only, so rows skip ORM hydration and the identity map"""
+        query = AccountService._accounts_query(name_prefix, realm_id, q, fuzzy, after, limit)
+        return query.with_only_columns(*ACCOUNT_LIST_COLUMNS)
+
+    @property
+    def realm_id(self) -> Optional[str]:
+        """Realm the reads are scoped to, or None for every realm"""
+        return self.account_service.realm_id
+
+    async def accounts_etag(self) -> str:
+        """Build a weak ETag for the account listing from sync_logs alone, without reading accounts"""
+        query = select(SyncLog.realm_id, SyncLog.version).where(SyncLog.entity_type == ACCOUNT.entity_type)
+        if self.account_service.realm_id:
+            query = query.where(SyncLog.realm_id == self.account_service.realm_id)
+        versions = (await self.db.execute(query.order_by(SyncLog.realm_id))).all()
+        digest = hashlib.sha1(";".join(f"{realm_id}:{version}" for realm_id, version in versions).encode())
+        return f'W/"{digest.hexdigest()[:16]}"'
+
+    def stream_accounts(
+        self,
+        name_prefix: Optional[str] = None,
+        q: Optional[str] = None,
+        fuzzy: bool = False,
+        after: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[Row]:
+        """Yield matching accounts as rows of ACCOUNT_LIST_COLUMNS from a server-side cursor, a batch at a time"""
+        # Build eagerly so invalid filters fail before a streamed response has started
+        query = self._rows_query(
+            name_prefix, self.account_service.realm_id, q, fuzzy, after, limit
+        ).execution_options(yield_per=settings.ACCOUNT_STREAM_BATCH_SIZE)
+        return self._stream(query)
+
+    async def _stream(self, query: Select) -> AsyncIterator[Row]:
+        """Run query on its own session, since the request session closes before the body is sent"""
+        async with async_sessionmaker(self.db.bind, expire_on_commit=False)() as session:
+            result = await session.stream(query)
+            async for row in result:
+                yield row
+
+    async def sync_if_requested(self, from_api=False) -> None:
+        """Sync the realm, or every realm, before reading when explicitly requested"""
+        if from_api:
+            if self.account_service.realm_id:
+                await run_in_threadpool(self.account_service.sync)
+            else:
+                await run_in_threadpool(self.orchestrator.sync_all, entity_types=[ACCOUNT.entity_type])
+
+    async def get_accounts_with_sync(
+        self,
+        name_prefix: Optional[str] = None,
+        from_api=False,
+        q: Optional[str] = None,
+        fuzzy: bool = False,
+        after: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[Row]:
+        """Get accounts, syncing first only when explicitly requested"""
+        await self.sync_if_requested(from_api)
+        return await self.get_accounts(name_prefix, q, fuzzy, after, limit)
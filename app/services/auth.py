@@ -1,19 +1,51 @@
+import threading
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Union
 
+import httpx
 from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-import requests
 
 from intuitlib.client import AuthClient
 
 from models.auth import Token
 from config.settings import settings
-from schemas.auth import TokenCreateSchema
+from schemas.auth import TokenBaseSchema, TokenCreateSchema
+from utils.metrics import token_refreshes
+
+
+class TokenCache:
+    """Process-wide copy of the current token per realm, so valid tokens are served without touching the DB"""
+
+    def __init__(self):
+        self._tokens: Dict[str, TokenBaseSchema] = {}
+        self._refresh_locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def get(self, realm_id: str) -> Optional[TokenBaseSchema]:
+        return self._tokens.get(realm_id)
+
+    def set(self, token: Token):
+        self._tokens[token.realm_id] = TokenBaseSchema.model_validate(token, from_attributes=True)
+
+    def refresh_lock(self, realm_id: str) -> threading.Lock:
+        """Lock held while refreshing so only one thread per process talks to the OAuth server"""
+        with self._guard:
+            return self._refresh_locks.setdefault(realm_id, threading.Lock())
+
+    def clear(self):
+        self._tokens.clear()
+
+
+token_cache = TokenCache()
 
 
 class AuthService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, http_client: httpx.Client):
         self.db = db
+        self.http_client = http_client
         self._auth_client = None
 
     @property
@@ -31,50 +63,84 @@ class AuthService:
         )
         return client
 
-    def save_token(self, access_token: str, refresh_token: str, realm_id: str, expires_in: int) -> Token:
-        """Save or update token in the database"""
+    @staticmethod
+    def _build_token_data(access_token: str, refresh_token: str, realm_id: str, expires_in: int) -> TokenCreateSchema:
+        """Validate token values returned by the OAuth server"""
         expires_at = datetime.now() + timedelta(seconds=expires_in)
         
-        token_data = TokenCreateSchema(
+        return TokenCreateSchema(
             access_token=access_token,
             refresh_token=refresh_token,
             realm_id=realm_id,
             expires_at=expires_at,
             expires_in=expires_in
         )
-        
-        token = self.db.query(Token).first()
+
+    @staticmethod
+    def _apply_token_data(token: Optional[Token], token_data: TokenCreateSchema) -> Token:
+        """Update the existing token with new values, or create one if there is none"""
         if token:
             token.access_token = token_data.access_token
             token.refresh_token = token_data.refresh_token
             token.realm_id = token_data.realm_id
             token.expires_at = token_data.expires_at
-        else:
-            token = Token(
-                access_token=token_data.access_token,
-                refresh_token=token_data.refresh_token,
-                realm_id=token_data.realm_id,
-                expires_at=token_data.expires_at
-            )
-            self.db.add(token)
+            return token
+
+        return Token(
+            access_token=token_data.access_token,
+            refresh_token=token_data.refresh_token,
+            realm_id=token_data.realm_id,
+            expires_at=token_data.expires_at
+        )
+
+    def save_token(self, access_token: str, refresh_token: str, realm_id: str, expires_in: int) -> Token:
+        """Save or update token in the database"""
+        token_data = self._build_token_data(access_token, refresh_token, realm_id, expires_in)
+        
+        token = self._apply_token_data(self.db.query(Token).filter_by(realm_id=realm_id).first(), token_data)
+        self.db.add(token)
         
         self.db.commit()
+        token_cache.set(token)
         return token
+
+    @staticmethod
+    def _is_expiring(token: Union[Token, TokenBaseSchema]) -> bool:
+        """Check if the token expires within the next five minutes"""
+        return datetime.utcnow() >= token.expires_at - timedelta(minutes=5)
     
-    def get_valid_token(self) -> Token:
-        """Get a valid token, refreshing if necessary"""
-        token = self.db.query(Token).first()
-        if not token:
-            raise HTTPException(401, "No token found. Please authenticate first.")
-        
-        if datetime.utcnow() >= token.expires_at - timedelta(minutes=5):
-            return self.refresh_token(token)
+    def get_valid_token(self, realm_id: str) -> TokenBaseSchema:
+        """Get a valid token for the realm from the cache, refreshing it at most once per expiry window"""
+        token = token_cache.get(realm_id)
+        if token and not self._is_expiring(token):
+            return token
         
-        return token
+        with token_cache.refresh_lock(realm_id):
+            # Another thread may have refreshed the token while this one waited
+            token = token_cache.get(realm_id)
+            if token and not self._is_expiring(token):
+                return token
+            
+            # The row lock makes other processes wait for this refresh and then reuse its result
+            db_token = self.db.query(Token).filter_by(realm_id=realm_id).with_for_update().first()
+            if not db_token:
+                self.db.rollback()
+                raise HTTPException(401, f"No token found for realm {realm_id}. Please authenticate first.")
+            
+            if self._is_expiring(db_token):
+                db_token = self.refresh_token(db_token)
+            
+            token_cache.set(db_token)
+            self.db.commit()
+            return token_cache.get(realm_id)
+
+    def get_realm_ids(self) -> List[str]:
+        """Get the ids of all connected QuickBooks companies"""
+        return [realm_id for (realm_id,) in self.db.query(Token.realm_id).order_by(Token.realm_id)]
 
     def refresh_token(self, token: Token) -> Token:
         """Refresh the access token using the refresh token"""
-        response = requests.post(
+        response = self.http_client.post(
             settings.TOKEN_URL,
             data={
                 'grant_type': 'refresh_token',
@@ -85,8 +151,10 @@ class AuthService:
         )
 
         if response.status_code != 200:
+            token_refreshes.inc(outcome="failure")
             raise HTTPException(400, f"Failed to refresh token: {response.text}")
 
+        token_refreshes.inc(outcome="success")
         data = response.json()
         return self.save_token(
             access_token=data['access_token'],
@@ -94,3 +162,47 @@ class AuthService:
             realm_id=token.realm_id,
             expires_in=data['expires_in']
         )
+
+
+class AsyncAuthService:
+    """Non-blocking counterpart of AuthService for the OAuth callback"""
+
+    def __init__(self, db: AsyncSession, http_client: httpx.AsyncClient):
+        self.db = db
+        self.http_client = http_client
+
+    async def save_token(self, access_token: str, refresh_token: str, realm_id: str, expires_in: int) -> Token:
+        """Save or update token in the database"""
+        token_data = AuthService._build_token_data(access_token, refresh_token, realm_id, expires_in)
+
+        result = await self.db.execute(select(Token).filter_by(realm_id=realm_id))
+        token = AuthService._apply_token_data(result.scalars().first(), token_data)
+        self.db.add(token)
+
+        await self.db.commit()
+        token_cache.set(token)
+        return token
+
+    async def exchange_code(self, code: str, realm_id: str) -> Token:
+        """Exchange an authorization code for tokens and save them"""
+        response = await self.http_client.post(
+            settings.TOKEN_URL,
+            data={
+                'grant_type': 'authorization_code',
+                'code': code,
+                'redirect_uri': settings.REDIRECT_URI
+            },
+            auth=(settings.CLIENT_ID, settings.CLIENT_SECRET),
+            headers={'Accept': 'application/json'}
+        )
+
+        if response.status_code != 200:
+            raise HTTPException(400, f"Failed to exchange authorization code: {response.text}")
+
+        data = response.json()
+        return await self.save_token(
+            access_token=data['access_token'],
+            refresh_token=data['refresh_token'],
+            realm_id=realm_id,
+            expires_in=data['expires_in']
+        )
@@ -0,0 +1,90 @@
+from typing import Any, Dict
+
+from models.account import Account
+from models.customer import Customer
+from models.invoice import Invoice
+from models.item import Item
+from models.vendor import Vendor
+from schemas.account import AccountCreateSchema
+from schemas.entity import CustomerCreateSchema, InvoiceCreateSchema, ItemCreateSchema, VendorCreateSchema
+from services.sync_engine import EntityDescriptor
+
+
+def _ref(data: Dict[str, Any], key: str):
+    """Value of a QuickBooks reference field such as ParentRef"""
+    return (data.get(key) or {}).get('value')
+
+
+def validate_account(account_data: Dict[str, Any]) -> AccountCreateSchema:
+    """Create an AccountCreateSchema object from API data"""
+    return AccountCreateSchema(
+        qbo_id=account_data['Id'],
+        name=account_data['Name'],
+        classification=account_data.get('Classification'),
+        currency_ref=_ref(account_data, 'CurrencyRef'),
+        account_type=account_data.get('AccountType'),
+        active=account_data.get('Active', True),
+        current_balance=account_data.get('CurrentBalance', 0.0),
+        parent_id=_ref(account_data, 'ParentRef')
+    )
+
+
+def validate_customer(customer_data: Dict[str, Any]) -> CustomerCreateSchema:
+    """Create a CustomerCreateSchema object from API data"""
+    return CustomerCreateSchema(
+        qbo_id=customer_data['Id'],
+        display_name=customer_data['DisplayName'],
+        company_name=customer_data.get('CompanyName'),
+        primary_email=(customer_data.get('PrimaryEmailAddr') or {}).get('Address'),
+        currency_ref=_ref(customer_data, 'CurrencyRef'),
+        active=customer_data.get('Active', True),
+        balance=customer_data.get('Balance')
+    )
+
+
+def validate_vendor(vendor_data: Dict[str, Any]) -> VendorCreateSchema:
+    """Create a VendorCreateSchema object from API data"""
+    return VendorCreateSchema(**validate_customer(vendor_data).model_dump())
+
+
+def validate_item(item_data: Dict[str, Any]) -> ItemCreateSchema:
+    """Create an ItemCreateSchema object from API data"""
+    return ItemCreateSchema(
+        qbo_id=item_data['Id'],
+        name=item_data['Name'],
+        item_type=item_data.get('Type'),
+        active=item_data.get('Active', True),
+        unit_price=item_data.get('UnitPrice'),
+        purchase_cost=item_data.get('PurchaseCost'),
+        quantity_on_hand=item_data.get('QtyOnHand'),
+        income_account_id=_ref(item_data, 'IncomeAccountRef'),
+        parent_id=_ref(item_data, 'ParentRef')
+    )
+
+
+def validate_invoice(invoice_data: Dict[str, Any]) -> InvoiceCreateSchema:
+    """Create an InvoiceCreateSchema object from API data"""
+    return InvoiceCreateSchema(
+        qbo_id=invoice_data['Id'],
+        doc_number=invoice_data.get('DocNumber'),
+        customer_id=_ref(invoice_data, 'CustomerRef'),
+        txn_date=invoice_data.get('TxnDate'),
+        due_date=invoice_data.get('DueDate'),
+        currency_ref=_ref(invoice_data, 'CurrencyRef'),
+        total_amount=invoice_data.get('TotalAmt'),
+        balance=invoice_data.get('Balance')
+    )
+
+
+ACCOUNT = EntityDescriptor(
+    'account', 'Account', Account, AccountCreateSchema, validate_account, parent_column='parent_id'
+)
+CUSTOMER = EntityDescriptor('customer', 'Customer', Customer, CustomerCreateSchema, validate_customer)
+VENDOR = EntityDescriptor('vendor', 'Vendor', Vendor, VendorCreateSchema, validate_vendor)
+ITEM = EntityDescriptor('item', 'Item', Item, ItemCreateSchema, validate_item)
+# Transactions have no Active flag; voided and deleted invoices surface through CDC instead
+INVOICE = EntityDescriptor('invoice', 'Invoice', Invoice, InvoiceCreateSchema, validate_invoice, has_active=False)
+
+ENTITY_DESCRIPTORS: Dict[str, EntityDescriptor] = {
+    descriptor.entity_type: descriptor for descriptor in (ACCOUNT, CUSTOMER, VENDOR, ITEM, INVOICE)
+}
@@ -0,0 +1,118 @@
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Select, and_, any_, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from models.account import Account
+from schemas.account import AccountSchema, AccountTreeSchema
+
+# Walks down from the root accounts of a realm in one statement and only rewrites paths that moved.
+# The qbo_id <> ALL(path) guard stops the walk should QuickBooks ever return a parent cycle.
+REBUILD_PATHS_SQL = text("""
+    WITH RECURSIVE tree (id, qbo_id, path) AS (
+        SELECT id, qbo_id, ARRAY[qbo_id]::varchar[]
+        FROM accounts
+        WHERE realm_id = :realm_id AND parent_id IS NULL
+        UNION ALL
+        SELECT child.id, child.qbo_id, tree.path || child.qbo_id
+        FROM accounts child
+        JOIN tree ON child.parent_id = tree.qbo_id
+        WHERE child.realm_id = :realm_id AND child.qbo_id <> ALL(tree.path)
+    )
+    UPDATE accounts SET path = tree.path
+    FROM tree
+    WHERE accounts.id = tree.id AND accounts.path IS DISTINCT FROM tree.path
+""")
+
+
+class HierarchyService:
+    """Maintain the materialized account paths that hierarchy reads are served from"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def rebuild_paths(self, realm_id: str) -> int:
+        """Recompute the paths of a realm's accounts and return how many changed; the caller commits"""
+        return self.db.execute(REBUILD_PATHS_SQL, {"realm_id": realm_id}).rowcount
+
+
+class AsyncHierarchyService:
+    """Serve account subtrees, ancestors and the whole tree from materialized paths"""
+
+    def __init__(self, db: AsyncSession, realm_id: Optional[str] = None):
+        self.db = db
+        self.realm_id = realm_id
+
+    def _accounts_query(self) -> Select:
+        """Live accounts of the realm, or of every realm"""
+        query = select(Account).where(Account.deleted_at.is_(None))
+        if self.realm_id:
+            query = query.where(Account.realm_id == self.realm_id)
+        return query
+
+    def _require_realm(self) -> str:
+        """qbo_ids are only unique within a realm, so lookups by qbo_id need one"""
+        if not self.realm_id:
+            raise HTTPException(400, "realm_id is required to look up an account")
+        return self.realm_id
+
+    @staticmethod
+    def _build_tree(accounts: List[Account]) -> List[AccountTreeSchema]:
+        """Nest accounts under their parents and roll balances up, returning the roots"""
+        nodes: Dict[Tuple[str, str], AccountTreeSchema] = {
+            (account.realm_id, account.qbo_id): AccountTreeSchema(**AccountSchema.model_validate(account).model_dump())
+            for account in accounts
+        }
+        roots = []
+        for account in accounts:
+            node = nodes[(account.realm_id, account.qbo_id)]
+            parent = nodes.get((account.realm_id, account.parent_id)) if account.parent_id else None
+            # Accounts whose parent is outside the result (deleted, or above a subtree) become roots
+            (parent.children if parent else roots).append(node)
+
+        def roll_up(node: AccountTreeSchema) -> float:
+            node.total_balance = (node.current_balance or 0.0) + sum(roll_up(child) for child in node.children)
+            return node.total_balance
+
+        for root in roots:
+            roll_up(root)
+        return roots
+
+    async def get_tree(self) -> List[AccountTreeSchema]:
+        """Get every account nested under its parent, with rolled-up balances"""
+        # Path order lists every parent before its children
+        result = await self.db.execute(self._accounts_query().order_by(Account.realm_id, Account.path))
+        return self._build_tree(list(result.scalars()))
+
+    async def get_subtree(self, qbo_id: str) -> AccountTreeSchema:
+        """Get an account with all of its descendants nested below it"""
+        self._require_realm()
+        result = await self.db.execute(
+            self._accounts_query().where(Account.path.contains([qbo_id])).order_by(Account.path)
+        )
+        roots = self._build_tree(list(result.scalars()))
+        # Path order puts the requested account first, unless it is deleted or unknown
+        if not roots or roots[0].qbo_id != qbo_id:
+            raise HTTPException(404, "Account not found")
+        return roots[0]
+
+    async def get_ancestors(self, qbo_id: str) -> List[Account]:
+        """Get the ancestors of an account, from the root down to its parent"""
+        realm_id = self._require_realm()
+        target = aliased(Account)
+        # The account itself is on its own path and sorts last, which tells a root apart from a missing account
+        result = await self.db.execute(
+            self._accounts_query()
+            .join(target, and_(
+                target.realm_id == realm_id,
+                target.qbo_id == qbo_id,
+                Account.qbo_id == any_(target.path)
+            ))
+            .order_by(func.cardinality(Account.path))
+        )
+        lineage = list(result.scalars())
+        if not lineage or lineage[-1].qbo_id != qbo_id:
+            raise HTTPException(404, "Account not found")
+        return lineage[:-1]
@@ -0,0 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Type
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from database import SessionLocal
+from services.account import AccountService
+from services.auth import AuthService
+from services.entities import ACCOUNT, ENTITY_DESCRIPTORS
+from services.sync_engine import EntitySyncService
+from utils.http import get_http_client
+from utils.logger import logger
+
+# Entities whose sync keeps more than their own table up to date
+SYNC_SERVICES: Dict[str, Type[EntitySyncService]] = {ACCOUNT.entity_type: AccountService}
+
+
+class SyncOrchestrator:
+    """Sync every entity of every connected QuickBooks company over a bounded pool of worker threads"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_workers: int = settings.SYNC_MAX_WORKERS
+    ):
+        self.session_factory = session_factory
+        self.max_workers = max_workers
+
+    def get_realm_ids(self) -> List[str]:
+        """Get the ids of all connected realms"""
+        db = self.session_factory()
+        try:
+            return AuthService(db, get_http_client()).get_realm_ids()
+        finally:
+            db.close()
+
+    def sync_entity(
+        self,
+        realm_id: str,
+        entity_type: str,
+        max_age: Optional[timedelta] = None,
+        wait: bool = True
+    ) -> bool:
+        """Sync one entity of one realm in its own session, isolating its failures from the other syncs"""
+        db = self.session_factory()
+        try:
+            http_client = get_http_client()
+            service_class = SYNC_SERVICES.get(entity_type, EntitySyncService)
+            service = service_class(
+                db, AuthService(db, http_client), http_client, realm_id, ENTITY_DESCRIPTORS[entity_type]
+            )
+            if max_age is not None and not service.should_sync(max_age):
+                return False
+            return service.sync(wait=wait)
+        except HTTPException as e:
+            logger.warning(f"{entity_type.capitalize()} sync for realm {realm_id} skipped: {e.detail}")
+        except Exception:
+            logger.exception(f"{entity_type.capitalize()} sync for realm {realm_id} failed")
+        finally:
+            db.close()
+        return False
+
+    def sync_all(
+        self,
+        max_age: Optional[timedelta] = None,
+        wait: bool = True,
+        entity_types: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, bool]]:
+        """Sync every entity of every realm concurrently and return whether each sync ran, by realm and entity"""
+        realm_ids = self.get_realm_ids()
+        if not realm_ids:
+            logger.info("No connected realms to sync")
+            return {}
+
+        entity_types = entity_types or settings.SYNC_ENTITY_TYPES
+        # Entities of a realm are independent; they share the realm's QuickBooks request budget
+        syncs = [(realm_id, entity_type) for entity_type in entity_types for realm_id in realm_ids]
+        workers = min(self.max_workers, len(syncs))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="entity-sync") as pool:
+            ran = pool.map(lambda sync: self.sync_entity(*sync, max_age, wait), syncs)
+            results: Dict[str, Dict[str, bool]] = {realm_id: {} for realm_id in realm_ids}
+            for (realm_id, entity_type), synced in zip(syncs, ran):
+                results[realm_id][entity_type] = synced
+            return results
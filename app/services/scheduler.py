@@ -0,0 +1,62 @@
+import asyncio
+import random
+from datetime import timedelta
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from database import SessionLocal
+from services.orchestrator import SyncOrchestrator
+from utils.logger import logger
+
+
+class SyncScheduler:
+    """Run entity syncs in the background so reads are always served straight from the database"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        interval: float = settings.SYNC_INTERVAL_SECONDS,
+        jitter: float = settings.SYNC_JITTER_SECONDS
+    ):
+        self.orchestrator = SyncOrchestrator(session_factory)
+        self.interval = interval
+        self.jitter = jitter
+        self._task: Optional[asyncio.Task] = None
+
+    def _next_delay(self) -> float:
+        """Interval until the next run, randomized so workers do not sync in lockstep"""
+        return max(0.0, self.interval + random.uniform(-self.jitter, self.jitter))
+
+    def run_once(self):
+        """Sync every realm that another worker has not synced recently"""
+        try:
+            # Another worker already syncing a realm is as good as syncing it here
+            self.orchestrator.sync_all(max_age=timedelta(seconds=self.interval / 2), wait=False)
+        except Exception:
+            logger.exception("Scheduled sync failed")
+
+    async def _run(self):
+        """Sync on every tick, starting after a random delay within the jitter window"""
+        await asyncio.sleep(random.uniform(0, self.jitter))
+        while True:
+            await asyncio.to_thread(self.run_once)
+            await asyncio.sleep(self._next_delay())
+
+    def start(self):
+        """Start the scheduler loop on the running event loop"""
+        if self._task is None:
+            logger.info(f"Starting sync scheduler (every {self.interval}s ± {self.jitter}s)")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the scheduler loop and wait for it to finish"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -0,0 +1,732 @@
+import hashlib
+import io
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Type
+
+import httpx
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from models.sync import SyncLog
+from services.auth import AuthService
+from utils.locks import single_flight
+from utils.logger import logger
+from utils.metrics import sync_phase_duration, sync_rows
+from utils.qbo import QboClient
+
+
+class EntityDescriptor(NamedTuple):
+    """How one QuickBooks entity is fetched, validated and stored"""
+    # sync_logs.entity_type, also used in lock names and log messages
+    entity_type: str
+    # Entity name in QuickBooks queries, CDC requests and responses
+    qbo_name: str
+    # ORM model keyed by (realm_id, qbo_id), with deleted_at and content_hash columns
+    model: Any
+    # Validated columns written by the upsert, besides realm_id and content_hash
+    schema: Type[BaseModel]
+    validate: Callable[[Dict[str, Any]], BaseModel]
+    # Name list entities leave inactive records out of queries unless asked for them
+    has_active: bool = True
+    # Column referencing the qbo_id of a parent entity that must be stored first, if any
+    parent_column: Optional[str] = None
+
+    @property
+    def columns(self) -> List[str]:
+        """Synced columns in schema order"""
+        return list(self.schema.model_fields)
+
+    @property
+    def label(self) -> str:
+        """Plural name for log and error messages"""
+        return f"{self.entity_type}s"
+
+
+class EntitySyncService:
+    """Sync one QuickBooks entity of a realm into its table, as described by an EntityDescriptor"""
+    descriptor: EntityDescriptor
+
+    def __init__(
+        self,
+        db: Session,
+        auth_service: AuthService,
+        http_client: httpx.Client,
+        realm_id: Optional[str] = None,
+        descriptor: Optional[EntityDescriptor] = None
+    ):
+        self.db = db
+        self.auth_service = auth_service
+        self.http_client = http_client
+        # A service runs one sync, so its client's retry budget is that sync's budget
+        self.qbo_client = QboClient(http_client)
+        self.realm_id = realm_id
+        if descriptor is not None:
+            self.descriptor = descriptor
+
+    @property
+    def label(self) -> str:
+        """Plural name of the synced entity"""
+        return self.descriptor.label
+
+    def _sync_log_query(self, *columns):
+        """Query the realm's sync log row for this entity"""
+        return self.db.query(*columns).filter_by(realm_id=self.realm_id, entity_type=self.descriptor.entity_type)
+
+    @property
+    def last_sync_time(self) -> Optional[datetime]:
+        """Get the last sync time of the realm's entities from the sync_logs table"""
+        # Query the column rather than the entity so a sync committed elsewhere is always seen
+        return self._sync_log_query(SyncLog.last_sync_at).scalar()
+
+    @property
+    def cdc_cursor(self) -> Optional[str]:
+        """Get the time changes were last captured up to, falling back to the last sync time"""
+        row = self._sync_log_query(SyncLog.cdc_cursor, SyncLog.last_sync_at).first()
+        cdc_cursor, last_sync_at = row or (None, None)
+        if cdc_cursor:
+            return cdc_cursor
+        return last_sync_at.strftime("%Y-%m-%dT%H:%M:%SZ") if last_sync_at else None
+
+    @property
+    def watermark(self) -> Optional[str]:
+        """Get the latest LastUpdatedTime synced, falling back to the CDC cursor"""
+        return self._sync_log_query(SyncLog.watermark).scalar() or self.cdc_cursor
+
+    def _sync_log(self) -> SyncLog:
+        """Get the realm's sync log row for this entity, adding one that has not synced yet"""
+        sync_log = self._sync_log_query(SyncLog).first()
+        if not sync_log:
+            sync_log = SyncLog(
+                realm_id=self.realm_id, entity_type=self.descriptor.entity_type, last_sync_at=None, version=0
+            )
+            self.db.add(sync_log)
+        return sync_log
+
+    def update_last_sync_time(
+        self,
+        sync_time: datetime,
+        changed: bool = False,
+        cdc_cursor: Optional[str] = None,
+        watermark: Optional[str] = None
+    ):
+        """Record a finished sync in the sync_logs table, bumping the version when entities changed"""
+        sync_log = self._sync_log()
+        sync_log.last_sync_at = sync_time
+        sync_log.checkpoint = None
+        if cdc_cursor:
+            sync_log.cdc_cursor = cdc_cursor
+        # A sync that saw no changes leaves the watermark where it was
+        if watermark and (not sync_log.watermark or self._later(watermark, sync_log.watermark)):
+            sync_log.watermark = watermark
+        self._commit_changes(sync_log, changed)
+
+    @property
+    def checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Get the progress of an interrupted sync, if there is one to resume"""
+        return self._sync_log_query(SyncLog.checkpoint).scalar()
+
+    def _save_checkpoint(self, checkpoint: Dict[str, Any]):
+        """Record sync progress alongside the page it covers; the caller commits"""
+        self._sync_log().checkpoint = checkpoint
+
+    @staticmethod
+    def _later(timestamp: str, other: str) -> bool:
+        """Compare two QuickBooks timestamps, naive ones being UTC"""
+        def parse(value: str) -> datetime:
+            parsed = datetime.fromisoformat(value)
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+        return parse(timestamp) > parse(other)
+
+    @classmethod
+    def _latest_update(cls, entities_data: List[Dict[str, Any]], watermark: Optional[str] = None) -> Optional[str]:
+        """Latest LastUpdatedTime among the entities and watermark"""
+        for entity_data in entities_data:
+            updated_at = (entity_data.get('MetaData') or {}).get('LastUpdatedTime')
+            if updated_at and (not watermark or cls._later(updated_at, watermark)):
+                watermark = updated_at
+        return watermark
+
+    @classmethod
+    def _advance(cls, checkpoint: Dict[str, Any], entities_data: List[Dict[str, Any]], changed: bool) -> Dict[str, Any]:
+        """Move a checkpoint past a page, raising its watermark to the latest change on the page"""
+        return {
+            **checkpoint,
+            "position": checkpoint["position"] + len(entities_data),
+            "watermark": cls._latest_update(entities_data, checkpoint["watermark"]),
+            "changed": checkpoint["changed"] or changed
+        }
+
+    @staticmethod
+    def _overlapped(cursor: Optional[str]) -> Optional[str]:
+        """Move a cursor back by the overlap window"""
+        if not cursor:
+            return None
+        # Rows committed upstream out of LastUpdatedTime order, or around clock skew, are fetched again
+        since = datetime.fromisoformat(cursor) - timedelta(seconds=settings.SYNC_WATERMARK_OVERLAP_SECONDS)
+        return since.isoformat()
+
+    def _since(self) -> Optional[str]:
+        """Point incremental queries fetch changes from: the watermark less the overlap window"""
+        return self._overlapped(self.watermark)
+
+    def _changed_since(self) -> Optional[str]:
+        """Point CDC requests capture changes from: the CDC cursor less the overlap window.
+
+        Unlike the watermark, the cursor moves with every sync, so a realm without recent changes
+        stays within the window CDC can look back over.
+        """
+        return self._overlapped(self.cdc_cursor)
+
+    def _phase(self, phase: str):
+        """Time a phase of the sync (fetch, validate, diff, write or commit) for the metrics endpoint"""
+        return sync_phase_duration.time(entity=self.descriptor.entity_type, phase=phase)
+
+    def _count_rows(self, **counts: int):
+        """Add the rows handled by the sync to the metrics, by operation"""
+        for operation, count in counts.items():
+            if count:
+                sync_rows.inc(count, entity=self.descriptor.entity_type, operation=operation)
+
+    def _commit(self):
+        """Commit the sync's transaction"""
+        with self._phase("commit"):
+            self.db.commit()
+
+    def _commit_changes(self, sync_log: Optional[SyncLog], changed: bool):
+        """Commit, bumping the sync version when entities changed"""
+        if changed and sync_log:
+            # Writes to a realm are single-flight, so a read-modify-write cannot race
+            sync_log.version += 1
+        self._commit()
+
+    def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Send an authorized request to the realm's company API within its rate limits, retrying transient errors"""
+        token = self.auth_service.get_valid_token(self.realm_id)
+        headers = {
+            "Authorization": f"Bearer {token.access_token}",
+            "Accept": "application/json",
+            **kwargs.pop("headers", {})
+        }
+        url = f"{settings.API_BASE}/company/{self.realm_id}/{path}"
+        return self.qbo_client.request(self.realm_id, method, url, headers=headers, **kwargs)
+
+    def _fetch_page(
+        self,
+        last_sync_time: Optional[str],
+        start_position: int = 1,
+        max_results: int = settings.QBO_PAGE_SIZE
+    ) -> List[Dict[str, Any]]:
+        """Fetch one page of entities from QuickBooks API that have been updated since last_sync_time"""
+        conditions = []
+        if last_sync_time:
+            conditions.append(f"Metadata.LastUpdatedTime >= '{last_sync_time}'")
+        if self.descriptor.has_active:
+            # Without it inactive records are left out, and a full sync would flag them as deleted
+            conditions.append("Active IN (true, false)")
+        query = f"SELECT * FROM {self.descriptor.qbo_name}"
+        if conditions:
+            query += f" WHERE {' AND '.join(conditions)}"
+        # Stable ordering keeps STARTPOSITION paging consistent between requests
+        query += f" ORDERBY Id STARTPOSITION {start_position} MAXRESULTS {max_results}"
+        return self._query(query)
+
+    def _fetch_changes(self, changed_since: str) -> tuple[List[Dict[str, Any]], Optional[str]]:
+        """Fetch entities changed or deleted since changed_since from the CDC endpoint.
+
+        Returns the entities and the QuickBooks server time to resume from next time.
+        """
+        qbo_name = self.descriptor.qbo_name
+        with self._phase("fetch"):
+            response = self._request("GET", "cdc", params={"entities": qbo_name, "changedSince": changed_since})
+            if response.status_code != 200:
+                raise HTTPException(400, f"Failed to fetch {self.descriptor.entity_type} changes: {response.text}")
+            data = response.json()
+
+        entities = [
+            entity
+            for cdc_response in data.get('CDCResponse', [])
+            for query_response in cdc_response.get('QueryResponse', [])
+            for entity in query_response.get(qbo_name, [])
+        ]
+        self._count_rows(fetched=len(entities))
+        return entities, data.get('time')
+
+    def _fetch_by_id(self, qbo_ids: List[str]) -> List[Dict[str, Any]]:
+        """Fetch the given entities from QuickBooks API, including inactive ones"""
+        ids = ", ".join(f"'{qbo_id}'" for qbo_id in qbo_ids)
+        query = f"SELECT * FROM {self.descriptor.qbo_name} WHERE Id IN ({ids})"
+        if self.descriptor.has_active:
+            query += " AND Active IN (true, false)"
+        return self._query(f"{query} MAXRESULTS {len(qbo_ids)}")
+
+    def _query(self, query: str) -> List[Dict[str, Any]]:
+        """Run a QuickBooks query and return the entities it found"""
+        with self._phase("fetch"):
+            response = self._request("POST", "query", content=query, headers={"Content-Type": "application/text"})
+            if response.status_code != 200:
+                raise HTTPException(400, f"Failed to fetch {self.label}: {response.text}")
+            entities = response.json().get('QueryResponse', {}).get(self.descriptor.qbo_name, [])
+
+        self._count_rows(fetched=len(entities))
+        return entities
+
+    def _fetch_pages(
+        self,
+        last_sync_time: Optional[str],
+        start_position: int = 1
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Yield pages of entities from QuickBooks API until the result set is exhausted"""
+        page_size = settings.QBO_PAGE_SIZE
+        while True:
+            page = self._fetch_page(last_sync_time, start_position, page_size)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            start_position += page_size
+
+    def _process(self, entities_data: List[Dict[str, Any]]) -> List[BaseModel]:
+        """Validate entities data, keeping the last occurrence of each qbo_id"""
+        # A single upsert statement cannot touch the same row twice
+        entities = {}
+        with self._phase("validate"):
+            for entity_data in entities_data:
+                entity = self.descriptor.validate(entity_data)
+                entities[entity.qbo_id] = entity
+
+        return list(entities.values())
+
+    @staticmethod
+    def _content_hash(entity: BaseModel) -> str:
+        """Hash the synced fields of an entity to detect unchanged rows"""
+        return hashlib.blake2b(entity.model_dump_json().encode(), digest_size=16).hexdigest()
+
+    def _build_upsert_statement(self, rows: List[Dict[str, Any]]):
+        """Build an INSERT ... ON CONFLICT (realm_id, qbo_id) DO UPDATE statement for a batch of rows"""
+        model = self.descriptor.model
+        statement = insert(model).values(rows)
+        update_columns = {
+            column: statement.excluded[column]
+            for column in self.descriptor.columns + ['content_hash']
+            if column != 'qbo_id'
+        }
+        # An entity seen upstream again is no longer deleted
+        update_columns['deleted_at'] = None
+        # xmax is zero only for freshly inserted tuples, which tells inserts and updates apart.
+        # Unchanged live rows are not rewritten, so they are missing from RETURNING.
+        return statement.on_conflict_do_update(
+            index_elements=[model.realm_id, model.qbo_id],
+            set_=update_columns,
+            where=model.content_hash.is_distinct_from(statement.excluded.content_hash)
+            | model.deleted_at.is_not(None)
+        ).returning(literal_column("xmax = 0").label("inserted"))
+
+    def _save_to_db(self, entities: List[BaseModel]) -> tuple[int, int, int]:
+        """Upsert entities in batches and return the number of inserted, updated and unchanged rows; the caller commits"""
+        inserted_count = 0
+        updated_count = 0
+        unchanged_count = 0
+        batch_size = settings.UPSERT_BATCH_SIZE
+
+        for start in range(0, len(entities), batch_size):
+            with self._phase("diff"):
+                rows = [
+                    {'realm_id': self.realm_id, **entity.model_dump(), 'content_hash': self._content_hash(entity)}
+                    for entity in entities[start:start + batch_size]
+                ]
+            with self._phase("write"):
+                result = self.db.execute(self._build_upsert_statement(rows))
+                written = 0
+                for inserted in result.scalars():
+                    written += 1
+                    if inserted:
+                        inserted_count += 1
+                    else:
+                        updated_count += 1
+            unchanged_count += len(rows) - written
+
+        self._count_rows(inserted=inserted_count, updated=updated_count, unchanged=unchanged_count)
+        return inserted_count, updated_count, unchanged_count
+
+    @staticmethod
+    def _copy_value(value: Any) -> str:
+        """Encode a value for PostgreSQL COPY text format"""
+        if value is None:
+            return "\\N"
+        if isinstance(value, bool):
+            return "t" if value else "f"
+        return (
+            str(value)
+            .replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+        )
+
+    @property
+    def _staging_table(self) -> str:
+        """Table full syncs are copied into, shared by every realm"""
+        return f"{self.descriptor.model.__tablename__}_staging"
+
+    def _column_types(self, table: str) -> List[tuple[str, str]]:
+        """Names and types of the columns of a table, in order, or nothing when it does not exist"""
+        return [tuple(row) for row in self.db.execute(text("""
+            SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute
+            WHERE attrelid = to_regclass(:table) AND attnum > 0 AND NOT attisdropped
+            ORDER BY attnum
+        """), {"table": table})]
+
+    def _create_staging_table(self):
+        """Create the staging table, recreating it when the entity table's synced columns changed.
+
+        The table is unlogged, so Postgres empties it when recovering from a crash; _full_sync
+        notices the missing rows and restages from the first page.
+        """
+        staging = self._staging_table
+        # Realms sync concurrently, and CREATE ... IF NOT EXISTS is not safe against itself
+        self.db.execute(select(func.pg_advisory_xact_lock(func.hashtext(staging))))
+        staged_columns = self._column_types(staging)
+        column_types = dict(self._column_types(self.descriptor.model.__tablename__))
+        expected_columns = [
+            (column, column_types.get(column)) for column in ['realm_id', *self.descriptor.columns, 'content_hash']
+        ]
+        if staged_columns and staged_columns != expected_columns:
+            # No migration manages the staging table, so it follows the entity table here. Syncs of
+            # other realms staging into it at the time lose their rows and restage them on resume.
+            logger.info(f"Recreating {staging} to match the columns of {self.descriptor.model.__tablename__}")
+            self.db.execute(text(f"DROP TABLE {staging}"))
+        self.db.execute(text(f"""
+            CREATE UNLOGGED TABLE IF NOT EXISTS {staging} AS
+            SELECT realm_id, {', '.join(self.descriptor.columns)}, content_hash
+            FROM {self.descriptor.model.__tablename__} WITH NO DATA
+        """))
+        self.db.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{staging}_realm_id_qbo_id ON {staging} (realm_id, qbo_id)"))
+
+    def _copy_to_staging(self, entities: List[BaseModel]):
+        """Stream a batch of validated entities into the staging table with COPY"""
+        columns = self.descriptor.columns
+        realm_id = self._copy_value(self.realm_id)
+        buffer = io.StringIO()
+        for entity in entities:
+            row = entity.model_dump()
+            buffer.write(realm_id)
+            for column in columns:
+                buffer.write("\t")
+                buffer.write(self._copy_value(row[column]))
+            buffer.write("\t")
+            buffer.write(self._content_hash(entity))
+            buffer.write("\n")
+        buffer.seek(0)
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {self._staging_table} (realm_id, {', '.join(columns)}, content_hash) FROM STDIN",
+                buffer
+            )
+        finally:
+            cursor.close()
+
+    def _merge_staged(self, sync_time: datetime) -> tuple[int, int, int, int]:
+        """Merge the realm's staged rows into the entity table and flag entities missing upstream as deleted.
+
+        Returns the number of inserted, updated, unchanged and deleted entities.
+        """
+        table = self.descriptor.model.__tablename__
+        staging = self._staging_table
+        synced_columns = self.descriptor.columns + ['content_hash']
+        columns = ", ".join(synced_columns)
+        update_columns = ", ".join(f"{column} = EXCLUDED.{column}" for column in synced_columns if column != 'qbo_id')
+        params = {"sync_time": sync_time, "realm_id": self.realm_id}
+        result = self.db.execute(text(f"""
+            INSERT INTO {table} (realm_id, {columns})
+            SELECT DISTINCT ON (qbo_id) realm_id, {columns} FROM {staging} WHERE realm_id = :realm_id ORDER BY qbo_id
+            ON CONFLICT (realm_id, qbo_id) DO UPDATE SET {update_columns}, deleted_at = NULL
+            WHERE {table}.content_hash IS DISTINCT FROM EXCLUDED.content_hash OR {table}.deleted_at IS NOT NULL
+            RETURNING xmax = 0
+        """), params)
+        inserted_flags = result.scalars().all()
+        inserted_count = sum(1 for inserted in inserted_flags if inserted)
+
+        deleted_count = self.db.execute(text(f"""
+            UPDATE {table} SET deleted_at = :sync_time
+            WHERE realm_id = :realm_id AND deleted_at IS NULL
+            AND NOT EXISTS (
+                SELECT 1 FROM {staging} WHERE {staging}.realm_id = :realm_id AND {staging}.qbo_id = {table}.qbo_id
+            )
+        """), params).rowcount
+
+        staged_count = self.db.execute(
+            text(f"SELECT count(DISTINCT qbo_id) FROM {staging} WHERE realm_id = :realm_id"), params
+        ).scalar()
+        self.db.execute(text(f"DELETE FROM {staging} WHERE realm_id = :realm_id"), params)
+        updated_count = len(inserted_flags) - inserted_count
+        return inserted_count, updated_count, staged_count - len(inserted_flags), deleted_count
+
+    def _full_sync(self, checkpoint: Dict[str, Any]) -> Dict[str, Any]:
+        """Load every entity through the COPY-fed staging table and merge it in one statement.
+
+        Every staged page is committed with a checkpoint, so an interrupted sync resumes at the
+        next page. Returns the final checkpoint; the merge is committed by the caller.
+        """
+        sync_time = datetime.utcnow()
+        self._create_staging_table()
+        params = {"realm_id": self.realm_id}
+        staged_count = self.db.execute(
+            text(f"SELECT count(*) FROM {self._staging_table} WHERE realm_id = :realm_id"), params
+        ).scalar()
+        # The checkpoint outlives the staged rows when a crash empties the unlogged table or it is recreated
+        if checkpoint["position"] > 1 and staged_count != checkpoint.get("staged", checkpoint["position"] - 1):
+            logger.warning(
+                f"Staged {self.label} for realm {self.realm_id} were lost, restarting the full sync from the first page"
+            )
+            checkpoint = {**checkpoint, "position": 1, "watermark": None, "staged": 0}
+        if checkpoint["position"] == 1:
+            # Rows left behind by an abandoned sync would count as seen upstream
+            self.db.execute(text(f"DELETE FROM {self._staging_table} WHERE realm_id = :realm_id"), params)
+        self._commit()
+
+        for entities_data in self._fetch_pages(None, start_position=checkpoint["position"]):
+            entities = self._process(entities_data)
+            with self._phase("write"):
+                self._copy_to_staging(entities)
+            staged = checkpoint.get("staged", checkpoint["position"] - 1) + len(entities)
+            checkpoint = {**self._advance(checkpoint, entities_data, changed=False), "staged": staged}
+            self._save_checkpoint(checkpoint)
+            self._commit()
+
+        # The merge compares staged hashes against the table and writes only what differs
+        with self._phase("diff"):
+            inserted_count, updated_count, unchanged_count, deleted_count = self._merge_staged(sync_time)
+        self._count_rows(
+            inserted=inserted_count, updated=updated_count, unchanged=unchanged_count, deleted=deleted_count
+        )
+        logger.info(
+            f"Full {self.descriptor.entity_type} sync for realm {self.realm_id} staged "
+            f"{checkpoint['position'] - 1} {self.label}: {inserted_count} inserted, {updated_count} updated, "
+            f"{unchanged_count} unchanged, {deleted_count} flagged as deleted"
+        )
+        return {**checkpoint, "changed": bool(inserted_count or updated_count or deleted_count)}
+
+    def _orphans(self, entities: List[BaseModel]) -> set:
+        """qbo_ids of entities whose parent is neither among them nor stored, directly or through another orphan"""
+        parent_column = self.descriptor.parent_column
+        if not parent_column:
+            return set()
+        parent_ids = {getattr(entity, parent_column) for entity in entities} - {None}
+        parent_ids -= {entity.qbo_id for entity in entities}
+        if parent_ids:
+            model = self.descriptor.model
+            parent_ids -= set(self.db.execute(
+                select(model.qbo_id).where(model.realm_id == self.realm_id, model.qbo_id.in_(parent_ids))
+            ).scalars())
+        orphans = set()
+        while True:
+            missing = parent_ids | orphans
+            found = {entity.qbo_id for entity in entities if getattr(entity, parent_column) in missing} - orphans
+            if not found:
+                return orphans
+            orphans |= found
+
+    def _paged_sync(self, checkpoint: Dict[str, Any]) -> Dict[str, Any]:
+        """Upsert entities page by page, committing each page with a checkpoint to resume from"""
+        since = checkpoint["since"]
+        inserted_count = 0
+        updated_count = 0
+        unchanged_count = 0
+        # Entities whose parent comes on a later page wait in the checkpoint, as the parent check runs at each commit
+        held = checkpoint.get("held", [])
+        # Each page is written as soon as it arrives, so only one page is held in memory
+        for entities_data in self._fetch_pages(since, start_position=checkpoint["position"]):
+            entities = self._process(held + entities_data)
+            orphans = self._orphans(entities)
+            held = list({
+                entity_data['Id']: entity_data for entity_data in held + entities_data if entity_data['Id'] in orphans
+            }.values())
+            inserted, updated, unchanged = self._save_to_db(
+                [entity for entity in entities if entity.qbo_id not in orphans]
+            )
+            inserted_count += inserted
+            updated_count += updated
+            unchanged_count += unchanged
+            checkpoint = {**self._advance(checkpoint, entities_data, changed=bool(inserted or updated)), "held": held}
+            self._save_checkpoint(checkpoint)
+            self._commit()
+
+        if held:
+            # Parents still missing upstream fail the commit of the finished sync, as they would have anyway
+            inserted, updated, unchanged = self._save_to_db(self._process(held))
+            inserted_count += inserted
+            updated_count += updated
+            unchanged_count += unchanged
+            checkpoint = {**checkpoint, "changed": checkpoint["changed"] or bool(inserted or updated), "held": []}
+
+        if inserted_count or updated_count or unchanged_count:
+            logger.info(
+                f"Synced {self.label} for realm {self.realm_id}: {inserted_count} inserted, {updated_count} updated, "
+                f"{unchanged_count} unchanged"
+            )
+        else:
+            logger.info(f"No {self.label} updated since {since}")
+        return checkpoint
+
+    def sync(self, full: bool = False, wait: bool = True) -> bool:
+        """Sync the realm's entities unless another sync already covers this call.
+
+        Only one sync per realm and entity runs at a time across threads, workers and pods. With
+        wait=True callers queue behind a running sync and skip their own if it finished while they
+        waited; with wait=False they return immediately. Returns whether this call ran the sync.
+        """
+        if not self.realm_id:
+            raise HTTPException(400, f"realm_id is required to sync {self.label}")
+
+        requested_at = datetime.utcnow()
+        lock_name = f'sync:{self.descriptor.entity_type}:{self.realm_id}'
+        with single_flight(self.db.get_bind(), lock_name, blocking=wait) as acquired:
+            if not acquired:
+                logger.info(f"{self.label.capitalize()} sync for realm {self.realm_id} already in progress, skipping")
+                return False
+
+            last_sync_time = self.last_sync_time
+            if not full and last_sync_time and last_sync_time >= requested_at:
+                logger.info(f"{self.label.capitalize()} for realm {self.realm_id} were synced while waiting, skipping")
+                return False
+
+            self._sync(full)
+            return True
+
+    def _cdc_sync(self, changed_since: str) -> Optional[tuple[bool, Optional[str], Optional[str]]]:
+        """Apply the changes and deletions reported by the CDC endpoint since changed_since.
+
+        Returns whether entities changed, the cursor to resume from and the latest change seen,
+        or None when the response was truncated and only a full sync can catch up.
+        """
+        entities_data, cdc_cursor = self._fetch_changes(changed_since)
+        if len(entities_data) >= settings.QBO_CDC_MAX_RESULTS:
+            return None
+
+        deleted_ids = [entity['Id'] for entity in entities_data if entity.get('status') == 'Deleted']
+        entities = self._process([entity for entity in entities_data if entity.get('status') != 'Deleted'])
+        inserted_count, updated_count, unchanged_count = self._save_to_db(entities)
+        deleted_count = self._soft_delete(deleted_ids)
+        logger.info(
+            f"Applied {self.descriptor.entity_type} changes since {changed_since} for realm {self.realm_id}: "
+            f"{inserted_count} inserted, {updated_count} updated, {unchanged_count} unchanged, "
+            f"{deleted_count} flagged as deleted"
+        )
+        changed = bool(inserted_count or updated_count or deleted_count)
+        return changed, cdc_cursor, self._latest_update(entities_data)
+
+    @staticmethod
+    def _cdc_cursor_usable(cdc_cursor: str) -> bool:
+        """Check the cursor is within the window the CDC endpoint can look back over"""
+        changed_since = datetime.fromisoformat(cdc_cursor)
+        if changed_since.tzinfo is None:
+            changed_since = changed_since.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - changed_since < timedelta(days=settings.QBO_CDC_MAX_LOOKBACK_DAYS)
+
+    def _sync(self, full: bool = False):
+        """Sync entities from QuickBooks to database, resyncing everything when full or never synced"""
+        logger.info(f"Syncing {self.label} for realm {self.realm_id}...")
+        checkpoint = self.checkpoint
+        # A full sync supersedes an interrupted incremental one, but not the other way round
+        if checkpoint and (checkpoint["since"] is None or not full):
+            logger.info(
+                f"Resuming interrupted {self.descriptor.entity_type} sync for realm {self.realm_id} "
+                f"at position {checkpoint['position']}"
+            )
+            self._run_pages(checkpoint)
+            return
+
+        # Pages only reflect upstream changes made after the sync started, so that is where CDC resumes
+        started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        since = None
+        if not full and self.last_sync_time:
+            if settings.SYNC_USE_CDC:
+                changed_since = self._changed_since()
+                if self._cdc_cursor_usable(changed_since):
+                    result = self._cdc_sync(changed_since)
+                    if result is not None:
+                        self._finish_sync(*result)
+                        return
+                    logger.warning(
+                        f"Too many {self.descriptor.entity_type} changes for realm {self.realm_id} to capture, "
+                        "running a full sync"
+                    )
+                else:
+                    logger.info(
+                        f"{self.descriptor.entity_type.capitalize()} changes for realm {self.realm_id} are too old "
+                        "to capture, running a full sync"
+                    )
+            else:
+                since = self._since()
+
+        self._run_pages({"since": since, "position": 1, "watermark": None, "changed": False, "started_at": started_at})
+
+    def _run_pages(self, checkpoint: Dict[str, Any]):
+        """Fetch every page from the checkpoint on, then resume CDC from when the sync first started"""
+        if checkpoint["since"] is None and settings.FULL_SYNC_USE_COPY:
+            checkpoint = self._full_sync(checkpoint)
+        else:
+            checkpoint = self._paged_sync(checkpoint)
+        # Checkpoints written before started_at was recorded leave the cursor where it was
+        self._finish_sync(checkpoint["changed"], checkpoint.get("started_at"), checkpoint["watermark"])
+
+    def _after_write(self):
+        """Bring state derived from the entity table up to date before the sync commits"""
+
+    def _finish_sync(self, changed: bool, cdc_cursor: Optional[str] = None, watermark: Optional[str] = None):
+        """Update derived state and record the sync in one commit"""
+        if changed:
+            self._after_write()
+        self.update_last_sync_time(datetime.utcnow(), changed=changed, cdc_cursor=cdc_cursor, watermark=watermark)
+
+    def _soft_delete(self, qbo_ids) -> int:
+        """Flag the given live entities as deleted and return how many were flagged; the caller commits"""
+        if not qbo_ids:
+            return 0
+        model = self.descriptor.model
+        deleted_count = self.db.query(model).filter(
+            model.realm_id == self.realm_id,
+            model.qbo_id.in_(qbo_ids),
+            model.deleted_at.is_(None)
+        ).update({model.deleted_at: datetime.utcnow()}, synchronize_session=False)
+        self._count_rows(deleted=deleted_count)
+        return deleted_count
+
+    def apply_changes(self, qbo_ids: List[str]) -> bool:
+        """Fetch just the given entities and upsert them, flagging those QuickBooks no longer returns as deleted.
+
+        The caller holds the realm's sync lock. Returns whether any entity was written.
+        """
+        entities = []
+        for start in range(0, len(qbo_ids), settings.QBO_PAGE_SIZE):
+            entities += self._process(self._fetch_by_id(qbo_ids[start:start + settings.QBO_PAGE_SIZE]))
+        inserted_count, updated_count, unchanged_count = self._save_to_db(entities)
+
+        deleted_count = self._soft_delete(set(qbo_ids) - {entity.qbo_id for entity in entities})
+
+        changed = bool(inserted_count or updated_count or deleted_count)
+        logger.info(
+            f"Applied {len(qbo_ids)} {self.descriptor.entity_type} changes for realm {self.realm_id}: "
+            f"{inserted_count} inserted, {updated_count} updated, {unchanged_count} unchanged, "
+            f"{deleted_count} flagged as deleted"
+        )
+        if changed:
+            self._after_write()
+        # last_sync_at is left alone: polling still has to catch changes no webhook announced. A realm that
+        # has not synced yet gets its sync log row here, so the version, and with it the ETag, still moves.
+        self._commit_changes(self._sync_log() if changed else None, changed)
+        return changed
+
+    def should_sync(self, max_age: timedelta = timedelta(hours=1)) -> bool:
+        """Check if entities need to be synced (older than max_age)"""
+        logger.info(f"Checking if {self.label} need to be synced...")
+        last_sync = self.last_sync_time
+        if not last_sync:
+            return True
+
+        return datetime.utcnow() - last_sync > max_age
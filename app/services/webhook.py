@@ -0,0 +1,222 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from database import SessionLocal
+from models.webhook import PendingAccountChange
+from schemas.webhook import WebhookPayloadSchema
+from services.account import AccountService
+from services.auth import AuthService
+from utils.http import get_http_client
+from utils.locks import single_flight
+from utils.logger import logger
+
+# Claims a batch of one realm's changes that failed as many times as asked; SKIP LOCKED lets every
+# worker's batcher drain the queue at once
+CLAIM_CHANGES_SQL = text("""
+    DELETE FROM pending_account_changes
+    WHERE id IN (
+        SELECT id FROM pending_account_changes
+        WHERE realm_id = :realm_id AND attempts >= :min_attempts AND attempts < :max_attempts AND id > :after_id
+        ORDER BY id
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, qbo_id
+""")
+# Counts a failed attempt on changes whose claim was rolled back
+RECORD_FAILURE_SQL = text("""
+    UPDATE pending_account_changes SET attempts = attempts + 1
+    WHERE id = ANY(:ids)
+    RETURNING qbo_id, attempts
+""")
+
+
+def verify_signature(body: bytes, signature: Optional[str], verifier_token: Optional[str] = None) -> bool:
+    """Check the intuit-signature header: a base64 HMAC-SHA256 of the raw body keyed by the verifier token"""
+    verifier_token = verifier_token if verifier_token is not None else settings.QBO_WEBHOOK_VERIFIER_TOKEN
+    if not signature or not verifier_token:
+        return False
+    expected = base64.b64encode(hmac.new(verifier_token.encode(), body, hashlib.sha256).digest()).decode()
+    return hmac.compare_digest(expected, signature)
+
+
+class AsyncWebhookService:
+    """Queue the accounts QuickBooks webhooks report as changed"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def enqueue(self, payload: WebhookPayloadSchema) -> int:
+        """Queue every changed account in the payload and return how many were queued"""
+        received_at = datetime.utcnow()
+        # One row per account: a statement cannot upsert the same row twice
+        changes = {
+            (notification.realmId, entity.id): {
+                "realm_id": notification.realmId,
+                "qbo_id": entity.id,
+                "operation": entity.operation,
+                "received_at": received_at
+            }
+            for notification in payload.eventNotifications
+            for entity in notification.dataChangeEvent.entities
+            if entity.name == "Account"
+        }
+        if not changes:
+            return 0
+
+        statement = insert(PendingAccountChange).values(list(changes.values()))
+        await self.db.execute(statement.on_conflict_do_update(
+            index_elements=[PendingAccountChange.realm_id, PendingAccountChange.qbo_id],
+            # A new change gets a fresh set of attempts, even if an earlier one was set aside
+            set_={"operation": statement.excluded.operation, "received_at": statement.excluded.received_at, "attempts": 0}
+        ))
+        await self.db.commit()
+        return len(changes)
+
+
+class WebhookBatcher:
+    """Apply queued webhook changes in batches, fetching only the accounts that changed"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        interval: float = settings.WEBHOOK_BATCH_INTERVAL_SECONDS,
+        batch_size: int = settings.WEBHOOK_BATCH_SIZE,
+        retries_per_batch: int = settings.WEBHOOK_RETRIES_PER_BATCH,
+        max_attempts: int = settings.WEBHOOK_MAX_ATTEMPTS
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.retries_per_batch = retries_per_batch
+        self.max_attempts = max_attempts
+        self._task: Optional[asyncio.Task] = None
+
+    def get_pending_realm_ids(self) -> List[str]:
+        """Get the realms with queued changes that have not been set aside"""
+        db = self.session_factory()
+        try:
+            query = db.query(PendingAccountChange.realm_id).filter(PendingAccountChange.attempts < self.max_attempts)
+            return [realm_id for (realm_id,) in query.distinct()]
+        finally:
+            db.close()
+
+    def apply_realm(self, realm_id: str) -> int:
+        """Apply one batch of a realm's new changes, then retry failed ones, and return how many accounts were fetched"""
+        _, applied = self._apply_batch(realm_id, 0, 1, self.batch_size)
+        # One at a time, so a change that keeps failing only ever fails on its own
+        after_id = 0
+        for _ in range(self.retries_per_batch):
+            claimed, retried = self._apply_batch(realm_id, 1, self.max_attempts, 1, after_id)
+            if not claimed:
+                break
+            after_id = claimed[-1]
+            applied += retried
+        return applied
+
+    def _apply_batch(
+        self,
+        realm_id: str,
+        min_attempts: int,
+        max_attempts: int,
+        batch_size: int,
+        after_id: int = 0
+    ) -> Tuple[List[int], int]:
+        """Claim and apply queued changes of a realm that failed min_attempts to max_attempts - 1 times.
+
+        Returns the ids of the claimed queue rows and how many accounts were fetched.
+        """
+        db = self.session_factory()
+        claimed: List[int] = []
+        try:
+            # A running sync holds the realm; its changes stay queued for the next round
+            with single_flight(db.get_bind(), f'sync:account:{realm_id}', blocking=False) as acquired:
+                if not acquired:
+                    return [], 0
+                rows = sorted(db.execute(CLAIM_CHANGES_SQL, {
+                    "realm_id": realm_id,
+                    "min_attempts": min_attempts,
+                    "max_attempts": max_attempts,
+                    "after_id": after_id,
+                    "batch_size": batch_size
+                }).all())
+                if not rows:
+                    db.rollback()
+                    return [], 0
+                claimed = [row.id for row in rows]
+                http_client = get_http_client()
+                account_service = AccountService(db, AuthService(db, http_client), http_client, realm_id)
+                # The claimed rows are deleted in the same transaction as the upsert, so a failed fetch requeues them
+                account_service.apply_changes([row.qbo_id for row in rows])
+                db.commit()
+                return claimed, len(rows)
+        except HTTPException as e:
+            db.rollback()
+            logger.warning(f"Applying account changes for realm {realm_id} skipped: {e.detail}")
+            self._record_failure(db, realm_id, claimed)
+        except Exception:
+            db.rollback()
+            logger.exception(f"Applying account changes for realm {realm_id} failed")
+            self._record_failure(db, realm_id, claimed)
+        finally:
+            db.close()
+        return claimed, 0
+
+    def _record_failure(self, db: Session, realm_id: str, claimed: List[int]):
+        """Count a failed attempt on the requeued changes and log those now set aside"""
+        if not claimed:
+            return
+        try:
+            failed = db.execute(RECORD_FAILURE_SQL, {"ids": claimed}).all()
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception(f"Recording failed account changes for realm {realm_id} failed")
+            return
+        set_aside = sorted(qbo_id for qbo_id, attempts in failed if attempts >= self.max_attempts)
+        if set_aside:
+            logger.error(
+                f"Setting aside account changes {', '.join(set_aside)} for realm {realm_id} after "
+                f"{self.max_attempts} failed attempts; they stay in pending_account_changes until notified again"
+            )
+
+    def run_once(self) -> int:
+        """Apply a batch for every realm with queued changes and return how many accounts were fetched"""
+        return sum(self.apply_realm(realm_id) for realm_id in self.get_pending_realm_ids())
+
+    async def _run(self):
+        """Drain the queue every interval"""
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception:
+                logger.exception("Webhook batch failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start the batcher loop on the running event loop"""
+        if self._task is None:
+            logger.info(f"Starting webhook batcher (every {self.interval}s)")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the batcher loop and wait for it to finish"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
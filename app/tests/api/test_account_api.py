@@ -1,16 +1,25 @@
+import json
+from collections import namedtuple
 from unittest.mock import patch, MagicMock
 from fastapi import HTTPException
 from fastapi.testclient import TestClient
 
 from tests.base import BaseTestCase
-from models.account import Account
+from schemas.account import AccountSchema, AccountTreeSchema
 from main import app
+from utils.cache import account_cache
+
+# Stands in for the column rows AsyncAccountService reads accounts as
+AccountRow = namedtuple("AccountRow", AccountSchema.model_fields, defaults=(None,) * len(AccountSchema.model_fields))
 
 
 class TestAccountAPI(BaseTestCase):
     def setUp(self):
         super().setUp()
         self.client = TestClient(app)
+        etag_patcher = patch('services.account.AsyncAccountService.accounts_etag', return_value='W/"v1"')
+        self.mock_accounts_etag = etag_patcher.start()
+        self.addCleanup(etag_patcher.stop)
 
     def test_health_check(self):
         """Test health check endpoint"""
@@ -18,12 +27,12 @@ class TestAccountAPI(BaseTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), {"status": "healthy"})
 
-    @patch('services.account.AccountService.get_accounts_with_sync')
+    @patch('services.account.AsyncAccountService.get_accounts')
     def test_get_accounts_no_filter(self, mock_get_accounts):
         """Test get accounts endpoint without name prefix filter"""
         # Create test accounts
         accounts = [
-            Account(
+            AccountRow(
                 id=1,
                 qbo_id="1",
                 name="Test Account 1",
@@ -32,7 +41,7 @@ class TestAccountAPI(BaseTestCase):
                 active=True,
                 current_balance=1000.0
             ),
-            Account(
+            AccountRow(
                 id=2,
                 qbo_id="2",
                 name="Test Account 2",
@@ -53,14 +62,14 @@ class TestAccountAPI(BaseTestCase):
         self.assertEqual(len(data), 2)
         self.assertEqual(data[0]["name"], "Test Account 1")
         self.assertEqual(data[1]["name"], "Test Account 2")
-        mock_get_accounts.assert_called_once_with(None, None)
+        mock_get_accounts.assert_called_once_with(None, q=None, fuzzy=False, after=None, limit=None)
 
-    @patch('services.account.AccountService.get_accounts_with_sync')
+    @patch('services.account.AsyncAccountService.get_accounts')
     def test_get_accounts_with_filter(self, mock_get_accounts):
         """Test get accounts endpoint with name prefix filter"""
         # Create test accounts
         accounts = [
-            Account(
+            AccountRow(
                 id=1,
                 qbo_id="1",
                 name="Asset Account",
@@ -80,9 +89,163 @@ class TestAccountAPI(BaseTestCase):
         data = response.json()
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]["name"], "Asset Account")
-        mock_get_accounts.assert_called_once_with("Asset", None)
+        mock_get_accounts.assert_called_once_with("Asset", q=None, fuzzy=False, after=None, limit=None)
+
+    @patch('services.account.AsyncAccountService.get_accounts')
+    def test_get_accounts_with_search(self, mock_get_accounts):
+        """Test get accounts endpoint with substring and fuzzy search"""
+        mock_get_accounts.return_value = []
+
+        response = self.client.get("/accounts?q=check&fuzzy=true")
+
+        self.assertEqual(response.status_code, 200)
+        mock_get_accounts.assert_called_once_with(None, q="check", fuzzy=True, after=None, limit=None)
+
+    def _account(self, id, name):
+        """Build a listing row with the fields the response requires"""
+        return AccountRow(
+            id=id, qbo_id=str(id), name=name, classification="Asset",
+            account_type="Bank", active=True, current_balance=0.0
+        )
+
+    @patch('services.account.AsyncAccountService.get_accounts')
+    def test_get_accounts_page_link(self, mock_get_accounts):
+        """Test a full page links to the next page through the after cursor"""
+        mock_get_accounts.return_value = [
+            self._account(7, "Test Account 7"),
+            self._account(9, "Test Account 9")
+        ]
+
+        response = self.client.get("/accounts?limit=2")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.links["next"]["url"], "http://testserver/accounts?limit=2&after=9")
+        mock_get_accounts.assert_called_once_with(None, q=None, fuzzy=False, after=None, limit=2)
+
+    @patch('services.account.AsyncAccountService.get_accounts')
+    def test_get_accounts_last_page(self, mock_get_accounts):
+        """Test a partial page has no next link"""
+        mock_get_accounts.return_value = [self._account(9, "Test Account 9")]
+
+        response = self.client.get("/accounts?limit=2&after=7")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Link", response.headers)
+        mock_get_accounts.assert_called_once_with(None, q=None, fuzzy=False, after=7, limit=2)
+
+    def test_get_accounts_limit_out_of_range(self):
+        """Test limit must be between 1 and the maximum page size"""
+        self.assertEqual(self.client.get("/accounts?limit=0").status_code, 422)
+        self.assertEqual(self.client.get("/accounts?limit=100000").status_code, 422)
+
+    def _stream_of(self, accounts):
+        """Return a stream_accounts replacement yielding accounts"""
+        async def stream():
+            for account in accounts:
+                yield account
+        return MagicMock(return_value=stream())
+
+    @patch('services.account.AsyncAccountService.sync_if_requested')
+    def test_get_accounts_stream_ndjson(self, mock_sync):
+        """Test stream=ndjson sends one account per line"""
+        accounts = [self._account(1, "Test Account 1"), self._account(2, "Test Account 2")]
+
+        with patch('services.account.AsyncAccountService.stream_accounts', self._stream_of(accounts)) as mock_stream:
+            response = self.client.get("/accounts?stream=ndjson&from_api=true")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual([line["name"] for line in lines], ["Test Account 1", "Test Account 2"])
+        mock_sync.assert_called_once_with("true")
+        mock_stream.assert_called_once_with(None, q=None, fuzzy=False, after=None, limit=None)
+
+    @patch('services.account.AsyncAccountService.sync_if_requested')
+    def test_get_accounts_stream_json(self, mock_sync):
+        """Test stream=json sends a single JSON array, including when empty"""
+        accounts = [self._account(1, "Test Account 1"), self._account(2, "Test Account 2")]
+
+        with patch('services.account.AsyncAccountService.stream_accounts', self._stream_of(accounts)):
+            response = self.client.get("/accounts?stream=json")
+        with patch('services.account.AsyncAccountService.stream_accounts', self._stream_of([])):
+            empty = self.client.get("/accounts?stream=json")
+
+        self.assertEqual([account["qbo_id"] for account in response.json()], ["1", "2"])
+        self.assertEqual(empty.json(), [])
+
+    @patch('services.account.AsyncAccountService.get_accounts')
+    def test_get_accounts_cache_headers(self, mock_get_accounts):
+        """Test listings carry the sync version ETag and revalidation policy"""
+        mock_get_accounts.return_value = []
+
+        response = self.client.get("/accounts")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["ETag"], 'W/"v1"')
+        self.assertIn("must-revalidate", response.headers["Cache-Control"])
+
+    @patch('services.account.AsyncAccountService.get_accounts')
+    def test_get_accounts_not_modified(self, mock_get_accounts):
+        """Test a matching If-None-Match gets a 304 without reading accounts"""
+        for if_none_match in ['W/"v1"', '"v1"', 'W/"v0", W/"v1"', '*']:
+            response = self.client.get("/accounts", headers={"If-None-Match": if_none_match})
+
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.headers["ETag"], 'W/"v1"')
+            self.assertEqual(response.content, b"")
+        mock_get_accounts.assert_not_called()
 
-    @patch('services.account.AccountService.get_accounts_with_sync')
+    @patch('services.account.AsyncAccountService.get_accounts')
+    def test_get_accounts_modified(self, mock_get_accounts):
+        """Test a stale If-None-Match gets the full listing"""
+        mock_get_accounts.return_value = [self._account(1, "Test Account 1")]
+
+        response = self.client.get("/accounts", headers={"If-None-Match": 'W/"v0"'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+    @patch('services.account.AsyncAccountService.get_accounts')
+    def test_get_accounts_served_from_cache(self, mock_get_accounts):
+        """Test a repeated listing is served from the response cache"""
+        mock_get_accounts.return_value = [self._account(1, "Test Account 1")]
+
+        first = self.client.get("/accounts?name_prefix=test")
+        second = self.client.get("/accounts?name_prefix=test")
+        revalidated = self.client.get("/accounts?name_prefix=test", headers={"If-None-Match": first.headers["ETag"]})
+
+        self.assertEqual(first.headers["X-Cache"], "MISS")
+        self.assertEqual(second.headers["X-Cache"], "HIT")
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(revalidated.status_code, 304)
+        mock_get_accounts.assert_called_once()
+        self.mock_accounts_etag.assert_called_once()
+        stats = self.client.get("/accounts/cache").json()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+
+    @patch('services.account.AsyncAccountService.get_accounts')
+    def test_get_accounts_cache_keyed_by_filters(self, mock_get_accounts):
+        """Test listings with different filters are cached separately"""
+        mock_get_accounts.return_value = []
+
+        self.client.get("/accounts?name_prefix=a")
+        self.client.get("/accounts?name_prefix=b")
+
+        self.assertEqual(mock_get_accounts.call_count, 2)
+
+    @patch('services.account.AsyncAccountService.get_accounts')
+    def test_get_accounts_cache_invalidated(self, mock_get_accounts):
+        """Test a sync commit invalidates cached listings"""
+        mock_get_accounts.return_value = []
+
+        self.client.get("/accounts")
+        account_cache.invalidate("test_realm_id")
+        response = self.client.get("/accounts")
+
+        self.assertEqual(response.headers["X-Cache"], "MISS")
+        self.assertEqual(mock_get_accounts.call_count, 2)
+
+    @patch('services.account.AsyncAccountService.get_accounts')
     def test_get_accounts_empty_response(self, mock_get_accounts):
         """Test get accounts endpoint when no accounts are found"""
         mock_get_accounts.return_value = []
@@ -94,9 +257,9 @@ class TestAccountAPI(BaseTestCase):
         self.assertEqual(response.status_code, 200)
         data = response.json()
         self.assertEqual(len(data), 0)
-        mock_get_accounts.assert_called_once_with(None, None)
+        mock_get_accounts.assert_called_once_with(None, q=None, fuzzy=False, after=None, limit=None)
 
-    @patch('services.account.AccountService.get_accounts_with_sync')
+    @patch('services.account.AsyncAccountService.get_accounts')
     def test_get_accounts_error(self, mock_get_accounts):
         """Test get accounts endpoint when service raises an error"""
         mock_get_accounts.side_effect = HTTPException(400, "Failed to fetch accounts")
@@ -108,14 +271,59 @@ class TestAccountAPI(BaseTestCase):
         self.assertEqual(response.status_code, 400)
         self.assertIn("Failed to fetch accounts", response.json()["detail"])
 
-    @patch('services.account.AccountService.get_accounts_with_sync')
-    def test_get_accounts_sync_error(self, mock_get_accounts):
+    @patch('services.account.AsyncAccountService.sync_if_requested')
+    def test_get_accounts_sync_error(self, mock_sync):
         """Test get accounts endpoint when sync fails"""
-        mock_get_accounts.side_effect = HTTPException(500, "Sync failed")
+        mock_sync.side_effect = HTTPException(500, "Sync failed")
 
         # Make request
-        response = self.client.get("/accounts")
+        response = self.client.get("/accounts?from_api=true")
         
         # Verify response
         self.assertEqual(response.status_code, 500)
-        self.assertIn("Sync failed", response.json()["detail"]) 
\ No newline at end of file
+        self.assertIn("Sync failed", response.json()["detail"]) 
+    @patch('services.hierarchy.AsyncHierarchyService.get_tree')
+    def test_get_account_tree(self, mock_get_tree):
+        """Test account tree endpoint returns nested accounts with rolled-up balances"""
+        child = AccountTreeSchema(id=2, qbo_id="2", name="Bank", current_balance=100.0, total_balance=100.0)
+        mock_get_tree.return_value = [
+            AccountTreeSchema(id=1, qbo_id="1", name="Assets", current_balance=0.0, total_balance=100.0, children=[child])
+        ]
+
+        response = self.client.get("/accounts/tree?realm_id=test_realm_id")
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data[0]["total_balance"], 100.0)
+        self.assertEqual(data[0]["children"][0]["name"], "Bank")
+
+    @patch('services.hierarchy.AsyncHierarchyService.get_subtree')
+    def test_get_account_subtree(self, mock_get_subtree):
+        """Test account subtree endpoint returns the account with its descendants"""
+        mock_get_subtree.return_value = AccountTreeSchema(id=2, qbo_id="2", name="Bank", total_balance=100.0)
+
+        response = self.client.get("/accounts/2/subtree?realm_id=test_realm_id")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["qbo_id"], "2")
+        mock_get_subtree.assert_called_once_with("2")
+
+    @patch('services.hierarchy.AsyncHierarchyService.get_ancestors')
+    def test_get_account_ancestors(self, mock_get_ancestors):
+        """Test account ancestors endpoint returns the lineage of the account"""
+        mock_get_ancestors.return_value = [self._account(1, "Assets")]
+
+        response = self.client.get("/accounts/4/ancestors?realm_id=test_realm_id")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([account["name"] for account in response.json()], ["Assets"])
+        mock_get_ancestors.assert_called_once_with("4")
+
+    @patch('services.hierarchy.AsyncHierarchyService.get_ancestors')
+    def test_get_account_ancestors_not_found(self, mock_get_ancestors):
+        """Test account ancestors endpoint when the account does not exist"""
+        mock_get_ancestors.side_effect = HTTPException(404, "Account not found")
+
+        response = self.client.get("/accounts/99/ancestors?realm_id=test_realm_id")
+
+        self.assertEqual(response.status_code, 404)
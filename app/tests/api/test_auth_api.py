@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from tests.base import BaseTestCase
+from models.auth import Token
+
+
+class TestAuthAPI(BaseTestCase):
+    @patch('services.auth.AsyncAuthService.exchange_code')
+    def test_callback(self, mock_exchange_code):
+        """Test callback exchanges the code and returns the new token"""
+        mock_exchange_code.return_value = Token(
+            access_token='new_access_token',
+            refresh_token='new_refresh_token',
+            realm_id='test_realm_id',
+            expires_at=datetime.utcnow() + timedelta(hours=1)
+        )
+
+        response = self.client.get("/callback?code=auth_code&realmId=test_realm_id")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["access_token"], "new_access_token")
+        self.assertEqual(response.json()["realm_id"], "test_realm_id")
+        mock_exchange_code.assert_called_once_with("auth_code", "test_realm_id")
+
+    @patch('services.auth.AsyncAuthService.exchange_code')
+    def test_callback_without_code(self, mock_exchange_code):
+        """Test callback rejects a request without an authorization code"""
+        response = self.client.get("/callback?realmId=test_realm_id")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Authorization failed", response.json()["detail"])
+        mock_exchange_code.assert_not_called()
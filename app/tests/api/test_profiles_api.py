@@ -0,0 +1,77 @@
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from services.orchestrator import SyncOrchestrator
+from utils.helpers import get_sync_orchestrator
+from utils.profiling import ProfileStore
+from tests.base import BaseTestCase
+
+HEADERS = {"X-Profile": "secret"}
+
+
+@patch('api.profiles.settings.PROFILING_TOKEN', "secret")
+@patch('api.profiles.settings.PROFILING_ENABLED', True)
+class TestProfilesAPI(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = ProfileStore(self.directory.name)
+        store_patcher = patch('api.profiles.profile_store', self.store)
+        store_patcher.start()
+        self.addCleanup(store_patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+        self.orchestrator = MagicMock(spec=SyncOrchestrator)
+        self.orchestrator.sync_entity.return_value = True
+        self.client.app.dependency_overrides[get_sync_orchestrator] = lambda: self.orchestrator
+
+    def test_profile_sync(self):
+        """Test a sync run is profiled and its profile can be listed and downloaded"""
+        response = self.client.post("/profiles/sync?realm_id=test_realm_id", headers=HEADERS)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["synced"])
+        self.orchestrator.sync_entity.assert_called_once_with("test_realm_id", "account")
+        profile_id = response.json()["profile_id"]
+
+        listing = self.client.get("/profiles", headers=HEADERS)
+        self.assertEqual([profile["profile_id"] for profile in listing.json()], [profile_id])
+
+        download = self.client.get(f"/profiles/{profile_id}", headers=HEADERS)
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(download.headers["Content-Type"], "application/octet-stream")
+
+        report = self.client.get(f"/profiles/{profile_id}?format=text&sort=tottime", headers=HEADERS)
+        self.assertIn("function calls", report.text)
+
+    def test_profile_sync_unknown_entity(self):
+        """Test only synced entity types can be profiled"""
+        response = self.client.post("/profiles/sync?realm_id=test_realm_id&entity_type=bill", headers=HEADERS)
+
+        self.assertEqual(response.status_code, 400)
+        self.orchestrator.sync_entity.assert_not_called()
+
+    def test_profile_sync_while_profiling(self):
+        """Test a sync cannot be profiled while another profile is being captured"""
+        with self.store.capture("GET-accounts"):
+            response = self.client.post("/profiles/sync?realm_id=test_realm_id", headers=HEADERS)
+
+        self.assertEqual(response.status_code, 409)
+        self.orchestrator.sync_entity.assert_not_called()
+
+    def test_profile_not_found(self):
+        """Test unknown profiles are reported as missing"""
+        response = self.client.get("/profiles/20261017T000000-missing-0000abcd", headers=HEADERS)
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_requires_token(self):
+        """Test profiling endpoints refuse requests without the profiling token"""
+        self.assertEqual(self.client.get("/profiles").status_code, 403)
+        self.assertEqual(self.client.get("/profiles", headers={"X-Profile": "guess"}).status_code, 403)
+
+    def test_hidden_when_disabled(self):
+        """Test profiling endpoints do not exist while profiling is disabled"""
+        with patch('api.profiles.settings.PROFILING_ENABLED', False):
+            response = self.client.get("/profiles", headers=HEADERS)
+
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,53 @@
+import base64
+import hashlib
+import hmac
+import json
+from unittest.mock import patch
+
+from tests.base import BaseTestCase
+
+BODY = json.dumps({
+    "eventNotifications": [{
+        "realmId": "test_realm_id",
+        "dataChangeEvent": {"entities": [{"name": "Account", "id": "1", "operation": "Update"}]}
+    }]
+}).encode()
+
+
+def sign(body: bytes) -> str:
+    return base64.b64encode(hmac.new(b"verifier", body, hashlib.sha256).digest()).decode()
+
+
+@patch('services.webhook.settings.QBO_WEBHOOK_VERIFIER_TOKEN', "verifier")
+class TestWebhookAPI(BaseTestCase):
+    @patch('services.webhook.AsyncWebhookService.enqueue')
+    def test_quickbooks_webhook(self, mock_enqueue):
+        """Test a signed notification is queued"""
+        mock_enqueue.return_value = 1
+
+        response = self.client.post("/webhooks/quickbooks", content=BODY, headers={"intuit-signature": sign(BODY)})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"queued": 1})
+        queued_payload = mock_enqueue.call_args.args[0]
+        self.assertEqual(queued_payload.eventNotifications[0].dataChangeEvent.entities[0].id, "1")
+
+    @patch('services.webhook.AsyncWebhookService.enqueue')
+    def test_quickbooks_webhook_invalid_signature(self, mock_enqueue):
+        """Test notifications without a valid signature are rejected"""
+        response = self.client.post("/webhooks/quickbooks", content=BODY, headers={"intuit-signature": sign(b"{}")})
+        missing = self.client.post("/webhooks/quickbooks", content=BODY)
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(missing.status_code, 401)
+        mock_enqueue.assert_not_called()
+
+    @patch('services.webhook.AsyncWebhookService.enqueue')
+    def test_quickbooks_webhook_invalid_payload(self, mock_enqueue):
+        """Test signed bodies that are not notifications are rejected"""
+        body = b'{"eventNotifications": "nope"}'
+
+        response = self.client.post("/webhooks/quickbooks", content=body, headers={"intuit-signature": sign(body)})
+
+        self.assertEqual(response.status_code, 400)
+        mock_enqueue.assert_not_called()
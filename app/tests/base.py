@@ -1,16 +1,22 @@
+import asyncio
 import unittest
 from datetime import datetime, timedelta
 from unittest.mock import MagicMock
+
+import httpx
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 
 from database import Base
 from main import app
-from services.auth import AuthService
+from services.auth import AuthService, token_cache
 from models.auth import Token
 from models.sync import SyncLog
 from config.test_settings import TestSettings
+from utils.cache import account_cache
 from utils.logger import logger
 
 
@@ -24,6 +30,11 @@ class BaseTestCase(unittest.TestCase):
         Base.metadata.create_all(self.engine)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         self.db_session = self.SessionLocal()
+        token_cache.clear()
+        account_cache.clear()
+
+        # Create mock HTTP client
+        self.mock_http_client = MagicMock(spec=httpx.Client)
 
         # Create mock auth service
         logger.debug("Setting up mock auth service")
@@ -57,10 +68,24 @@ class BaseTestCase(unittest.TestCase):
         Base.metadata.drop_all(self.engine)
         app.dependency_overrides = {}
 
-    def create_sync_log(self, hours_ago=2):
+    def run_with_async_session(self, func):
+        """Run the coroutine function func(async_session) against the test database"""
+        async def runner():
+            # NullPool keeps asyncpg connections from outliving the event loop of this call
+            engine = create_async_engine(self.settings.TEST_ASYNC_DB_URL, poolclass=NullPool)
+            try:
+                async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+                    return await func(session)
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(runner())
+
+    def create_sync_log(self, hours_ago=2, realm_id="test_realm_id"):
         """Helper method to create a sync log entry"""
         logger.debug(f"Creating sync log entry from {hours_ago} hours ago")
         sync_log = SyncLog(
+            realm_id=realm_id,
             entity_type="account",
             last_sync_at=datetime.utcnow() - timedelta(hours=hours_ago)
         )
@@ -68,11 +93,11 @@ class BaseTestCase(unittest.TestCase):
         self.db_session.commit()
         return sync_log
 
-    def create_test_account(self, qbo_id="1", name="Test Account"):
+    def create_test_account(self, qbo_id="1", name="Test Account", realm_id="test_realm_id"):
         """Helper method to create a test account"""
         logger.debug(f"Creating test account: {name} (ID: {qbo_id})")
         from models.account import Account
-        account = Account(qbo_id=qbo_id, name=name)
+        account = Account(realm_id=realm_id, qbo_id=qbo_id, name=name)
         self.db_session.add(account)
         self.db_session.commit()
         return account
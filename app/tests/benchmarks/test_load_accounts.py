@@ -0,0 +1,63 @@
+import asyncio
+
+from benchmarks.fake_qbo import FakeChartOfAccounts, FakeQboServer
+from benchmarks.load_accounts import find_regressions, generate_load, percentile, request_params
+from tests.base import BaseTestCase
+
+
+class TestLoadAccounts(BaseTestCase):
+    def test_percentile_nearest_rank(self):
+        """Test percentiles pick the nearest-rank observation"""
+        values = [float(value) for value in range(1, 101)]
+
+        self.assertEqual(percentile(values, 0.50), 50.0)
+        self.assertEqual(percentile(values, 0.99), 99.0)
+        self.assertEqual(percentile([3.0], 0.95), 3.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_name_prefixes_match_the_chart(self):
+        """Test name_prefix requests filter by prefixes of the seeded account names"""
+        chart = FakeChartOfAccounts(300)
+        names = [account["Name"] for account in chart.accounts.values()]
+
+        plain = request_params(chart, "plain", 100, 0)()
+        filtered = [request_params(chart, "name_prefix", 100, 0)() for _ in range(20)]
+
+        self.assertEqual(plain, {"realm_id": "benchmark", "limit": 100})
+        for params in filtered:
+            self.assertEqual(params["limit"], 100)
+            self.assertTrue(any(name.startswith(params["name_prefix"]) for name in names))
+
+    def test_generate_load_counts_errors(self):
+        """Test load runs for its duration and counts failed responses as errors"""
+        # The stand-in only serves QuickBooks paths, so every /accounts request gets a 404
+        server = FakeQboServer(FakeChartOfAccounts(20)).start()
+        host, port = server._server.server_address[:2]
+        try:
+            load = asyncio.run(generate_load(
+                f"http://{host}:{port}", lambda: {"realm_id": "benchmark"}, concurrency=2, duration=0.3, warmup=0.1
+            ))
+        finally:
+            server.stop()
+
+        self.assertGreater(load["requests"], 0)
+        self.assertEqual(load["errors"], load["requests"])
+        self.assertEqual(load["statuses"], {"404": load["requests"]})
+        self.assertLessEqual(load["latency_ms"]["p50"], load["latency_ms"]["p99"])
+
+    def test_find_regressions(self):
+        """Test scenarios losing throughput or p99 latency beyond the tolerance are reported"""
+        baseline = {"results": [
+            {"accounts": 1000, "scenario": "plain", "during_sync": False, "rps": 400.0, "latency_ms": {"p99": 50.0}},
+            {"accounts": 1000, "scenario": "plain", "during_sync": True, "rps": 200.0, "latency_ms": {"p99": 90.0}},
+        ]}
+        results = {"results": [
+            {"accounts": 1000, "scenario": "plain", "during_sync": False, "rps": 300.0, "latency_ms": {"p99": 55.0}},
+            {"accounts": 1000, "scenario": "plain", "during_sync": True, "rps": 190.0, "latency_ms": {"p99": 120.0}},
+            {"accounts": 10000, "scenario": "plain", "during_sync": False, "rps": 10.0, "latency_ms": {"p99": 900.0}},
+        ]}
+
+        self.assertEqual(find_regressions(results, baseline, 0.2), [
+            "1000 accounts, plain: 400.0 -> 300.0 rps",
+            "1000 accounts, plain during sync: p99 90.0 -> 120.0 ms",
+        ])
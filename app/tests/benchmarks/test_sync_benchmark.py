@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from benchmarks.fake_qbo import FakeChartOfAccounts, FakeQboServer
+from benchmarks.sync import find_regressions
+from models.account import Account
+from services.account import AccountService
+from utils.http import create_http_client
+from tests.base import BaseTestCase
+
+
+class TestSyncBenchmark(BaseTestCase):
+    def test_chart_parents_come_first(self):
+        """Test every synthetic account's parent has a lower Id, so paging by Id never orphans a child"""
+        chart = FakeChartOfAccounts(500)
+
+        parents = [
+            (int(account["ParentRef"]["value"]), int(qbo_id))
+            for qbo_id, account in chart.accounts.items() if "ParentRef" in account
+        ]
+        self.assertTrue(parents)
+        self.assertTrue(all(parent_id < qbo_id for parent_id, qbo_id in parents))
+
+    def test_chart_query_pages_and_filters(self):
+        """Test the stand-in pages by STARTPOSITION and filters by LastUpdatedTime like QuickBooks"""
+        chart = FakeChartOfAccounts(250)
+        since = datetime.now(timezone.utc) - timedelta(minutes=1)
+        changes = chart.touch(10, deleted_share=0)
+
+        page = chart.query("SELECT * FROM Account ORDERBY Id STARTPOSITION 201 MAXRESULTS 100")
+        changed = chart.query(f"SELECT * FROM Account WHERE Metadata.LastUpdatedTime >= '{since.isoformat()}'")
+
+        self.assertEqual([account["Id"] for account in page], [str(qbo_id) for qbo_id in range(201, 251)])
+        self.assertEqual(len(changed), changes["updated"])
+        self.assertEqual(len(chart.changes(since)), changes["updated"])
+
+    def test_sync_against_stand_in(self):
+        """Test a real account sync runs end to end against the stand-in server"""
+        chart = FakeChartOfAccounts(120)
+        server = FakeQboServer(chart).start()
+        http_client = create_http_client()
+        try:
+            with patch('services.sync_engine.settings.API_BASE', server.api_base):
+                service = AccountService(self.db_session, self.mock_auth_service, http_client, "test_realm_id")
+                service.sync()
+        finally:
+            http_client.close()
+            server.stop()
+
+        self.assertEqual(self.db_session.query(Account).count(), 120)
+        self.assertEqual(server.requests, 1)
+
+    def test_find_regressions(self):
+        """Test only scenarios slower than the baseline by more than the tolerance are reported"""
+        baseline = {"results": [
+            {"accounts": 1000, "mode": "full", "seconds": 1.0},
+            {"accounts": 1000, "mode": "incremental", "seconds": 0.1},
+        ]}
+        results = {"results": [
+            {"accounts": 1000, "mode": "full", "seconds": 1.5},
+            {"accounts": 1000, "mode": "incremental", "seconds": 0.11},
+            {"accounts": 10000, "mode": "full", "seconds": 9.0},
+        ]}
+
+        self.assertEqual(find_regressions(results, baseline, 0.2), ["1000 accounts, full: 1.0s -> 1.5s"])
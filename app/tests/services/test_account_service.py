@@ -1,17 +1,24 @@
-from datetime import datetime, timedelta
-from unittest.mock import patch, MagicMock, PropertyMock
+import select
+from datetime import datetime, timedelta, timezone
+from unittest.mock import ANY, patch, MagicMock, PropertyMock
 from fastapi import HTTPException
+from sqlalchemy import text
 
 from services.account import AccountService
+from services.entities import validate_account
 from models.account import Account
 from models.sync import SyncLog
 from tests.base import BaseTestCase
+from utils.cache import ACCOUNT_CACHE_CHANNEL, CachedResponse, account_cache
+from utils.locks import single_flight
 
 
 class TestAccountService(BaseTestCase):
     def setUp(self):
         super().setUp()
-        self.account_service = AccountService(self.db_session, self.mock_auth_service)
+        self.account_service = AccountService(
+            self.db_session, self.mock_auth_service, self.mock_http_client, "test_realm_id"
+        )
         self.mock_account_data = [
             {
                 "Id": "1",
@@ -50,7 +57,7 @@ class TestAccountService(BaseTestCase):
         sync_time = datetime.utcnow()
         self.account_service.update_last_sync_time(sync_time)
         
-        sync_log = self.db_session.query(SyncLog).filter_by(entity_type='account').first()
+        sync_log = self.db_session.query(SyncLog).filter_by(realm_id='test_realm_id', entity_type='account').first()
         self.assertIsNotNone(sync_log)
         self.assertEqual(sync_log.last_sync_at, sync_time)
 
@@ -62,13 +69,12 @@ class TestAccountService(BaseTestCase):
         
         self.account_service.update_last_sync_time(new_sync_time)
         
-        sync_log = self.db_session.query(SyncLog).filter_by(entity_type='account').first()
+        sync_log = self.db_session.query(SyncLog).filter_by(realm_id='test_realm_id', entity_type='account').first()
         self.assertEqual(sync_log.last_sync_at, new_sync_time)
         self.assertNotEqual(sync_log.last_sync_at, old_sync_time)
 
-    @patch('services.account.requests.post')
-    def test_fetch_accounts_from_api(self, mock_post):
-        """Test _fetch_accounts_from_api method"""
+    def test_fetch_page(self):
+        """Test _fetch_page method"""
         # Mock response
         mock_response = MagicMock()
         mock_response.status_code = 200
@@ -79,61 +85,75 @@ class TestAccountService(BaseTestCase):
                 ]
             }
         }
-        mock_post.return_value = mock_response
+        mock_request = self.mock_http_client.request
+        mock_request.return_value = mock_response
         
         # Test with last_sync_time
         last_sync_time = datetime.utcnow() - timedelta(hours=1)
-        accounts = self.account_service._fetch_accounts_from_api(last_sync_time)
+        accounts = self.account_service._fetch_page(last_sync_time)
         
         # Verify API call
-        mock_post.assert_called_once()
-        self.assertIn('Authorization', mock_post.call_args[1]['headers'])
-        self.assertIn('Bearer test_access_token', mock_post.call_args[1]['headers']['Authorization'])
+        mock_request.assert_called_once()
+        self.assertIn('Authorization', mock_request.call_args[1]['headers'])
+        self.assertIn('Bearer test_access_token', mock_request.call_args[1]['headers']['Authorization'])
+        self.assertIn('STARTPOSITION 1 MAXRESULTS', mock_request.call_args[1]['content'])
         
         # Verify returned data
         self.assertEqual(len(accounts), 1)
         self.assertEqual(accounts[0]['Id'], '1')
         self.assertEqual(accounts[0]['Name'], 'Test Account')
 
-    @patch('services.account.requests.post')
-    def test_fetch_accounts_from_api_error(self, mock_post):
-        """Test _fetch_accounts_from_api method with API error"""
+    def test_fetch_page_error(self):
+        """Test _fetch_page method with API error"""
         # Mock error response
         mock_response = MagicMock()
         mock_response.status_code = 400
         mock_response.text = "Bad Request"
-        mock_post.return_value = mock_response
+        mock_request = self.mock_http_client.request
+        mock_request.return_value = mock_response
         
         # Test with last_sync_time
         last_sync_time = datetime.utcnow() - timedelta(hours=1)
         
         # Verify exception is raised
         with self.assertRaises(HTTPException) as context:
-            self.account_service._fetch_accounts_from_api(last_sync_time)
+            self.account_service._fetch_page(last_sync_time)
         
         self.assertEqual(context.exception.status_code, 400)
         self.assertIn("Failed to fetch accounts", str(context.exception.detail))
 
-    def test_get_existing_accounts(self):
-        """Test _get_existing_accounts method"""
-        # Create test accounts
-        account1 = self.create_test_account(qbo_id="1", name="Test Account 1")
-        account2 = self.create_test_account(qbo_id="2", name="Test Account 2")
-        
-        # Test getting existing accounts
-        account_ids = ["1", "2", "3"]  # "3" doesn't exist
-        existing_accounts = self.account_service._get_existing_accounts(account_ids)
-        
-        # Verify results
-        self.assertEqual(len(existing_accounts), 2)
-        self.assertIn("1", existing_accounts)
-        self.assertIn("2", existing_accounts)
-        self.assertNotIn("3", existing_accounts)
-        self.assertEqual(existing_accounts["1"].name, "Test Account 1")
-        self.assertEqual(existing_accounts["2"].name, "Test Account 2")
+    @patch('services.sync_engine.settings.QBO_PAGE_SIZE', 2)
+    @patch('services.account.AccountService._fetch_page')
+    def test_fetch_pages(self, mock_fetch_page):
+        """Test _fetch_pages pages through results until a short page is returned"""
+        # Mock two full pages followed by a partial one
+        mock_fetch_page.side_effect = [
+            self.mock_account_data,
+            self.mock_account_data,
+            self.mock_account_data[:1]
+        ]
+
+        pages = list(self.account_service._fetch_pages(None))
+
+        # Verify pages and start positions
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(len(pages[2]), 1)
+        start_positions = [call.args[1] for call in mock_fetch_page.call_args_list]
+        self.assertEqual(start_positions, [1, 3, 5])
+
+    @patch('services.sync_engine.settings.QBO_PAGE_SIZE', 2)
+    @patch('services.account.AccountService._fetch_page')
+    def test_fetch_pages_empty_last_page(self, mock_fetch_page):
+        """Test _fetch_pages does not yield an empty trailing page"""
+        mock_fetch_page.side_effect = [self.mock_account_data, []]
+
+        pages = list(self.account_service._fetch_pages(None))
+
+        self.assertEqual(pages, [self.mock_account_data])
+        self.assertEqual(mock_fetch_page.call_count, 2)
 
     def test_validate_account(self):
-        """Test _validate_account method"""
+        """Test validate_account maps API data onto the account schema"""
         # Test data
         account_data = {
             'Id': '1',
@@ -147,7 +167,7 @@ class TestAccountService(BaseTestCase):
         }
         
         # Create account from data
-        account_create = self.account_service._validate_account(account_data)
+        account_create = validate_account(account_data)
         
         # Verify account data
         self.assertEqual(account_create.qbo_id, '1')
@@ -159,190 +179,534 @@ class TestAccountService(BaseTestCase):
         self.assertEqual(account_create.current_balance, 1000.0)
         self.assertEqual(account_create.parent_id, '2')
 
-    def test_update_account_instance(self):
-        """Test _update_account_instance method"""
-        # Create test account
-        account = Account(
-            qbo_id="1",
-            name="Old Name",
-            classification="Old Classification",
-            currency_ref="EUR",
-            account_type="Old Type",
-            active=False,
-            current_balance=0.0,
-            parent_id=None
-        )
-        
-        # Create account data
-        from schemas.account import AccountCreateSchema
-        account_create = AccountCreateSchema(
-            qbo_id="1",
-            name="New Name",
-            classification="New Classification",
-            currency_ref="USD",
-            account_type="New Type",
-            active=True,
-            current_balance=1000.0,
-            parent_id="2"
-        )
-        
-        # Update account
-        updated_account = self.account_service._update_account_instance(account, account_create)
-        
-        # Verify updated account
-        self.assertEqual(updated_account.qbo_id, '1')  # Should not change
-        self.assertEqual(updated_account.name, 'New Name')
-        self.assertEqual(updated_account.classification, 'New Classification')
-        self.assertEqual(updated_account.currency_ref, 'USD')
-        self.assertEqual(updated_account.account_type, 'New Type')
-        self.assertTrue(updated_account.active)
-        self.assertEqual(updated_account.current_balance, 1000.0)
-        self.assertEqual(updated_account.parent_id, '2')
-
-    def test_create_account_instance(self):
-        """Test _create_account_instance method"""
-        # Create account data
-        from schemas.account import AccountCreateSchema
-        account_create = AccountCreateSchema(
-            qbo_id="1",
-            name="Test Account",
-            classification="Asset",
-            currency_ref="USD",
-            account_type="Bank",
-            active=True,
-            current_balance=1000.0,
-            parent_id="2"
-        )
-        
-        # Create new account
-        new_account = self.account_service._create_account_instance(account_create)
-        
-        # Verify new account
-        self.assertEqual(new_account.qbo_id, '1')
-        self.assertEqual(new_account.name, 'Test Account')
-        self.assertEqual(new_account.classification, 'Asset')
-        self.assertEqual(new_account.currency_ref, 'USD')
-        self.assertEqual(new_account.account_type, 'Bank')
-        self.assertTrue(new_account.active)
-        self.assertEqual(new_account.current_balance, 1000.0)
-        self.assertEqual(new_account.parent_id, '2')
-
-    @patch('services.account.AccountService._get_existing_accounts')
-    def test_process_accounts(self, mock_get_existing_accounts):
-        """Test _process_accounts method"""
-        # Mock existing accounts
-        mock_get_existing_accounts.return_value = {
-            "1": Account(qbo_id="1", name="Existing Account 1")
-        }
-        
-        # Process accounts
-        accounts_to_update, accounts_to_create = self.account_service._process_accounts(self.mock_account_data)
+    def test_process(self):
+        """Test _process method"""
+        # Process accounts, including a duplicate of the first one
+        duplicate = dict(self.mock_account_data[0], Name="Renamed Account 1")
+        accounts = self.account_service._process(self.mock_account_data + [duplicate])
         
         # Verify results
-        self.assertEqual(len(accounts_to_update), 1)
-        self.assertEqual(len(accounts_to_create), 1)
-        
-        # Verify updated account
-        self.assertEqual(accounts_to_update[0].qbo_id, "1")
-        self.assertEqual(accounts_to_update[0].name, "Test Account 1")
-        
-        # Verify created account
-        self.assertEqual(accounts_to_create[0].qbo_id, "2")
-        self.assertEqual(accounts_to_create[0].name, "Test Account 2")
-
-    def test_save_accounts_to_db(self):
-        """Test _save_accounts_to_db method"""
-        # Create test accounts
-        account_to_update = self.create_test_account(qbo_id="1", name="Account to Update")
-        account_to_create = Account(qbo_id="2", name="Account to Create")
+        self.assertEqual(len(accounts), 2)
+        self.assertEqual(accounts[0].qbo_id, "1")
+        self.assertEqual(accounts[0].name, "Renamed Account 1")
+        self.assertEqual(accounts[1].qbo_id, "2")
+        self.assertEqual(accounts[1].name, "Test Account 2")
+
+    def test_save_to_db(self):
+        """Test _save_to_db method"""
+        # Create an existing account
+        self.create_test_account(qbo_id="1", name="Account to Update")
+        accounts = self.account_service._process(self.mock_account_data)
         
         # Save accounts to database
-        self.account_service._save_accounts_to_db([account_to_update], [account_to_create])
+        inserted, updated, unchanged = self.account_service._save_to_db(accounts)
+        
+        # Verify counts
+        self.assertEqual(inserted, 1)
+        self.assertEqual(updated, 1)
+        self.assertEqual(unchanged, 0)
         
         # Verify accounts in database
+        self.db_session.expire_all()
         updated_account = self.db_session.query(Account).filter_by(qbo_id="1").first()
         created_account = self.db_session.query(Account).filter_by(qbo_id="2").first()
         
-        self.assertIsNotNone(updated_account)
-        self.assertIsNotNone(created_account)
-        self.assertEqual(updated_account.name, "Account to Update")
-        self.assertEqual(created_account.name, "Account to Create")
-
-    @patch('services.account.AccountService._fetch_accounts_from_api')
-    @patch('services.account.AccountService._process_accounts')
-    @patch('services.account.AccountService._save_accounts_to_db')
+        self.assertEqual(self.db_session.query(Account).count(), 2)
+        self.assertEqual(updated_account.name, "Test Account 1")
+        self.assertEqual(updated_account.current_balance, 1000.0)
+        self.assertEqual(created_account.name, "Test Account 2")
+        self.assertEqual(created_account.account_type, "Credit Card")
+
+    def test_save_to_db_scoped_to_realm(self):
+        """Test _save_to_db keeps accounts with the same qbo_id apart per realm"""
+        self.create_test_account(qbo_id="1", name="Other Realm Account", realm_id="other_realm_id")
+        accounts = self.account_service._process(self.mock_account_data)
+
+        inserted, updated, unchanged = self.account_service._save_to_db(accounts)
+
+        self.assertEqual((inserted, updated, unchanged), (2, 0, 0))
+        self.db_session.expire_all()
+        other_account = self.db_session.query(Account).filter_by(realm_id="other_realm_id").one()
+        self.assertEqual(other_account.name, "Other Realm Account")
+
+    def test_save_to_db_skips_unchanged(self):
+        """Test _save_to_db only rewrites accounts whose content changed"""
+        accounts = self.account_service._process(self.mock_account_data)
+        self.account_service._save_to_db(accounts)
+        original_xmin = self.db_session.execute(text("SELECT xmin::text FROM accounts WHERE qbo_id = '1'")).scalar()
+        self.db_session.commit()
+
+        changed = dict(self.mock_account_data[1], CurrentBalance=-750.0)
+        accounts = self.account_service._process([self.mock_account_data[0], changed])
+        inserted, updated, unchanged = self.account_service._save_to_db(accounts)
+
+        self.assertEqual((inserted, updated, unchanged), (0, 1, 1))
+        # The unchanged row was not rewritten at all
+        self.assertEqual(
+            self.db_session.execute(text("SELECT xmin::text FROM accounts WHERE qbo_id = '1'")).scalar(),
+            original_xmin
+        )
+        self.db_session.expire_all()
+        self.assertEqual(self.db_session.query(Account).filter_by(qbo_id="2").one().current_balance, -750.0)
+
+    def test_save_to_db_restores_unchanged_deleted(self):
+        """Test an unchanged account that was flagged as deleted is restored"""
+        accounts = self.account_service._process(self.mock_account_data[:1])
+        self.account_service._save_to_db(accounts)
+        self.db_session.query(Account).update({Account.deleted_at: datetime.utcnow()})
+        self.db_session.commit()
+
+        inserted, updated, unchanged = self.account_service._save_to_db(accounts)
+
+        self.assertEqual((inserted, updated, unchanged), (0, 1, 0))
+        self.db_session.expire_all()
+        self.assertIsNone(self.db_session.query(Account).one().deleted_at)
+
+    @patch('services.sync_engine.settings.UPSERT_BATCH_SIZE', 1)
+    def test_save_to_db_batches(self):
+        """Test _save_to_db issues one statement per batch"""
+        accounts = self.account_service._process(self.mock_account_data)
+        
+        with patch.object(self.db_session, 'execute', wraps=self.db_session.execute) as mock_execute:
+            inserted, updated, unchanged = self.account_service._save_to_db(accounts)
+        
+        # Verify one upsert per batch
+        self.assertEqual(mock_execute.call_count, 2)
+        self.assertEqual((inserted, updated, unchanged), (2, 0, 0))
+        self.assertEqual(self.db_session.query(Account).count(), 2)
+
+    def test_update_last_sync_time_bumps_version_on_change(self):
+        """Test the sync version only moves when a sync changed accounts"""
+        sync_time = datetime.utcnow()
+
+        self.account_service.update_last_sync_time(sync_time, changed=True)
+        self.account_service.update_last_sync_time(sync_time)
+        self.account_service.update_last_sync_time(sync_time, changed=True)
+
+        sync_log = self.db_session.query(SyncLog).filter_by(realm_id="test_realm_id").one()
+        self.assertEqual(sync_log.version, 2)
+        self.assertEqual(sync_log.last_sync_at, sync_time)
+
+    def test_update_last_sync_time_invalidates_cache(self):
+        """Test a sync that changed accounts drops cached listings here and notifies other workers"""
+        account_cache.set(("test_realm_id", None), CachedResponse(b"[]", {}), account_cache.generation)
+        account_cache.set(("other_realm_id", None), CachedResponse(b"[]", {}), account_cache.generation)
+        listener = self.engine.raw_connection()
+        listener.set_isolation_level(0)
+        cursor = listener.cursor()
+        cursor.execute(f"LISTEN {ACCOUNT_CACHE_CHANNEL}")
+
+        try:
+            self.account_service.update_last_sync_time(datetime.utcnow())
+            listener.poll()
+            self.assertEqual(listener.notifies, [])
+            self.assertEqual(account_cache.stats()["entries"], 2)
+
+            self.account_service.update_last_sync_time(datetime.utcnow(), changed=True)
+            # Notifications reach other sessions asynchronously after the commit
+            select.select([listener], [], [], 5)
+            listener.poll()
+            self.assertEqual([notify.payload for notify in listener.notifies], ["test_realm_id"])
+            self.assertIsNone(account_cache.get(("test_realm_id", None)))
+            self.assertIsNotNone(account_cache.get(("other_realm_id", None)))
+        finally:
+            cursor.close()
+            listener.close()
+
+    @patch('services.sync_engine.settings.SYNC_USE_CDC', False)
+    @patch('services.account.AccountService._fetch_pages')
+    @patch('services.account.AccountService._process')
+    @patch('services.account.AccountService._save_to_db')
     @patch('services.account.AccountService.update_last_sync_time')
     def test_sync_accounts_no_updates(
         self,
         mock_update_last_sync_time,
-        mock_save_accounts_to_db,
-        mock_process_accounts,
-        mock_fetch_accounts_from_api
+        mock_save_to_db,
+        mock_process,
+        mock_fetch_pages
     ):
-        """Test sync_accounts when no accounts need updating"""
-        # Mock API response with no accounts
-        mock_fetch_accounts_from_api.return_value = []
+        """Test sync when no accounts need updating"""
+        self.create_sync_log()
+
+        # Mock API response with no pages
+        mock_fetch_pages.return_value = iter([])
         
-        # Call sync_accounts
-        self.account_service.sync_accounts()
+        # Call sync
+        self.account_service.sync()
         
         # Verify methods were called
-        mock_fetch_accounts_from_api.assert_called_once()
-        mock_process_accounts.assert_not_called()
-        mock_save_accounts_to_db.assert_not_called()
-        mock_update_last_sync_time.assert_called_once()
-
-    @patch('services.account.AccountService._fetch_accounts_from_api')
-    @patch('services.account.AccountService._process_accounts')
-    @patch('services.account.AccountService._save_accounts_to_db')
+        mock_fetch_pages.assert_called_once()
+        mock_process.assert_not_called()
+        mock_save_to_db.assert_not_called()
+        mock_update_last_sync_time.assert_called_once_with(ANY, changed=False, cdc_cursor=ANY, watermark=ANY)
+
+    @patch('services.sync_engine.settings.SYNC_USE_CDC', False)
+    @patch('services.account.AccountService._fetch_pages')
+    @patch('services.account.AccountService._process')
+    @patch('services.account.AccountService._save_to_db')
     @patch('services.account.AccountService.update_last_sync_time')
     def test_sync_accounts_with_updates(
         self,
         mock_update_last_sync_time,
-        mock_save_accounts_to_db,
-        mock_process_accounts,
-        mock_fetch_accounts_from_api
+        mock_save_to_db,
+        mock_process,
+        mock_fetch_pages
     ):
-        """Test sync_accounts when accounts need updating"""
-        # Mock API response with accounts
-        mock_fetch_accounts_from_api.return_value = self.mock_account_data
-        
-        # Mock process_accounts
-        mock_process_accounts.return_value = ([], [])
-        
-        # Call sync_accounts
-        self.account_service.sync_accounts()
-        
-        # Verify methods were called
-        mock_fetch_accounts_from_api.assert_called_once()
-        mock_process_accounts.assert_called_once_with(self.mock_account_data)
-        mock_save_accounts_to_db.assert_called_once()
-        mock_update_last_sync_time.assert_called_once()
-
-    def test_get_accounts_no_filter(self):
-        """Test get_accounts without name prefix filter"""
-        # Create test accounts
-        account1 = self.create_test_account(qbo_id="1", name="Test Account 1")
-        account2 = self.create_test_account(qbo_id="2", name="Another Account")
-        
-        # Get accounts
-        accounts = self.account_service.get_accounts()
-        
-        # Verify results
-        self.assertEqual(len(accounts), 2)
+        """Test sync saves every page as it arrives"""
+        self.create_sync_log()
 
-    def test_get_accounts_with_filter(self):
-        """Test get_accounts with name prefix filter"""
-        # Create test accounts
-        account1 = self.create_test_account(qbo_id="1", name="Test Account 1")
-        account2 = self.create_test_account(qbo_id="2", name="Another Account")
-        
-        # Get accounts with filter
-        accounts = self.account_service.get_accounts(name_prefix="Test")
-        
-        # Verify results
-        self.assertEqual(len(accounts), 1)
-        self.assertEqual(accounts[0].name, "Test Account 1")
+        # Mock API response with two pages of accounts
+        mock_fetch_pages.return_value = iter([
+            self.mock_account_data[:1],
+            self.mock_account_data[1:]
+        ])
+        
+        # Mock process_accounts and save_accounts_to_db
+        mock_process.return_value = []
+        mock_save_to_db.return_value = (1, 0, 0)
+        
+        # Call sync
+        self.account_service.sync()
+        
+        # Verify methods were called once per page
+        mock_fetch_pages.assert_called_once()
+        self.assertEqual(mock_process.call_count, 2)
+        mock_process.assert_any_call(self.mock_account_data[:1])
+        mock_process.assert_any_call(self.mock_account_data[1:])
+        self.assertEqual(mock_save_to_db.call_count, 2)
+        mock_update_last_sync_time.assert_called_once_with(ANY, changed=True, cdc_cursor=ANY, watermark=ANY)
+
+    @patch('services.account.AccountService._fetch_pages')
+    @patch('services.account.AccountService._save_to_db')
+    def test_sync_accounts_full_sync(self, mock_save_to_db, mock_fetch_pages):
+        """Test sync loads everything through the staging table when never synced"""
+        # Existing accounts, one of which no longer exists upstream
+        self.create_test_account(qbo_id="1", name="Old Name")
+        self.create_test_account(qbo_id="9", name="Removed Upstream")
+        self.create_test_account(qbo_id="9", name="Other Realm", realm_id="other_realm_id")
+        tricky_name = dict(self.mock_account_data[1], Name="Tab\tand \\N backslash")
+        mock_fetch_pages.return_value = iter([
+            self.mock_account_data[:1],
+            [tricky_name]
+        ])
+
+        self.account_service.sync()
+
+        # Verify the ORM write path was bypassed and a full pull was requested
+        mock_save_to_db.assert_not_called()
+        mock_fetch_pages.assert_called_once_with(None, start_position=1)
+
+        # Verify merged results
+        self.db_session.expire_all()
+        accounts = {
+            account.qbo_id: account
+            for account in self.db_session.query(Account).filter_by(realm_id="test_realm_id")
+        }
+        self.assertEqual(len(accounts), 3)
+        self.assertEqual(accounts["1"].name, "Test Account 1")
+        self.assertEqual(accounts["1"].currency_ref, "USD")
+        self.assertIsNone(accounts["1"].parent_id)
+        self.assertIsNone(accounts["1"].deleted_at)
+        self.assertEqual(accounts["2"].name, "Tab\tand \\N backslash")
+        self.assertEqual(accounts["2"].current_balance, -500.0)
+        self.assertIsNotNone(accounts["9"].deleted_at)
+        self.assertIsNotNone(self.account_service.last_sync_time)
+        self.assertEqual(self.db_session.query(SyncLog.version).filter_by(realm_id="test_realm_id").scalar(), 1)
+
+        # Accounts of other realms are left alone
+        other_account = self.db_session.query(Account).filter_by(realm_id="other_realm_id").one()
+        self.assertIsNone(other_account.deleted_at)
+
+        # Deleted accounts are hidden from reads
+        listed = self.db_session.execute(AccountService._accounts_query(realm_id="test_realm_id")).scalars()
+        self.assertEqual(sorted(account.qbo_id for account in listed), ["1", "2"])
+
+    @patch('services.account.AccountService._fetch_pages')
+    def test_sync_accounts_full_sync_unchanged(self, mock_fetch_pages):
+        """Test a repeated full sync of identical data writes nothing and keeps the version"""
+        mock_fetch_pages.side_effect = lambda last_sync_time, start_position: iter([self.mock_account_data])
+        self.account_service.sync(full=True)
+
+        with patch('services.sync_engine.logger') as mock_logger:
+            self.account_service.sync(full=True)
+
+        self.assertIn(
+            "0 inserted, 0 updated, 2 unchanged, 0 flagged as deleted",
+            mock_logger.info.call_args_list[-1].args[0]
+        )
+        self.assertEqual(self.db_session.query(SyncLog.version).filter_by(realm_id="test_realm_id").scalar(), 1)
+
+    @patch('services.account.AccountService._fetch_pages')
+    def test_sync_accounts_builds_paths(self, mock_fetch_pages):
+        """Test a sync that changed accounts brings their hierarchy paths up to date"""
+        child = dict(self.mock_account_data[1], ParentRef={"value": "1"})
+        mock_fetch_pages.return_value = iter([[self.mock_account_data[0], child]])
+
+        self.account_service.sync()
+
+        paths = {account.qbo_id: account.path for account in self.db_session.query(Account)}
+        self.assertEqual(paths, {"1": ["1"], "2": ["1", "2"]})
+
+    @patch('services.account.AccountService._fetch_pages')
+    def test_sync_accounts_full_sync_restores_deleted(self, mock_fetch_pages):
+        """Test a forced full sync clears the deleted flag of accounts that reappear"""
+        self.create_sync_log()
+        account = self.create_test_account(qbo_id="1", name="Test Account 1")
+        account.deleted_at = datetime.utcnow()
+        self.db_session.commit()
+        mock_fetch_pages.return_value = iter([self.mock_account_data[:1]])
+
+        self.account_service.sync(full=True)
+
+        self.db_session.expire_all()
+        self.assertIsNone(self.db_session.query(Account).filter_by(qbo_id="1").one().deleted_at)
+
+    def test_sync_accounts_full_sync_keeps_inactive(self):
+        """Test a full sync asks for inactive accounts and keeps them as inactive, not deleted"""
+        self.create_test_account(qbo_id="2", name="Test Account 2")
+        inactive = dict(self.mock_account_data[1], Active=False)
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {"QueryResponse": {"Account": [self.mock_account_data[0], inactive]}}
+        self.mock_http_client.request.return_value = mock_response
+
+        self.account_service.sync(full=True)
+
+        query = self.mock_http_client.request.call_args.kwargs["content"]
+        self.assertTrue(query.startswith("SELECT * FROM Account WHERE Active IN (true, false) ORDERBY Id"))
+        self.db_session.expire_all()
+        account = self.db_session.query(Account).filter_by(qbo_id="2").one()
+        self.assertFalse(account.active)
+        self.assertIsNone(account.deleted_at)
+
+    @patch('services.account.AccountService._sync')
+    def test_sync_accounts_runs_when_lock_free(self, mock_sync_accounts):
+        """Test sync runs the sync when no other sync holds the lock"""
+        self.assertTrue(self.account_service.sync(full=True))
+
+        mock_sync_accounts.assert_called_once_with(True)
+
+    def test_sync_accounts_requires_realm(self):
+        """Test sync refuses to run without a realm"""
+        account_service = AccountService(self.db_session, self.mock_auth_service, self.mock_http_client)
+
+        with self.assertRaises(HTTPException) as context:
+            account_service.sync()
+
+        self.assertEqual(context.exception.status_code, 400)
+
+    @patch('services.account.AccountService._sync')
+    def test_sync_accounts_skips_when_in_progress(self, mock_sync_accounts):
+        """Test sync with wait=False skips while another sync is running"""
+        with single_flight(self.engine, 'sync:account:test_realm_id'):
+            self.assertFalse(self.account_service.sync(wait=False))
+
+        mock_sync_accounts.assert_not_called()
+
+    @patch('services.account.AccountService._sync')
+    def test_sync_accounts_skips_after_waiting(self, mock_sync_accounts):
+        """Test a waiting caller reuses the sync that finished while it waited"""
+        # A sync finishing after this call started is recorded in the future relative to it
+        self.create_sync_log(hours_ago=-1)
+
+        self.assertFalse(self.account_service.sync())
+
+        mock_sync_accounts.assert_not_called()
+
+    def test_apply_changes(self):
+        """Test apply_changes fetches only the given accounts and flags vanished ones as deleted"""
+        sync_log = self.create_sync_log()
+        last_sync_at = sync_log.last_sync_at
+        self.create_test_account(qbo_id="1", name="Old Name")
+        self.create_test_account(qbo_id="3", name="Deleted Upstream")
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"QueryResponse": {"Account": self.mock_account_data}}
+        self.mock_http_client.request.return_value = mock_response
+
+        self.assertTrue(self.account_service.apply_changes(["1", "2", "3"]))
+
+        query = self.mock_http_client.request.call_args.kwargs["content"]
+        self.assertEqual(
+            query, "SELECT * FROM Account WHERE Id IN ('1', '2', '3') AND Active IN (true, false) MAXRESULTS 3"
+        )
+        self.db_session.expire_all()
+        accounts = {account.qbo_id: account for account in self.db_session.query(Account)}
+        self.assertEqual(accounts["1"].name, "Test Account 1")
+        self.assertIsNone(accounts["2"].deleted_at)
+        self.assertIsNotNone(accounts["3"].deleted_at)
+        sync_log = self.db_session.query(SyncLog).one()
+        self.assertEqual(sync_log.version, 1)
+        # Polling still starts from the last full or incremental sync
+        self.assertEqual(sync_log.last_sync_at, last_sync_at)
+
+    def mock_cdc_response(self, accounts, time="2026-01-02T03:04:05.000-08:00"):
+        """Make the CDC endpoint report accounts as changed since the cursor"""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "CDCResponse": [{"QueryResponse": [{"Account": accounts}]}],
+            "time": time
+        }
+        self.mock_http_client.request.return_value = mock_response
+
+    def reparented_accounts(self):
+        """Account 5 moved under a new account 900 that QuickBooks lists after it"""
+        return [
+            dict(self.mock_account_data[0], Id="5", ParentRef={"value": "900"}),
+            dict(self.mock_account_data[1], Id="900", ParentRef={"value": None})
+        ]
+
+    @patch('services.sync_engine.settings.UPSERT_BATCH_SIZE', 1)
+    def test_sync_accounts_cdc_child_before_parent(self):
+        """Test a CDC response listing a child ahead of its new parent is applied"""
+        self.create_sync_log()
+        self.create_test_account(qbo_id="5")
+        self.mock_cdc_response(self.reparented_accounts())
+
+        self.account_service.sync()
+
+        self.db_session.expire_all()
+        accounts = {account.qbo_id: account for account in self.db_session.query(Account)}
+        self.assertEqual(accounts["5"].parent_id, "900")
+        self.assertIn("900", accounts)
+
+    @patch('services.sync_engine.settings.FULL_SYNC_USE_COPY', False)
+    @patch('services.account.AccountService._fetch_pages')
+    def test_sync_accounts_paged_child_before_parent(self, mock_fetch_pages):
+        """Test a child on an earlier page than its parent waits for the parent instead of failing the page"""
+        child, parent = self.reparented_accounts()
+        grandchild = dict(self.mock_account_data[0], Id="6", ParentRef={"value": "5"})
+        mock_fetch_pages.return_value = iter([[child, grandchild], [parent]])
+
+        self.account_service.sync()
+
+        self.db_session.expire_all()
+        accounts = {account.qbo_id: account for account in self.db_session.query(Account)}
+        self.assertEqual(sorted(accounts), ["5", "6", "900"])
+        self.assertEqual(accounts["6"].path, ["900", "5", "6"])
+        self.assertIsNone(self.db_session.query(SyncLog.checkpoint).scalar())
+
+    def test_apply_changes_before_first_sync(self):
+        """Test applied changes bump the version of a realm that has no sync log row yet"""
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {"QueryResponse": {"Account": self.mock_account_data[:1]}}
+        self.mock_http_client.request.return_value = mock_response
+
+        self.assertTrue(self.account_service.apply_changes(["1"]))
+
+        sync_log = self.db_session.query(SyncLog).one()
+        self.assertEqual(sync_log.version, 1)
+        # The scheduler still runs the first full sync
+        self.assertIsNone(sync_log.last_sync_at)
+
+    def test_sync_accounts_cdc(self):
+        """Test incremental syncs apply CDC changes, soft-delete deleted accounts and keep the server time"""
+        last_sync_at = self.create_sync_log().last_sync_at.replace(microsecond=0, tzinfo=timezone.utc)
+        # Changes are captured from a little before the last sync, to absorb clock skew
+        changed_since = (last_sync_at - timedelta(minutes=5)).isoformat()
+        self.create_test_account(qbo_id="1", name="Old Name")
+        self.create_test_account(qbo_id="3", name="Deleted Upstream")
+        self.mock_cdc_response(self.mock_account_data + [{"Id": "3", "status": "Deleted"}])
+
+        self.account_service.sync()
+
+        # One CDC request replaces the paged queries
+        self.mock_http_client.request.assert_called_once()
+        self.assertEqual(self.mock_http_client.request.call_args.args[0], "GET")
+        params = self.mock_http_client.request.call_args.kwargs["params"]
+        self.assertEqual(params, {"entities": "Account", "changedSince": changed_since})
+        self.db_session.expire_all()
+        accounts = {account.qbo_id: account for account in self.db_session.query(Account)}
+        self.assertEqual(accounts["1"].name, "Test Account 1")
+        self.assertIsNone(accounts["2"].deleted_at)
+        self.assertIsNotNone(accounts["3"].deleted_at)
+        sync_log = self.db_session.query(SyncLog).one()
+        self.assertEqual(sync_log.cdc_cursor, "2026-01-02T03:04:05.000-08:00")
+        self.assertEqual(sync_log.version, 1)
+
+    def test_sync_accounts_cdc_resumes_from_cursor(self):
+        """Test the next CDC run starts from the server time the previous one returned, less the overlap"""
+        sync_log = self.create_sync_log()
+        cdc_cursor = datetime.now(timezone(timedelta(hours=-7))).replace(microsecond=0).isoformat()
+        sync_log.cdc_cursor = cdc_cursor
+        self.db_session.commit()
+        self.mock_cdc_response([])
+
+        self.account_service.sync()
+
+        changed_since = self.mock_http_client.request.call_args.kwargs["params"]["changedSince"]
+        self.assertEqual(
+            datetime.fromisoformat(cdc_cursor) - datetime.fromisoformat(changed_since), timedelta(minutes=5)
+        )
+        self.assertEqual(self.db_session.query(SyncLog).one().version, 0)
+
+    @patch('services.sync_engine.settings.QBO_CDC_MAX_RESULTS', 2)
+    @patch('services.account.AccountService._fetch_pages')
+    def test_sync_accounts_cdc_truncated(self, mock_fetch_pages):
+        """Test a CDC response cut off at the result limit falls back to a full sync"""
+        self.create_sync_log()
+        self.mock_cdc_response(self.mock_account_data)
+        mock_fetch_pages.return_value = iter([[
+            dict(self.mock_account_data[0], MetaData={"LastUpdatedTime": "2026-10-17T09:30:00-07:00"}),
+            dict(self.mock_account_data[1], MetaData={"LastUpdatedTime": "2026-10-17T08:00:00-07:00"})
+        ]])
+
+        self.account_service.sync()
+
+        mock_fetch_pages.assert_called_once_with(None, start_position=1)
+        # The full sync's watermark is the latest change it saw
+        self.assertEqual(self.db_session.query(SyncLog.watermark).scalar(), "2026-10-17T09:30:00-07:00")
+
+    @patch('services.account.AccountService._fetch_pages')
+    def test_sync_accounts_cdc_cursor_too_old(self, mock_fetch_pages):
+        """Test a last sync beyond the CDC lookback window falls back to a full sync"""
+        sync_log = self.create_sync_log()
+        sync_log.last_sync_at = datetime.utcnow() - timedelta(days=31)
+        self.db_session.commit()
+        mock_fetch_pages.return_value = iter([])
+
+        self.account_service.sync()
+
+        self.mock_http_client.request.assert_not_called()
+        mock_fetch_pages.assert_called_once_with(None, start_position=1)
+
+    @patch('services.account.AccountService._fetch_pages')
+    def test_sync_accounts_quiet_realm_keeps_using_cdc(self, mock_fetch_pages):
+        """Test a realm without changes for longer than the CDC lookback window still syncs through CDC"""
+        mock_fetch_pages.return_value = iter([[
+            dict(account, MetaData={"LastUpdatedTime": "2025-01-01T10:00:00-08:00"}) for account in self.mock_account_data
+        ]])
+        self.account_service.sync()
+        self.mock_cdc_response([])
+
+        self.account_service.sync()
+
+        mock_fetch_pages.assert_called_once()
+        self.assertEqual(self.mock_http_client.request.call_args.args[0], "GET")
+        changed_since = self.mock_http_client.request.call_args.kwargs["params"]["changedSince"]
+        self.assertLess(datetime.now(timezone.utc) - datetime.fromisoformat(changed_since), timedelta(minutes=10))
+        self.assertEqual(self.db_session.query(SyncLog.watermark).scalar(), "2025-01-01T10:00:00-08:00")
+
+    def _explain(self, query) -> str:
+        """Return the plan for query with sequential scans disabled"""
+        self.db_session.execute(text("SET LOCAL enable_seqscan = off"))
+        compiled = query.compile(self.engine)
+        connection = self.db_session.connection()
+        plan = connection.exec_driver_sql(f"EXPLAIN {compiled}", compiled.params).scalars().all()
+        self.db_session.rollback()
+        return "\n".join(plan)
+
+    def test_name_searches_use_indexes(self):
+        """Test prefix and substring searches can be answered from the name indexes"""
+        self.create_test_account(qbo_id="1", name="Test Account 1")
+
+        prefix_plan = self._explain(AccountService._accounts_query(name_prefix="Test"))
+        substring_plan = self._explain(AccountService._accounts_query(q="account"))
+        fuzzy_plan = self._explain(AccountService._accounts_query(q="acount", fuzzy=True))
+
+        self.assertIn("ix_accounts_name_lower_pattern", prefix_plan)
+        self.assertIn("ix_accounts_name_trgm", substring_plan)
+        self.assertIn("ix_accounts_name_trgm", fuzzy_plan)
 
     @patch('services.account.AccountService.last_sync_time', new_callable=PropertyMock)
     def test_should_sync_no_last_sync(self, mock_last_sync_time):
@@ -369,52 +733,9 @@ class TestAccountService(BaseTestCase):
         # Check if should sync
         self.assertFalse(self.account_service.should_sync())
 
-    @patch('services.account.AccountService.should_sync')
-    @patch('services.account.AccountService.sync_accounts')
-    def test_get_accounts_with_sync_needed(
-        self,
-        mock_sync_accounts,
-        mock_should_sync
-    ):
-        """Test get_accounts_with_sync when sync is needed"""
-        # Mock should_sync to return True
-        mock_should_sync.return_value = True
-        
-        # Create test account
-        account = self.create_test_account()
-        
-        # Get accounts with sync
-        accounts = self.account_service.get_accounts_with_sync()
-        
-        # Verify methods were called
-        mock_should_sync.assert_called_once()
-        mock_sync_accounts.assert_called_once()
-        
-        # Verify results
-        self.assertEqual(len(accounts), 1)
-        self.assertEqual(accounts[0].name, "Test Account")
+    def test_should_sync_custom_max_age(self):
+        """Test should_sync with a custom max age"""
+        self.create_sync_log(hours_ago=0.5)  # 30 minutes ago
+
+        self.assertTrue(self.account_service.should_sync(timedelta(minutes=10)))
 
-    @patch('services.account.AccountService.should_sync')
-    @patch('services.account.AccountService.sync_accounts')
-    def test_get_accounts_with_sync_not_needed(
-        self,
-        mock_sync_accounts,
-        mock_should_sync
-    ):
-        """Test get_accounts_with_sync when sync is not needed"""
-        # Mock should_sync to return False
-        mock_should_sync.return_value = False
-        
-        # Create test account
-        account = self.create_test_account()
-        
-        # Get accounts with sync
-        accounts = self.account_service.get_accounts_with_sync()
-        
-        # Verify methods were called
-        mock_should_sync.assert_called_once()
-        mock_sync_accounts.assert_not_called()
-        
-        # Verify results
-        self.assertEqual(len(accounts), 1)
-        self.assertEqual(accounts[0].name, "Test Account")
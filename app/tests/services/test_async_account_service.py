@@ -0,0 +1,240 @@
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from fastapi import HTTPException
+
+from schemas.account import AccountSchema
+from services.account import AccountService, AsyncAccountService
+from services.orchestrator import SyncOrchestrator
+from tests.base import BaseTestCase
+
+
+class TestAsyncAccountService(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mock_account_service = MagicMock(spec=AccountService)
+        self.mock_account_service.realm_id = None
+        self.mock_orchestrator = MagicMock(spec=SyncOrchestrator)
+
+    def test_get_accounts_no_filter(self):
+        """Test get_accounts without name prefix filter"""
+        self.create_test_account(qbo_id="1", name="Test Account 1")
+        self.create_test_account(qbo_id="2", name="Another Account")
+
+        async def get_accounts(session):
+            return await AsyncAccountService(session, self.mock_account_service, self.mock_orchestrator).get_accounts()
+
+        accounts = self.run_with_async_session(get_accounts)
+
+        self.assertEqual(len(accounts), 2)
+
+    def test_get_accounts_with_filter(self):
+        """Test get_accounts with name prefix filter"""
+        self.create_test_account(qbo_id="1", name="Test Account 1")
+        self.create_test_account(qbo_id="2", name="Another Account")
+
+        async def get_accounts(session):
+            return await AsyncAccountService(session, self.mock_account_service, self.mock_orchestrator).get_accounts("test")
+
+        accounts = self.run_with_async_session(get_accounts)
+
+        self.assertEqual(len(accounts), 1)
+        self.assertEqual(accounts[0].name, "Test Account 1")
+
+    def test_get_accounts_excludes_deleted(self):
+        """Test get_accounts hides accounts flagged as deleted"""
+        self.create_test_account(qbo_id="1", name="Test Account 1")
+        deleted = self.create_test_account(qbo_id="2", name="Test Account 2")
+        deleted.deleted_at = datetime.utcnow()
+        self.db_session.commit()
+
+        async def get_accounts(session):
+            return await AsyncAccountService(session, self.mock_account_service, self.mock_orchestrator).get_accounts()
+
+        accounts = self.run_with_async_session(get_accounts)
+
+        self.assertEqual([account.qbo_id for account in accounts], ["1"])
+
+    def test_get_accounts_with_sync_from_api(self):
+        """Test get_accounts_with_sync runs the blocking realm sync before reading"""
+        self.create_test_account()
+        self.mock_account_service.realm_id = "test_realm_id"
+
+        async def get_accounts(session):
+            service = AsyncAccountService(session, self.mock_account_service, self.mock_orchestrator)
+            return await service.get_accounts_with_sync(from_api=True)
+
+        accounts = self.run_with_async_session(get_accounts)
+
+        self.mock_account_service.sync.assert_called_once()
+        self.mock_orchestrator.sync_all.assert_not_called()
+        self.assertEqual(len(accounts), 1)
+
+    def test_get_accounts_with_sync_from_api_all_realms(self):
+        """Test get_accounts_with_sync syncs every realm when no realm is given"""
+        self.create_test_account(qbo_id="1", realm_id="realm_a")
+        self.create_test_account(qbo_id="1", realm_id="realm_b")
+
+        async def get_accounts(session):
+            service = AsyncAccountService(session, self.mock_account_service, self.mock_orchestrator)
+            return await service.get_accounts_with_sync(from_api=True)
+
+        accounts = self.run_with_async_session(get_accounts)
+
+        self.mock_orchestrator.sync_all.assert_called_once()
+        self.mock_account_service.sync.assert_not_called()
+        self.assertEqual(sorted(account.realm_id for account in accounts), ["realm_a", "realm_b"])
+
+    def test_get_accounts_scoped_to_realm(self):
+        """Test get_accounts only returns accounts of the service's realm"""
+        self.create_test_account(qbo_id="1", realm_id="realm_a")
+        self.create_test_account(qbo_id="1", realm_id="realm_b")
+        self.mock_account_service.realm_id = "realm_b"
+
+        async def get_accounts(session):
+            return await AsyncAccountService(session, self.mock_account_service, self.mock_orchestrator).get_accounts()
+
+        accounts = self.run_with_async_session(get_accounts)
+
+        self.assertEqual([account.realm_id for account in accounts], ["realm_b"])
+
+    def test_get_accounts_with_sync_no_sync(self):
+        """Test get_accounts_with_sync reads without syncing by default"""
+        self.create_test_account()
+
+        async def get_accounts(session):
+            return await AsyncAccountService(session, self.mock_account_service, self.mock_orchestrator).get_accounts_with_sync()
+
+        accounts = self.run_with_async_session(get_accounts)
+
+        self.mock_account_service.sync.assert_not_called()
+        self.assertEqual(len(accounts), 1)
+
+    def test_get_accounts_keyset_pages(self):
+        """Test get_accounts pages through accounts by id with limit and after"""
+        for qbo_id in ["1", "2", "3"]:
+            self.create_test_account(qbo_id=qbo_id, name=f"Test Account {qbo_id}")
+
+        async def get_pages(session):
+            service = AsyncAccountService(session, self.mock_account_service, self.mock_orchestrator)
+            first = await service.get_accounts(limit=2)
+            second = await service.get_accounts(after=first[-1].id, limit=2)
+            return first, second
+
+        first, second = self.run_with_async_session(get_pages)
+
+        self.assertEqual([account.qbo_id for account in first], ["1", "2"])
+        self.assertEqual([account.qbo_id for account in second], ["3"])
+
+    def get_accounts(self, **filters):
+        """Read accounts through the async service with the given filters"""
+        async def get_accounts(session):
+            return await AsyncAccountService(session, self.mock_account_service, self.mock_orchestrator).get_accounts(
+                **filters
+            )
+
+        return self.run_with_async_session(get_accounts)
+
+    def test_get_accounts_prefix_case_insensitive(self):
+        """Test get_accounts matches name prefixes regardless of case"""
+        self.create_test_account(qbo_id="1", name="Test Account 1")
+
+        accounts = self.get_accounts(name_prefix="tEST")
+
+        self.assertEqual([account.qbo_id for account in accounts], ["1"])
+
+    def test_get_accounts_prefix_escapes_wildcards(self):
+        """Test get_accounts treats LIKE wildcards in the prefix literally"""
+        self.create_test_account(qbo_id="1", name="50% Owned")
+        self.create_test_account(qbo_id="2", name="500 Owned")
+        self.create_test_account(qbo_id="3", name="A_B Account")
+        self.create_test_account(qbo_id="4", name="AXB Account")
+
+        self.assertEqual([account.qbo_id for account in self.get_accounts(name_prefix="50%")], ["1"])
+        self.assertEqual([account.qbo_id for account in self.get_accounts(name_prefix="a_b")], ["3"])
+
+    def test_get_accounts_substring(self):
+        """Test get_accounts with q matches names containing the substring"""
+        self.create_test_account(qbo_id="1", name="Business Checking")
+        self.create_test_account(qbo_id="2", name="Personal Savings")
+        self.create_test_account(qbo_id="3", name="Checking Fees")
+
+        accounts = self.get_accounts(q="check")
+
+        self.assertEqual(sorted(account.qbo_id for account in accounts), ["1", "3"])
+
+    def test_get_accounts_fuzzy(self):
+        """Test get_accounts with fuzzy q matches misspelled names, best match first"""
+        self.create_test_account(qbo_id="1", name="Accounts Receivable")
+        self.create_test_account(qbo_id="2", name="Accounts Payable")
+        self.create_test_account(qbo_id="3", name="Undeposited Funds")
+
+        accounts = self.get_accounts(q="Acounts Recievable", fuzzy=True)
+
+        self.assertEqual(accounts[0].qbo_id, "1")
+        self.assertNotIn("3", [account.qbo_id for account in accounts])
+
+    def test_get_accounts_after_with_fuzzy(self):
+        """Test get_accounts rejects an id cursor for similarity-ranked results"""
+        with self.assertRaises(HTTPException) as context:
+            self.get_accounts(q="acount", fuzzy=True, after=1)
+
+        self.assertEqual(context.exception.status_code, 400)
+
+    def test_get_accounts_reads_rows(self):
+        """Test get_accounts reads plain rows of the listing columns instead of ORM accounts"""
+        account = self.create_test_account(qbo_id="1", name="Test Account 1")
+
+        async def get_accounts(session):
+            return await AsyncAccountService(session, self.mock_account_service, self.mock_orchestrator).get_accounts()
+
+        rows = self.run_with_async_session(get_accounts)
+
+        self.assertEqual(list(rows[0]._fields), list(AccountSchema.model_fields))
+        self.assertEqual(
+            rows[0]._asdict(),
+            AccountSchema.model_validate(account).model_dump()
+        )
+
+    def test_stream_accounts(self):
+        """Test stream_accounts yields every matching account in id order"""
+        for qbo_id in ["1", "2", "3"]:
+            self.create_test_account(qbo_id=qbo_id, name=f"Test Account {qbo_id}")
+        self.create_test_account(qbo_id="4", name="Another Account")
+
+        async def stream(session):
+            service = AsyncAccountService(session, self.mock_account_service, self.mock_orchestrator)
+            return [account.qbo_id async for account in service.stream_accounts("test", after=1)]
+
+        self.assertEqual(self.run_with_async_session(stream), ["2", "3"])
+
+    def test_accounts_etag_follows_sync_version(self):
+        """Test the ETag changes only when the realm's sync version does"""
+        sync_log = self.create_sync_log()
+        self.mock_account_service.realm_id = "test_realm_id"
+
+        async def accounts_etag(session):
+            return await AsyncAccountService(session, self.mock_account_service, self.mock_orchestrator).accounts_etag()
+
+        first = self.run_with_async_session(accounts_etag)
+        self.assertEqual(self.run_with_async_session(accounts_etag), first)
+
+        sync_log.version += 1
+        self.db_session.commit()
+
+        self.assertNotEqual(self.run_with_async_session(accounts_etag), first)
+
+    def test_accounts_etag_scoped_to_realm(self):
+        """Test a sync of another realm leaves the realm's ETag alone"""
+        self.create_sync_log()
+        other_sync_log = self.create_sync_log(realm_id="other_realm_id")
+        self.mock_account_service.realm_id = "test_realm_id"
+
+        async def accounts_etag(session):
+            return await AsyncAccountService(session, self.mock_account_service, self.mock_orchestrator).accounts_etag()
+
+        first = self.run_with_async_session(accounts_etag)
+        other_sync_log.version += 1
+        self.db_session.commit()
+
+        self.assertEqual(self.run_with_async_session(accounts_etag), first)
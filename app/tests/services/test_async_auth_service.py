@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+from fastapi import HTTPException
+
+from services.auth import AsyncAuthService
+from models.auth import Token
+from config.settings import settings
+from tests.base import BaseTestCase
+
+
+class TestAsyncAuthService(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mock_async_http_client = MagicMock(spec=httpx.AsyncClient)
+        self.mock_async_http_client.post = AsyncMock()
+
+    def test_save_token_new_token(self):
+        """Test save_token when no token exists"""
+        async def save_token(session):
+            service = AsyncAuthService(session, self.mock_async_http_client)
+            return await service.save_token('access', 'refresh', 'realm', 3600)
+
+        token = self.run_with_async_session(save_token)
+
+        self.assertEqual(token.access_token, 'access')
+        db_token = self.db_session.query(Token).one()
+        self.assertEqual(db_token.refresh_token, 'refresh')
+        self.assertEqual(db_token.realm_id, 'realm')
+
+    def test_save_token_update_existing(self):
+        """Test save_token updates the existing token"""
+        self.db_session.add(Token(
+            access_token='old_access_token',
+            refresh_token='old_refresh_token',
+            realm_id='realm',
+            expires_at=datetime.utcnow() + timedelta(hours=1)
+        ))
+        self.db_session.commit()
+
+        async def save_token(session):
+            service = AsyncAuthService(session, self.mock_async_http_client)
+            return await service.save_token('access', 'refresh', 'realm', 3600)
+
+        self.run_with_async_session(save_token)
+
+        self.db_session.expire_all()
+        db_tokens = self.db_session.query(Token).all()
+        self.assertEqual(len(db_tokens), 1)
+        self.assertEqual(db_tokens[0].access_token, 'access')
+
+    def test_exchange_code(self):
+        """Test exchange_code trades the code for tokens and saves them"""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            'access_token': 'new_access_token',
+            'refresh_token': 'new_refresh_token',
+            'expires_in': 3600
+        }
+        self.mock_async_http_client.post.return_value = mock_response
+
+        async def exchange_code(session):
+            service = AsyncAuthService(session, self.mock_async_http_client)
+            return await service.exchange_code('auth_code', 'test_realm_id')
+
+        token = self.run_with_async_session(exchange_code)
+
+        # Verify API call
+        call = self.mock_async_http_client.post.call_args
+        self.assertEqual(call.args[0], settings.TOKEN_URL)
+        self.assertEqual(call.kwargs['data']['grant_type'], 'authorization_code')
+        self.assertEqual(call.kwargs['data']['code'], 'auth_code')
+        self.assertEqual(call.kwargs['auth'], (settings.CLIENT_ID, settings.CLIENT_SECRET))
+
+        # Verify token was saved
+        self.assertEqual(token.access_token, 'new_access_token')
+        self.assertEqual(self.db_session.query(Token).one().realm_id, 'test_realm_id')
+
+    def test_exchange_code_error(self):
+        """Test exchange_code with API error"""
+        mock_response = MagicMock()
+        mock_response.status_code = 400
+        mock_response.text = "invalid_grant"
+        self.mock_async_http_client.post.return_value = mock_response
+
+        async def exchange_code(session):
+            service = AsyncAuthService(session, self.mock_async_http_client)
+            return await service.exchange_code('auth_code', 'test_realm_id')
+
+        with self.assertRaises(HTTPException) as context:
+            self.run_with_async_session(exchange_code)
+
+        self.assertEqual(context.exception.status_code, 400)
+        self.assertIn("Failed to exchange authorization code", str(context.exception.detail))
+        self.assertIsNone(self.db_session.query(Token).first())
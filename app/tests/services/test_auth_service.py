@@ -1,8 +1,10 @@
+import threading
+import time
 from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock, PropertyMock
 from fastapi import HTTPException
 
-from services.auth import AuthService
+from services.auth import AuthService, token_cache
 from models.auth import Token
 from tests.base import BaseTestCase
 
@@ -10,7 +12,7 @@ from tests.base import BaseTestCase
 class TestAuthService(BaseTestCase):
     def setUp(self):
         super().setUp()
-        self.auth_service = AuthService(self.db_session)
+        self.auth_service = AuthService(self.db_session, self.mock_http_client)
         self.mock_token_data = {
             'access_token': 'test_access_token',
             'refresh_token': 'test_refresh_token',
@@ -66,7 +68,7 @@ class TestAuthService(BaseTestCase):
         existing_token = Token(
             access_token='old_access_token',
             refresh_token='old_refresh_token',
-            realm_id='old_realm_id',
+            realm_id=self.mock_token_data['realm_id'],
             expires_at=datetime.utcnow() + timedelta(hours=1)
         )
         self.db_session.add(existing_token)
@@ -95,7 +97,7 @@ class TestAuthService(BaseTestCase):
         """Test get_valid_token when no token exists"""
         # Verify exception is raised
         with self.assertRaises(HTTPException) as context:
-            self.auth_service.get_valid_token()
+            self.auth_service.get_valid_token('test_realm_id')
         
         self.assertEqual(context.exception.status_code, 401)
         self.assertIn("No token found", str(context.exception.detail))
@@ -114,14 +116,13 @@ class TestAuthService(BaseTestCase):
         self.db_session.commit()
         
         # Get the token
-        valid_token = self.auth_service.get_valid_token()
+        valid_token = self.auth_service.get_valid_token('test_realm_id')
         
         # Verify token was returned
         self.assertIsNotNone(valid_token)
         self.assertEqual(valid_token.access_token, self.mock_token_data['access_token'])
 
-    @patch('services.auth.requests.post')
-    def test_refresh_token(self, mock_post):
+    def test_refresh_token(self):
         """Test refresh_token method"""
         # Create an existing token
         expires_at = datetime.utcnow() - timedelta(minutes=10)  # Expired token
@@ -142,6 +143,7 @@ class TestAuthService(BaseTestCase):
             'refresh_token': 'new_refresh_token',
             'expires_in': 3600
         }
+        mock_post = self.mock_http_client.post
         mock_post.return_value = mock_response
         
         # Refresh the token
@@ -159,8 +161,7 @@ class TestAuthService(BaseTestCase):
         self.assertEqual(mock_post.call_args[1]['data']['grant_type'], 'refresh_token')
         self.assertEqual(mock_post.call_args[1]['data']['refresh_token'], 'old_refresh_token')
 
-    @patch('services.auth.requests.post')
-    def test_refresh_token_error(self, mock_post):
+    def test_refresh_token_error(self):
         """Test refresh_token method with API error"""
         # Create an existing token
         expires_at = datetime.utcnow() - timedelta(minutes=10)  # Expired token
@@ -177,6 +178,7 @@ class TestAuthService(BaseTestCase):
         mock_response = MagicMock()
         mock_response.status_code = 400
         mock_response.text = "Invalid refresh token"
+        mock_post = self.mock_http_client.post
         mock_post.return_value = mock_response
         
         # Verify exception is raised
@@ -209,7 +211,7 @@ class TestAuthService(BaseTestCase):
             )
             
             # Get the token
-            valid_token = self.auth_service.get_valid_token()
+            valid_token = self.auth_service.get_valid_token('test_realm_id')
             
             # Verify refresh_token was called
             mock_refresh.assert_called_once_with(token)
@@ -217,3 +219,94 @@ class TestAuthService(BaseTestCase):
             # Verify new token was returned
             self.assertIsNotNone(valid_token)
             self.assertEqual(valid_token.access_token, 'new_access_token')
+
+    def test_get_valid_token_served_from_cache(self):
+        """Test get_valid_token serves a cached token without querying the database"""
+        self.auth_service.save_token(
+            access_token=self.mock_token_data['access_token'],
+            refresh_token=self.mock_token_data['refresh_token'],
+            realm_id=self.mock_token_data['realm_id'],
+            expires_in=self.mock_token_data['expires_in']
+        )
+        self.assertIsNotNone(token_cache.get('test_realm_id'))
+
+        with patch.object(self.db_session, 'query') as mock_query:
+            valid_token = self.auth_service.get_valid_token('test_realm_id')
+
+        mock_query.assert_not_called()
+        self.assertEqual(valid_token.access_token, self.mock_token_data['access_token'])
+
+    def test_get_valid_token_populates_cache(self):
+        """Test get_valid_token caches the token loaded from the database"""
+        self.db_session.add(Token(
+            access_token=self.mock_token_data['access_token'],
+            refresh_token=self.mock_token_data['refresh_token'],
+            realm_id=self.mock_token_data['realm_id'],
+            expires_at=datetime.utcnow() + timedelta(hours=1)
+        ))
+        self.db_session.commit()
+
+        self.auth_service.get_valid_token('test_realm_id')
+
+        self.assertEqual(token_cache.get('test_realm_id').access_token, self.mock_token_data['access_token'])
+
+    def test_get_valid_token_single_refresh(self):
+        """Test concurrent callers with an expiring token trigger exactly one refresh"""
+        self.db_session.add(Token(
+            access_token='old_access_token',
+            refresh_token='old_refresh_token',
+            realm_id='test_realm_id',
+            expires_at=datetime.utcnow() - timedelta(minutes=10)
+        ))
+        self.db_session.commit()
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            'access_token': 'new_access_token',
+            'refresh_token': 'new_refresh_token',
+            'expires_in': 3600
+        }
+        def slow_post(*args, **kwargs):
+            time.sleep(0.1)
+            return mock_response
+        self.mock_http_client.post.side_effect = slow_post
+
+        results = []
+        def get_token():
+            db = self.SessionLocal()
+            try:
+                results.append(AuthService(db, self.mock_http_client).get_valid_token('test_realm_id').access_token)
+            finally:
+                db.close()
+
+        threads = [threading.Thread(target=get_token) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+
+        self.assertEqual(self.mock_http_client.post.call_count, 1)
+        self.assertEqual(results, ['new_access_token'] * 5)
+
+    def test_get_valid_token_reuses_refresh_from_other_process(self):
+        """Test a token refreshed by another process is picked up instead of refreshing again"""
+        # Another process refreshed the row after this process cached the old token
+        token_cache.set(Token(
+            access_token='old_access_token',
+            refresh_token='old_refresh_token',
+            realm_id='test_realm_id',
+            expires_at=datetime.utcnow() - timedelta(minutes=10)
+        ))
+        self.db_session.add(Token(
+            access_token='new_access_token',
+            refresh_token='new_refresh_token',
+            realm_id='test_realm_id',
+            expires_at=datetime.utcnow() + timedelta(hours=1)
+        ))
+        self.db_session.commit()
+
+        valid_token = self.auth_service.get_valid_token('test_realm_id')
+
+        self.mock_http_client.post.assert_not_called()
+        self.assertEqual(valid_token.access_token, 'new_access_token')
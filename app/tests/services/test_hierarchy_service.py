@@ -0,0 +1,134 @@
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from models.account import Account
+from services.hierarchy import AsyncHierarchyService, HierarchyService
+from tests.base import BaseTestCase
+
+
+class TestHierarchyService(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        # 1 Assets
+        # ├── 2 Bank
+        # │   └── 4 Checking
+        # └── 3 Receivables
+        # 5 Liabilities
+        self.accounts = {}
+        for qbo_id, name, parent_id, balance in [
+            ("1", "Assets", None, 0.0),
+            ("2", "Bank", "1", 100.0),
+            ("3", "Receivables", "1", 50.0),
+            ("4", "Checking", "2", 25.0),
+            ("5", "Liabilities", None, -10.0),
+        ]:
+            account = self.create_test_account(qbo_id=qbo_id, name=name)
+            account.parent_id = parent_id
+            account.current_balance = balance
+            self.accounts[qbo_id] = account
+        self.db_session.commit()
+        HierarchyService(self.db_session).rebuild_paths("test_realm_id")
+        self.db_session.commit()
+
+    def hierarchy(self, method, *args, realm_id="test_realm_id"):
+        """Run an AsyncHierarchyService method against the test database"""
+        async def run(session):
+            return await getattr(AsyncHierarchyService(session, realm_id), method)(*args)
+
+        return self.run_with_async_session(run)
+
+    def test_rebuild_paths(self):
+        """Test rebuild_paths stores the qbo_ids from the root down to each account"""
+        self.db_session.expire_all()
+        paths = {account.qbo_id: account.path for account in self.db_session.query(Account)}
+
+        self.assertEqual(paths, {"1": ["1"], "2": ["1", "2"], "3": ["1", "3"], "4": ["1", "2", "4"], "5": ["5"]})
+
+    def test_rebuild_paths_only_rewrites_moved_accounts(self):
+        """Test rebuild_paths leaves accounts whose path is unchanged alone"""
+        self.assertEqual(HierarchyService(self.db_session).rebuild_paths("test_realm_id"), 0)
+
+        self.accounts["2"].parent_id = "5"
+        self.db_session.commit()
+
+        # Bank and its child Checking moved under Liabilities
+        self.assertEqual(HierarchyService(self.db_session).rebuild_paths("test_realm_id"), 2)
+        self.db_session.expire_all()
+        self.assertEqual(self.db_session.query(Account).filter_by(qbo_id="4").one().path, ["5", "2", "4"])
+
+    def test_rebuild_paths_scoped_to_realm(self):
+        """Test rebuild_paths ignores accounts of other realms"""
+        self.create_test_account(qbo_id="1", realm_id="other_realm_id")
+
+        HierarchyService(self.db_session).rebuild_paths("test_realm_id")
+
+        self.db_session.expire_all()
+        self.assertIsNone(self.db_session.query(Account).filter_by(realm_id="other_realm_id").one().path)
+
+    def test_get_tree(self):
+        """Test get_tree nests accounts and rolls balances up to the roots"""
+        roots = self.hierarchy("get_tree")
+
+        self.assertEqual([root.qbo_id for root in roots], ["1", "5"])
+        assets = roots[0]
+        self.assertEqual(assets.total_balance, 175.0)
+        self.assertEqual([child.qbo_id for child in assets.children], ["2", "3"])
+        self.assertEqual(assets.children[0].total_balance, 125.0)
+        self.assertEqual(assets.children[0].children[0].name, "Checking")
+        self.assertEqual(roots[1].total_balance, -10.0)
+
+    def test_get_tree_excludes_deleted(self):
+        """Test deleted accounts and their balances are left out of the tree"""
+        self.accounts["3"].deleted_at = datetime.utcnow()
+        self.db_session.commit()
+
+        roots = self.hierarchy("get_tree")
+
+        self.assertEqual([child.qbo_id for child in roots[0].children], ["2"])
+        self.assertEqual(roots[0].total_balance, 125.0)
+
+    def test_get_subtree(self):
+        """Test get_subtree returns the account with its descendants nested below it"""
+        subtree = self.hierarchy("get_subtree", "2")
+
+        self.assertEqual(subtree.qbo_id, "2")
+        self.assertEqual(subtree.total_balance, 125.0)
+        self.assertEqual([child.qbo_id for child in subtree.children], ["4"])
+
+    def test_get_subtree_not_found(self):
+        """Test get_subtree raises 404 for unknown accounts"""
+        with self.assertRaises(HTTPException) as context:
+            self.hierarchy("get_subtree", "99")
+
+        self.assertEqual(context.exception.status_code, 404)
+
+    def test_get_subtree_requires_realm(self):
+        """Test get_subtree refuses to look up a qbo_id without a realm"""
+        with self.assertRaises(HTTPException) as context:
+            self.hierarchy("get_subtree", "2", realm_id=None)
+
+        self.assertEqual(context.exception.status_code, 400)
+
+    def test_get_ancestors(self):
+        """Test get_ancestors returns the lineage from the root down to the parent"""
+        self.assertEqual([account.qbo_id for account in self.hierarchy("get_ancestors", "4")], ["1", "2"])
+        self.assertEqual(self.hierarchy("get_ancestors", "1"), [])
+
+    def test_get_ancestors_not_found(self):
+        """Test get_ancestors raises 404 for unknown accounts"""
+        with self.assertRaises(HTTPException) as context:
+            self.hierarchy("get_ancestors", "99")
+
+        self.assertEqual(context.exception.status_code, 404)
+
+    def test_subtree_uses_path_index(self):
+        """Test subtree lookups can be answered from the path index"""
+        self.db_session.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = self.db_session.execute(text(
+            "EXPLAIN SELECT * FROM accounts WHERE path @> ARRAY['2']::varchar[]"
+        )).scalars().all()
+        self.db_session.rollback()
+
+        self.assertIn("ix_accounts_path", "\n".join(plan))
@@ -0,0 +1,115 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from fastapi import HTTPException
+
+from services.orchestrator import SyncOrchestrator
+from models.auth import Token
+from tests.base import BaseTestCase
+
+
+class TestSyncOrchestrator(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.orchestrator = SyncOrchestrator(self.SessionLocal, max_workers=2)
+        for realm_id in ("realm_a", "realm_b", "realm_c"):
+            self.db_session.add(Token(
+                access_token=f"{realm_id}_access_token",
+                refresh_token=f"{realm_id}_refresh_token",
+                realm_id=realm_id,
+                expires_at=datetime.utcnow() + timedelta(hours=1)
+            ))
+        self.db_session.commit()
+
+    def test_get_realm_ids(self):
+        """Test get_realm_ids lists every connected realm"""
+        self.assertEqual(self.orchestrator.get_realm_ids(), ["realm_a", "realm_b", "realm_c"])
+
+    @patch('services.orchestrator.AccountService.sync')
+    def test_sync_entity(self, mock_sync):
+        """Test sync_entity runs the sync for the given realm"""
+        mock_sync.return_value = True
+
+        self.assertTrue(self.orchestrator.sync_entity("realm_a", "account", wait=False))
+
+        mock_sync.assert_called_once_with(wait=False)
+
+    @patch('services.orchestrator.EntitySyncService.sync')
+    def test_sync_entity_uses_descriptor(self, mock_sync):
+        """Test entities without a dedicated service sync through the generic engine"""
+        mock_sync.return_value = True
+
+        self.assertTrue(self.orchestrator.sync_entity("realm_a", "invoice"))
+
+        self.assertEqual(mock_sync.call_count, 1)
+
+    @patch('services.orchestrator.AccountService.sync')
+    def test_sync_entity_skips_recent_sync(self, mock_sync):
+        """Test sync_entity skips an entity synced within max_age"""
+        self.create_sync_log(hours_ago=0.5, realm_id="realm_a")
+
+        self.assertFalse(self.orchestrator.sync_entity("realm_a", "account", max_age=timedelta(hours=1)))
+
+        mock_sync.assert_not_called()
+
+    @patch('services.orchestrator.AccountService.sync')
+    def test_sync_entity_isolates_errors(self, mock_sync):
+        """Test sync_entity reports failures as not synced instead of raising"""
+        for error in (HTTPException(401, "No token found"), RuntimeError("boom")):
+            mock_sync.side_effect = error
+            self.assertFalse(self.orchestrator.sync_entity("realm_a", "account"))
+
+    def test_sync_all(self):
+        """Test sync_all syncs every entity of every realm and keeps going when one fails"""
+        def sync_entity(realm_id, entity_type, max_age, wait):
+            return realm_id != "realm_b"
+
+        with patch.object(self.orchestrator, 'sync_entity', side_effect=sync_entity) as mock_sync_entity:
+            results = self.orchestrator.sync_all(
+                max_age=timedelta(minutes=30), wait=False, entity_types=["account", "customer"]
+            )
+
+        self.assertEqual(results, {
+            "realm_a": {"account": True, "customer": True},
+            "realm_b": {"account": False, "customer": False},
+            "realm_c": {"account": True, "customer": True}
+        })
+        mock_sync_entity.assert_any_call("realm_a", "customer", timedelta(minutes=30), False)
+
+    def test_sync_all_defaults_to_every_entity(self):
+        """Test sync_all covers every configured entity type"""
+        with patch.object(self.orchestrator, 'sync_entity', return_value=True):
+            results = self.orchestrator.sync_all()
+
+        self.assertEqual(list(results["realm_a"]), ["account", "customer", "vendor", "item", "invoice"])
+
+    def test_sync_all_runs_entities_in_parallel(self):
+        """Test sync_all overlaps entity syncs up to max_workers"""
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def sync_entity(realm_id, entity_type, max_age, wait):
+            with lock:
+                active.append((realm_id, entity_type))
+                peak.append(len(active))
+            time.sleep(0.1)
+            with lock:
+                active.remove((realm_id, entity_type))
+            return True
+
+        with patch.object(self.orchestrator, 'sync_entity', side_effect=sync_entity):
+            self.orchestrator.sync_all(entity_types=["account", "customer"])
+
+        self.assertEqual(max(peak), 2)
+
+    def test_sync_all_no_realms(self):
+        """Test sync_all does nothing when no realm is connected"""
+        self.db_session.query(Token).delete()
+        self.db_session.commit()
+
+        with patch.object(self.orchestrator, 'sync_entity') as mock_sync_entity:
+            self.assertEqual(self.orchestrator.sync_all(), {})
+
+        mock_sync_entity.assert_not_called()
@@ -0,0 +1,58 @@
+import asyncio
+from datetime import timedelta
+from unittest.mock import patch, MagicMock
+
+from services.scheduler import SyncScheduler
+from tests.base import BaseTestCase
+
+
+class TestSyncScheduler(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.session_factory = MagicMock(return_value=self.db_session)
+        self.scheduler = SyncScheduler(self.session_factory, interval=600, jitter=30)
+
+    def test_next_delay_within_jitter(self):
+        """Test _next_delay stays within interval ± jitter"""
+        for _ in range(100):
+            delay = self.scheduler._next_delay()
+            self.assertGreaterEqual(delay, 570)
+            self.assertLessEqual(delay, 630)
+
+    def test_next_delay_never_negative(self):
+        """Test _next_delay is clamped at zero when jitter exceeds the interval"""
+        scheduler = SyncScheduler(self.session_factory, interval=1, jitter=10)
+        for _ in range(100):
+            self.assertGreaterEqual(scheduler._next_delay(), 0)
+
+    def test_run_once_syncs_all_realms(self):
+        """Test run_once syncs every realm not synced within half an interval, without waiting"""
+        with patch.object(self.scheduler.orchestrator, 'sync_all') as mock_sync_all:
+            self.scheduler.run_once()
+
+        mock_sync_all.assert_called_once_with(max_age=timedelta(seconds=300), wait=False)
+
+    def test_run_once_swallows_errors(self):
+        """Test run_once logs failures instead of stopping the scheduler"""
+        with patch.object(self.scheduler.orchestrator, 'sync_all') as mock_sync_all:
+            mock_sync_all.side_effect = RuntimeError("database unavailable")
+            self.scheduler.run_once()
+
+        mock_sync_all.assert_called_once()
+
+    def test_start_and_stop(self):
+        """Test the scheduler loop runs on start and is cancelled on stop"""
+        scheduler = SyncScheduler(self.session_factory, interval=0, jitter=0)
+
+        async def run():
+            with patch.object(scheduler, 'run_once') as mock_run_once:
+                scheduler.start()
+                await asyncio.sleep(0.05)
+                await scheduler.stop()
+                return mock_run_once.call_count
+
+        call_count = asyncio.run(run())
+
+        self.assertGreaterEqual(call_count, 1)
+        self.assertIsNone(scheduler._task)
+
@@ -0,0 +1,257 @@
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from models.customer import Customer
+from models.invoice import Invoice
+from models.sync import SyncLog
+from services.entities import CUSTOMER, INVOICE, validate_customer, validate_invoice
+from services.sync_engine import EntitySyncService
+from utils.metrics import sync_phase_duration, sync_rows
+from tests.base import BaseTestCase
+
+
+class TestEntitySyncService(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.invoice_data = [
+            {
+                "Id": "130",
+                "DocNumber": "1037",
+                "CustomerRef": {"value": "24", "name": "Sonnenschein Family Store"},
+                "TxnDate": "2026-09-01",
+                "DueDate": "2026-10-01",
+                "CurrencyRef": {"value": "USD"},
+                "TotalAmt": 362.07,
+                "Balance": 362.07
+            },
+            {"Id": "131", "DocNumber": "1038", "TotalAmt": 100.0, "Balance": 0.0}
+        ]
+
+    def service(self, descriptor) -> EntitySyncService:
+        return EntitySyncService(
+            self.db_session, self.mock_auth_service, self.mock_http_client, "test_realm_id", descriptor
+        )
+
+    def mock_response(self, data):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = data
+        self.mock_http_client.request.return_value = mock_response
+
+    def test_validate_customer(self):
+        """Test validate_customer maps API data onto the customer schema"""
+        customer = validate_customer({
+            "Id": "1",
+            "DisplayName": "Amy's Bird Sanctuary",
+            "PrimaryEmailAddr": {"Address": "birds@intuit.com"},
+            "Balance": 239.0
+        })
+
+        self.assertEqual(customer.display_name, "Amy's Bird Sanctuary")
+        self.assertEqual(customer.primary_email, "birds@intuit.com")
+        self.assertTrue(customer.active)
+
+    def test_validate_invoice(self):
+        """Test validate_invoice maps references and dates"""
+        invoice = validate_invoice(self.invoice_data[0])
+
+        self.assertEqual(invoice.customer_id, "24")
+        self.assertEqual(invoice.txn_date, date(2026, 9, 1))
+        self.assertEqual(invoice.currency_ref, "USD")
+
+    def test_full_sync(self):
+        """Test a first sync loads every invoice and records it under its own entity type"""
+        self.mock_response({"QueryResponse": {"Invoice": self.invoice_data}})
+
+        self.assertTrue(self.service(INVOICE).sync())
+
+        query = self.mock_http_client.request.call_args.kwargs["content"]
+        self.assertTrue(query.startswith("SELECT * FROM Invoice ORDERBY Id"))
+        invoices = {invoice.qbo_id: invoice for invoice in self.db_session.query(Invoice)}
+        self.assertEqual(invoices["130"].due_date, date(2026, 10, 1))
+        self.assertEqual(invoices["131"].balance, 0.0)
+        sync_log = self.db_session.query(SyncLog).one()
+        self.assertEqual(sync_log.entity_type, "invoice")
+        self.assertEqual(sync_log.version, 1)
+
+    @patch('services.sync_engine.settings.FULL_SYNC_USE_COPY', False)
+    def test_sync_metrics(self):
+        """Test syncs record their rows and the time spent in each phase"""
+        self.mock_response({"QueryResponse": {"Invoice": self.invoice_data}})
+        fetched = sync_rows.value(entity="invoice", operation="fetched")
+        inserted = sync_rows.value(entity="invoice", operation="inserted")
+        phases = {
+            phase: sync_phase_duration.count(entity="invoice", phase=phase)
+            for phase in ("fetch", "validate", "diff", "write", "commit")
+        }
+
+        self.service(INVOICE).sync()
+
+        self.assertEqual(sync_rows.value(entity="invoice", operation="fetched"), fetched + 2)
+        self.assertEqual(sync_rows.value(entity="invoice", operation="inserted"), inserted + 2)
+        for phase, count in phases.items():
+            self.assertGreater(sync_phase_duration.count(entity="invoice", phase=phase), count, phase)
+
+    def test_cdc_sync(self):
+        """Test incremental syncs capture changes and deletions of the descriptor's entity"""
+        self.create_sync_log()
+        self.db_session.query(SyncLog).update({SyncLog.entity_type: "customer"})
+        self.db_session.add(Customer(realm_id="test_realm_id", qbo_id="2", display_name="Gone"))
+        self.db_session.commit()
+        self.mock_response({
+            "CDCResponse": [{"QueryResponse": [{"Customer": [
+                {"Id": "1", "DisplayName": "New Customer"},
+                {"Id": "2", "status": "Deleted"}
+            ]}]}],
+            "time": "2026-10-17T10:00:00.000-07:00"
+        })
+
+        self.service(CUSTOMER).sync()
+
+        self.assertEqual(self.mock_http_client.request.call_args.kwargs["params"]["entities"], "Customer")
+        self.db_session.expire_all()
+        customers = {customer.qbo_id: customer for customer in self.db_session.query(Customer)}
+        self.assertEqual(customers["1"].display_name, "New Customer")
+        self.assertIsNotNone(customers["2"].deleted_at)
+
+    def test_apply_changes_without_active_flag(self):
+        """Test entities without an Active flag are fetched by id without filtering on it"""
+        self.mock_response({"QueryResponse": {"Invoice": self.invoice_data[:1]}})
+
+        self.assertTrue(self.service(INVOICE).apply_changes(["130"]))
+
+        query = self.mock_http_client.request.call_args.kwargs["content"]
+        self.assertEqual(query, "SELECT * FROM Invoice WHERE Id IN ('130') MAXRESULTS 1")
+
+    def test_sync_logs_are_per_entity(self):
+        """Test syncing one entity leaves the other entities' sync state alone"""
+        self.create_sync_log()
+        self.mock_response({"QueryResponse": {"Invoice": []}})
+
+        self.assertIsNone(self.service(INVOICE).last_sync_time)
+        self.service(INVOICE).sync()
+
+        self.assertEqual(
+            sorted(entity_type for (entity_type,) in self.db_session.query(SyncLog.entity_type)),
+            ["account", "invoice"]
+        )
+
+    def invoice_pages(self):
+        """Two full pages and a short last page of invoices, each stamped with its update time"""
+        return [
+            [{"Id": str(qbo_id), "TotalAmt": 10.0, "MetaData": {"LastUpdatedTime": f"2026-10-0{qbo_id}T12:00:00-07:00"}}
+             for qbo_id in range(start, min(start + 2, 6))]
+            for start in (1, 3, 5)
+        ]
+
+    def interrupted_sync(self, service, before_resume=None):
+        """Run a sync that fails after its first page, then resume it, returning the start positions fetched"""
+        pages = self.invoice_pages()
+        positions = []
+
+        def fetch_page(last_sync_time, start_position, max_results):
+            positions.append(start_position)
+            if len(positions) == 2:
+                raise HTTPException(400, "Failed to fetch invoices")
+            return pages[(start_position - 1) // 2]
+
+        with patch.object(service, '_fetch_page', side_effect=fetch_page):
+            with self.assertRaises(HTTPException):
+                service.sync()
+            self.assertEqual(service.checkpoint["position"], 3)
+            self.assertEqual(service.checkpoint["watermark"], "2026-10-02T12:00:00-07:00")
+            if before_resume:
+                before_resume()
+            service.sync()
+        return positions
+
+    @patch('services.sync_engine.settings.QBO_PAGE_SIZE', 2)
+    @patch('services.sync_engine.settings.FULL_SYNC_USE_COPY', False)
+    def test_interrupted_paged_sync_resumes(self):
+        """Test a sync that failed mid-way keeps the pages it wrote and resumes after them"""
+        service = self.service(INVOICE)
+
+        positions = self.interrupted_sync(service)
+
+        self.assertEqual(positions, [1, 3, 3, 5])
+        self.assertEqual(sorted(qbo_id for (qbo_id,) in self.db_session.query(Invoice.qbo_id)), ["1", "2", "3", "4", "5"])
+        sync_log = self.db_session.query(SyncLog).one()
+        self.assertIsNone(sync_log.checkpoint)
+        self.assertEqual(sync_log.watermark, "2026-10-05T12:00:00-07:00")
+        # CDC picks up from when the interrupted sync started, not from the latest change
+        self.assertLess(datetime.now(timezone.utc) - datetime.fromisoformat(sync_log.cdc_cursor), timedelta(minutes=1))
+        # Rows written before the interruption still count as a change
+        self.assertEqual(sync_log.version, 1)
+
+    @patch('services.sync_engine.settings.QBO_PAGE_SIZE', 2)
+    def test_interrupted_full_sync_resumes_staging(self):
+        """Test a full sync resumes staging where it stopped and still flags rows missing upstream"""
+        self.db_session.add(Invoice(realm_id="test_realm_id", qbo_id="9"))
+        self.db_session.commit()
+        service = self.service(INVOICE)
+
+        positions = self.interrupted_sync(service)
+
+        self.assertEqual(positions, [1, 3, 3, 5])
+        self.db_session.expire_all()
+        invoices = {invoice.qbo_id: invoice for invoice in self.db_session.query(Invoice)}
+        self.assertEqual(sorted(invoices), ["1", "2", "3", "4", "5", "9"])
+        self.assertIsNotNone(invoices["9"].deleted_at)
+        self.assertIsNone(invoices["1"].deleted_at)
+        staged = self.db_session.execute(text("SELECT count(*) FROM invoices_staging WHERE realm_id = 'test_realm_id'"))
+        self.assertEqual(staged.scalar(), 0)
+
+    @patch('services.sync_engine.settings.QBO_PAGE_SIZE', 2)
+    def test_full_sync_restarts_when_staged_rows_are_lost(self):
+        """Test a resumed full sync restages from the first page when a crash emptied the unlogged staging table"""
+        service = self.service(INVOICE)
+
+        def crash():
+            self.db_session.execute(text("TRUNCATE invoices_staging"))
+            self.db_session.commit()
+
+        positions = self.interrupted_sync(service, before_resume=crash)
+
+        self.assertEqual(positions, [1, 3, 1, 3, 5])
+        self.db_session.expire_all()
+        invoices = {invoice.qbo_id: invoice for invoice in self.db_session.query(Invoice)}
+        self.assertEqual(sorted(invoices), ["1", "2", "3", "4", "5"])
+        self.assertTrue(all(invoice.deleted_at is None for invoice in invoices.values()))
+
+    def test_staging_table_follows_entity_columns(self):
+        """Test a staging table left with outdated columns is recreated before the next full sync"""
+        self.db_session.execute(text("DROP TABLE IF EXISTS invoices_staging"))
+        self.db_session.execute(text(
+            "CREATE UNLOGGED TABLE invoices_staging AS SELECT realm_id, qbo_id, content_hash FROM invoices WITH NO DATA"
+        ))
+        self.db_session.commit()
+        self.mock_response({"QueryResponse": {"Invoice": self.invoice_data}})
+
+        self.service(INVOICE).sync()
+
+        self.db_session.expire_all()
+        self.assertEqual(len(self.invoice_data), self.db_session.query(Invoice).count())
+        columns = self.db_session.execute(text(
+            "SELECT count(*) FROM information_schema.columns WHERE table_name = 'invoices_staging'"
+        )).scalar()
+        self.assertEqual(columns, len(INVOICE.columns) + 2)
+
+    @patch('services.sync_engine.settings.SYNC_USE_CDC', False)
+    def test_incremental_sync_starts_before_watermark(self):
+        """Test incremental queries start the overlap window before the latest change seen"""
+        self.create_sync_log()
+        self.db_session.query(SyncLog).update({
+            SyncLog.entity_type: "invoice", SyncLog.watermark: "2026-10-05T12:00:00-07:00"
+        })
+        self.db_session.commit()
+        self.mock_response({"QueryResponse": {}})
+
+        self.service(INVOICE).sync()
+
+        query = self.mock_http_client.request.call_args.kwargs["content"]
+        self.assertIn("Metadata.LastUpdatedTime >= '2026-10-05T11:55:00-07:00'", query)
+        # No changes seen, so the watermark stays where it was
+        self.assertEqual(self.db_session.query(SyncLog.watermark).scalar(), "2026-10-05T12:00:00-07:00")
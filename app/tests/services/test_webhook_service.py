@@ -0,0 +1,179 @@
+import base64
+import hashlib
+import hmac
+from unittest.mock import patch
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from models.webhook import PendingAccountChange
+from schemas.webhook import WebhookPayloadSchema
+from services.webhook import AsyncWebhookService, WebhookBatcher, verify_signature
+from tests.base import BaseTestCase
+
+
+def sign(body: bytes, verifier_token: str) -> str:
+    return base64.b64encode(hmac.new(verifier_token.encode(), body, hashlib.sha256).digest()).decode()
+
+
+def payload(*entities, realm_id="test_realm_id") -> WebhookPayloadSchema:
+    return WebhookPayloadSchema.model_validate({
+        "eventNotifications": [{
+            "realmId": realm_id,
+            "dataChangeEvent": {
+                "entities": [
+                    {"name": name, "id": qbo_id, "operation": operation, "lastUpdated": "2026-10-17T10:00:00.000Z"}
+                    for name, qbo_id, operation in entities
+                ]
+            }
+        }]
+    })
+
+
+class TestVerifySignature(BaseTestCase):
+    def test_valid_signature(self):
+        """Test a body signed with the verifier token is accepted"""
+        body = b'{"eventNotifications": []}'
+        self.assertTrue(verify_signature(body, sign(body, "verifier"), "verifier"))
+
+    def test_invalid_signature(self):
+        """Test tampered bodies, other keys and missing signatures are rejected"""
+        body = b'{"eventNotifications": []}'
+        self.assertFalse(verify_signature(body + b" ", sign(body, "verifier"), "verifier"))
+        self.assertFalse(verify_signature(body, sign(body, "other"), "verifier"))
+        self.assertFalse(verify_signature(body, None, "verifier"))
+
+    def test_no_verifier_token(self):
+        """Test nothing is accepted until a verifier token is configured"""
+        body = b'{"eventNotifications": []}'
+        self.assertFalse(verify_signature(body, sign(body, ""), ""))
+
+
+class TestAsyncWebhookService(BaseTestCase):
+    def enqueue(self, webhook_payload: WebhookPayloadSchema) -> int:
+        async def run(session):
+            return await AsyncWebhookService(session).enqueue(webhook_payload)
+
+        return self.run_with_async_session(run)
+
+    def pending(self):
+        return sorted(
+            (change.realm_id, change.qbo_id, change.operation)
+            for change in self.db_session.query(PendingAccountChange)
+        )
+
+    def test_enqueue(self):
+        """Test changed accounts are queued once each, ignoring other entities"""
+        queued = self.enqueue(payload(
+            ("Account", "1", "Create"), ("Customer", "7", "Update"), ("Account", "1", "Update"), ("Account", "2", "Delete")
+        ))
+
+        self.assertEqual(queued, 2)
+        self.assertEqual(self.pending(), [("test_realm_id", "1", "Update"), ("test_realm_id", "2", "Delete")])
+
+    def test_enqueue_coalesces_with_queued(self):
+        """Test a change to an account that is already queued updates the queued row"""
+        self.enqueue(payload(("Account", "1", "Create")))
+        self.enqueue(payload(("Account", "1", "Update")))
+
+        self.assertEqual(self.pending(), [("test_realm_id", "1", "Update")])
+
+    def test_enqueue_resets_attempts(self):
+        """Test a new change to an account set aside after failing gets a fresh set of attempts"""
+        self.db_session.add(PendingAccountChange(realm_id="test_realm_id", qbo_id="1", operation="Update", attempts=5))
+        self.db_session.commit()
+
+        self.enqueue(payload(("Account", "1", "Update")))
+
+        self.db_session.expire_all()
+        self.assertEqual(self.db_session.query(PendingAccountChange.attempts).scalar(), 0)
+
+    def test_enqueue_nothing(self):
+        """Test a payload without account changes queues nothing"""
+        self.assertEqual(self.enqueue(payload(("Invoice", "9", "Create"))), 0)
+        self.assertEqual(self.pending(), [])
+
+
+class TestWebhookBatcher(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.batcher = WebhookBatcher(self.SessionLocal, batch_size=2)
+        for realm_id, qbo_id in [("realm_a", "1"), ("realm_a", "2"), ("realm_a", "3"), ("realm_b", "1")]:
+            self.db_session.add(PendingAccountChange(realm_id=realm_id, qbo_id=qbo_id, operation="Update"))
+        self.db_session.commit()
+
+    def pending(self):
+        self.db_session.expire_all()
+        return sorted((change.realm_id, change.qbo_id) for change in self.db_session.query(PendingAccountChange))
+
+    @patch('services.webhook.AccountService.apply_changes')
+    def test_apply_realm(self, mock_apply_changes):
+        """Test apply_realm applies one batch of the realm's changes and removes them from the queue"""
+        self.assertEqual(self.batcher.apply_realm("realm_a"), 2)
+
+        mock_apply_changes.assert_called_once_with(["1", "2"])
+        self.assertEqual(self.pending(), [("realm_a", "3"), ("realm_b", "1")])
+
+    @patch('services.webhook.AccountService.apply_changes')
+    def test_apply_realm_failure_requeues(self, mock_apply_changes):
+        """Test changes stay queued when fetching them fails"""
+        mock_apply_changes.side_effect = HTTPException(400, "Failed to fetch accounts")
+
+        self.assertEqual(self.batcher.apply_realm("realm_a"), 0)
+
+        self.assertEqual(len(self.pending()), 4)
+
+    @patch('services.webhook.AccountService.apply_changes')
+    def test_apply_realm_isolates_failing_change(self, mock_apply_changes):
+        """Test a failed batch is retried one change at a time, so one bad account only fails on its own"""
+        def apply_changes(qbo_ids):
+            if "2" in qbo_ids:
+                raise HTTPException(400, "Failed to fetch accounts")
+        mock_apply_changes.side_effect = apply_changes
+
+        self.assertEqual(self.batcher.apply_realm("realm_a"), 1)
+
+        self.assertEqual([call.args[0] for call in mock_apply_changes.call_args_list], [["1", "2"], ["1"], ["2"]])
+        self.assertEqual(self.pending(), [("realm_a", "2"), ("realm_a", "3"), ("realm_b", "1")])
+        attempts = self.db_session.query(PendingAccountChange.attempts).filter_by(realm_id="realm_a", qbo_id="2")
+        self.assertEqual(attempts.scalar(), 2)
+
+    @patch('services.webhook.logger')
+    @patch('services.webhook.AccountService.apply_changes')
+    def test_apply_realm_sets_aside_failing_changes(self, mock_apply_changes, mock_logger):
+        """Test changes that keep failing are set aside after max_attempts and no longer block the realm"""
+        batcher = WebhookBatcher(self.SessionLocal, batch_size=2, max_attempts=2)
+        mock_apply_changes.side_effect = HTTPException(400, "Failed to fetch accounts")
+
+        self.assertEqual(batcher.apply_realm("realm_a"), 0)
+
+        self.assertIn("Setting aside account changes 1 for realm realm_a", mock_logger.error.call_args_list[0].args[0])
+        self.assertIn("Setting aside account changes 2 for realm realm_a", mock_logger.error.call_args_list[1].args[0])
+
+        mock_apply_changes.reset_mock(side_effect=True)
+        self.assertEqual(batcher.apply_realm("realm_a"), 1)
+
+        mock_apply_changes.assert_called_once_with(["3"])
+        self.assertEqual(self.pending(), [("realm_a", "1"), ("realm_a", "2"), ("realm_b", "1")])
+        self.assertEqual(batcher.get_pending_realm_ids(), ["realm_b"])
+
+    @patch('services.webhook.AccountService.apply_changes')
+    def test_apply_realm_skips_when_syncing(self, mock_apply_changes):
+        """Test a realm whose sync is running is left for the next round"""
+        with self.engine.connect() as other_worker:
+            other_worker.execute(text("SELECT pg_advisory_lock(hashtext('sync:account:realm_a'))"))
+            try:
+                self.assertEqual(self.batcher.apply_realm("realm_a"), 0)
+            finally:
+                other_worker.execute(text("SELECT pg_advisory_unlock(hashtext('sync:account:realm_a'))"))
+
+        mock_apply_changes.assert_not_called()
+        self.assertEqual(len(self.pending()), 4)
+
+    @patch('services.webhook.AccountService.apply_changes')
+    def test_run_once(self, mock_apply_changes):
+        """Test run_once applies a batch for every realm with queued changes"""
+        self.assertEqual(self.batcher.run_once(), 3)
+
+        self.assertEqual(mock_apply_changes.call_count, 2)
+        self.assertEqual(self.pending(), [("realm_a", "3")])
@@ -0,0 +1,108 @@
+import asyncio
+
+from sqlalchemy import text
+
+from utils.cache import ACCOUNT_CACHE_CHANNEL, CachedResponse, CacheInvalidationListener, ResponseCache
+from tests.base import BaseTestCase
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestResponseCache(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clock = FakeClock()
+        self.cache = ResponseCache(max_bytes=10, ttl=60, clock=self.clock)
+
+    def response(self, body: bytes) -> CachedResponse:
+        return CachedResponse(body, {"ETag": 'W/"v1"'})
+
+    def test_get_and_set(self):
+        """Test a stored response is served and counted as a hit"""
+        self.assertIsNone(self.cache.get(("realm_a", "x")))
+        self.cache.set(("realm_a", "x"), self.response(b"abc"), self.cache.generation)
+
+        self.assertEqual(self.cache.get(("realm_a", "x")).body, b"abc")
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1, "evictions": 0, "entries": 1, "bytes": 3})
+
+    def test_expires_after_ttl(self):
+        """Test responses older than the TTL are dropped"""
+        self.cache.set(("realm_a", "x"), self.response(b"abc"), self.cache.generation)
+        self.clock.now = 61
+
+        self.assertIsNone(self.cache.get(("realm_a", "x")))
+        self.assertEqual(self.cache.stats()["bytes"], 0)
+
+    def test_evicts_least_recently_used_by_size(self):
+        """Test the least recently used responses go first once the byte budget is exceeded"""
+        self.cache.set(("realm_a", "1"), self.response(b"1111"), self.cache.generation)
+        self.cache.set(("realm_a", "2"), self.response(b"2222"), self.cache.generation)
+        self.cache.get(("realm_a", "1"))
+        self.cache.set(("realm_a", "3"), self.response(b"3333"), self.cache.generation)
+
+        self.assertIsNotNone(self.cache.get(("realm_a", "1")))
+        self.assertIsNone(self.cache.get(("realm_a", "2")))
+        self.assertIsNotNone(self.cache.get(("realm_a", "3")))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_skips_oversized_responses(self):
+        """Test a response larger than the whole budget is not cached"""
+        self.cache.set(("realm_a", "x"), self.response(b"x" * 11), self.cache.generation)
+
+        self.assertIsNone(self.cache.get(("realm_a", "x")))
+
+    def test_invalidate_realm(self):
+        """Test invalidating a realm drops its responses and those spanning every realm"""
+        for realm_id in ["realm_a", "realm_b", None]:
+            self.cache.set((realm_id, "x"), self.response(b"ab"), self.cache.generation)
+
+        self.cache.invalidate("realm_a")
+
+        self.assertIsNone(self.cache.get(("realm_a", "x")))
+        self.assertIsNone(self.cache.get((None, "x")))
+        self.assertIsNotNone(self.cache.get(("realm_b", "x")))
+
+    def test_set_after_invalidate_is_ignored(self):
+        """Test a response read before an invalidation is not stored after it"""
+        generation = self.cache.generation
+        self.cache.invalidate("realm_a")
+        self.cache.set(("realm_a", "x"), self.response(b"stale"), generation)
+
+        self.assertIsNone(self.cache.get(("realm_a", "x")))
+
+
+class TestCacheInvalidationListener(BaseTestCase):
+    def test_invalidates_on_notify(self):
+        """Test a NOTIFY from another connection invalidates the named realm"""
+        cache = ResponseCache()
+
+        async def listen():
+            listener = CacheInvalidationListener(self.settings.TEST_DB_URL, cache)
+            listener.start()
+            try:
+                # Wait until LISTEN has taken effect, which invalidates everything once
+                while cache.generation == 0:
+                    await asyncio.sleep(0.01)
+                cache.set(("realm_a", "x"), CachedResponse(b"abc", {}), cache.generation)
+                cache.set(("realm_b", "x"), CachedResponse(b"abc", {}), cache.generation)
+
+                with self.engine.connect() as connection:
+                    connection.execute(text("SELECT pg_notify(:channel, 'realm_a')"), {"channel": ACCOUNT_CACHE_CHANNEL})
+                    connection.commit()
+                for _ in range(500):
+                    if cache.stats()["entries"] == 1:
+                        break
+                    await asyncio.sleep(0.01)
+            finally:
+                await listener.stop()
+
+        asyncio.run(listen())
+
+        self.assertIsNone(cache.get(("realm_a", "x")))
+        self.assertIsNotNone(cache.get(("realm_b", "x")))
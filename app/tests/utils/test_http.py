@@ -0,0 +1,30 @@
+import unittest
+
+from config.settings import settings
+from utils.http import create_http_client, get_http_client, close_http_client
+
+
+class TestHttpClient(unittest.TestCase):
+    def tearDown(self):
+        close_http_client()
+
+    def test_create_http_client_uses_settings(self):
+        """Test create_http_client applies the configured timeouts"""
+        client = create_http_client()
+        try:
+            self.assertEqual(client.timeout.read, settings.HTTP_TIMEOUT_SECONDS)
+            self.assertEqual(client.timeout.connect, settings.HTTP_CONNECT_TIMEOUT_SECONDS)
+        finally:
+            client.close()
+
+    def test_get_http_client_is_shared(self):
+        """Test get_http_client returns the same client on every call"""
+        self.assertIs(get_http_client(), get_http_client())
+
+    def test_close_http_client(self):
+        """Test close_http_client closes the shared client and a new one is created afterwards"""
+        client = get_http_client()
+        close_http_client()
+
+        self.assertTrue(client.is_closed)
+        self.assertIsNot(get_http_client(), client)
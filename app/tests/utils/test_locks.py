@@ -0,0 +1,77 @@
+import threading
+
+from sqlalchemy import text
+
+from utils.locks import single_flight
+from tests.base import BaseTestCase
+
+
+class TestSingleFlight(BaseTestCase):
+    def test_acquire_and_release(self):
+        """Test single_flight acquires the lock and releases it on exit"""
+        with single_flight(self.engine, 'test:lock') as acquired:
+            self.assertTrue(acquired)
+
+        with single_flight(self.engine, 'test:lock', blocking=False) as acquired:
+            self.assertTrue(acquired)
+
+    def test_non_blocking_in_same_process(self):
+        """Test a second holder in the same process is turned away without waiting"""
+        with single_flight(self.engine, 'test:lock'):
+            results = []
+            def try_lock():
+                with single_flight(self.engine, 'test:lock', blocking=False) as acquired:
+                    results.append(acquired)
+
+            thread = threading.Thread(target=try_lock)
+            thread.start()
+            thread.join(timeout=5)
+
+        self.assertEqual(results, [False])
+
+    def test_non_blocking_across_processes(self):
+        """Test the advisory lock turns away holders from other database sessions"""
+        with self.engine.connect() as other_process:
+            other_process.execute(text("SELECT pg_advisory_lock(hashtext('test:lock'))"))
+            try:
+                with single_flight(self.engine, 'test:lock', blocking=False) as acquired:
+                    self.assertFalse(acquired)
+            finally:
+                other_process.execute(text("SELECT pg_advisory_unlock(hashtext('test:lock'))"))
+
+        # The local lock is released even when the advisory lock was not acquired
+        with single_flight(self.engine, 'test:lock', blocking=False) as acquired:
+            self.assertTrue(acquired)
+
+    def test_blocking_waits_for_holder(self):
+        """Test a blocking caller waits until the current holder releases the lock"""
+        events = []
+        holder_ready = threading.Event()
+        release_holder = threading.Event()
+
+        def hold_lock():
+            with single_flight(self.engine, 'test:lock'):
+                holder_ready.set()
+                release_holder.wait(timeout=5)
+                events.append('holder done')
+
+        def wait_for_lock():
+            with single_flight(self.engine, 'test:lock') as acquired:
+                events.append(f'waiter acquired {acquired}')
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        holder_ready.wait(timeout=5)
+        waiter = threading.Thread(target=wait_for_lock)
+        waiter.start()
+        release_holder.set()
+        holder.join(timeout=5)
+        waiter.join(timeout=5)
+
+        self.assertEqual(events, ['holder done', 'waiter acquired True'])
+
+    def test_keys_are_independent(self):
+        """Test different keys do not block each other"""
+        with single_flight(self.engine, 'test:lock'):
+            with single_flight(self.engine, 'test:other', blocking=False) as acquired:
+                self.assertTrue(acquired)
@@ -0,0 +1,109 @@
+from unittest.mock import patch
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+
+from models.auth import Token
+from services.auth import AuthService
+from utils.metrics import (
+    Counter, Histogram, Metric, MetricsRegistry, TimedQueuePool, db_pool_checkout_wait, http_request_duration, token_refreshes
+)
+from tests.base import BaseTestCase
+
+
+class TestMetrics(BaseTestCase):
+    def test_counter_render(self):
+        """Test counters render one sample per label values, with escaped values"""
+        counter = Counter("rows_total", "Rows seen", ("entity",))
+        counter.inc(2, entity="account")
+        counter.inc(entity='say "hi"\n')
+
+        self.assertEqual(counter.render(), "\n".join([
+            "# HELP rows_total Rows seen",
+            "# TYPE rows_total counter",
+            'rows_total{entity="account"} 2.0',
+            'rows_total{entity="say \\"hi\\"\\n"} 1.0',
+        ]))
+
+    def test_counter_rejects_bad_labels(self):
+        """Test samples must carry exactly the declared labels"""
+        counter = Counter("rows_total", "Rows seen", ("entity",))
+
+        with self.assertRaises(ValueError):
+            counter.inc(phase="fetch")
+        with self.assertRaises(ValueError):
+            counter.inc(-1, entity="account")
+
+    def test_metric_requires_samples(self):
+        """Test metric types must define how they render their samples"""
+        with self.assertRaises(TypeError):
+            Metric("rows_total", "Rows seen")
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histograms render cumulative buckets ending in +Inf, with the sum and count"""
+        histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.render().splitlines()[2:], [
+            'latency_seconds_bucket{le="0.1"} 2',
+            'latency_seconds_bucket{le="1.0"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            "latency_seconds_sum 3.65",
+            "latency_seconds_count 4",
+        ])
+
+    def test_registry_refuses_duplicates(self):
+        """Test two metrics cannot share a name"""
+        registry = MetricsRegistry()
+        registry.counter("rows_total", "Rows seen")
+
+        with self.assertRaises(ValueError):
+            registry.histogram("rows_total", "Rows seen")
+
+    def test_metrics_endpoint(self):
+        """Test /metrics serves the Prometheus text format, with request latencies by route template"""
+        observed = http_request_duration.count(method="GET", route="/health", status="200")
+        self.client.get("/health")
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn("# TYPE sync_phase_duration_seconds histogram", response.text)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="/health",status="200"}', response.text)
+        self.assertEqual(http_request_duration.count(method="GET", route="/health", status="200"), observed + 1)
+
+    @patch('services.hierarchy.AsyncHierarchyService.get_ancestors')
+    def test_request_latency_uses_route_template(self, mock_get_ancestors):
+        """Test path parameters are left out of request labels"""
+        mock_get_ancestors.side_effect = HTTPException(404, "Account not found")
+        observed = http_request_duration.count(method="GET", route="/accounts/{qbo_id}/ancestors", status="404")
+
+        self.client.get("/accounts/42/ancestors?realm_id=test_realm_id")
+
+        self.assertEqual(
+            http_request_duration.count(method="GET", route="/accounts/{qbo_id}/ancestors", status="404"), observed + 1
+        )
+
+    def test_pool_checkout_wait(self):
+        """Test checkouts from the timed pool are observed"""
+        observed = db_pool_checkout_wait.count(pool="sync")
+        engine = create_engine(self.settings.TEST_DB_URL, poolclass=TimedQueuePool)
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        finally:
+            engine.dispose()
+
+        self.assertEqual(db_pool_checkout_wait.count(pool="sync"), observed + 1)
+
+    def test_token_refresh_counted(self):
+        """Test failed token refreshes are counted by outcome"""
+        failures = token_refreshes.value(outcome="failure")
+        self.mock_http_client.post.return_value.status_code = 400
+
+        with self.assertRaises(HTTPException):
+            AuthService(self.db_session, self.mock_http_client).refresh_token(Token(realm_id="test_realm_id"))
+
+        self.assertEqual(token_refreshes.value(outcome="failure"), failures + 1)
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from main import app
+from utils.profiling import Capture, ProfileStore, ProfilingMiddleware
+from tests.base import BaseTestCase
+
+
+@patch('utils.profiling.settings.PROFILING_TOKEN', "secret")
+class TestProfiling(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = ProfileStore(self.directory.name, max_files=2)
+
+    def tearDown(self):
+        self.directory.cleanup()
+        super().tearDown()
+
+    def test_capture_saves_profile(self):
+        """Test a captured block is stored and can be read back as a report"""
+        with self.store.capture("sync-account-test_realm_id") as capture:
+            sorted(range(1000))
+
+        self.assertIn("-sync-account-test_realm_id-", capture.profile_id)
+        self.assertEqual([profile["profile_id"] for profile in self.store.list()], [capture.profile_id])
+        self.assertIn("sorted", self.store.report(capture.profile_id))
+
+    def test_store_keeps_newest_profiles(self):
+        """Test the oldest profiles are dropped past max_files"""
+        captures = [Capture(f"profile-{number}") for number in range(3)]
+        for number, capture in enumerate(captures):
+            capture.profile_id = capture.profile_id.replace(capture.profile_id[:15], f"2026101{number}T000000")
+            self.store.save(capture)
+
+        self.assertEqual(
+            [profile["profile_id"] for profile in self.store.list()],
+            [captures[2].profile_id, captures[1].profile_id]
+        )
+
+    def test_store_rejects_malformed_ids(self):
+        """Test profile ids cannot reach outside the profile directory"""
+        open(os.path.join(self.directory.name, "notes.prof"), "w").close()
+
+        self.assertIsNone(self.store.path("../notes"))
+        self.assertIsNone(self.store.path("notes"))
+        self.assertIsNone(self.store.report("20261017T000000-missing-0000abcd"))
+
+    def test_middleware_profiles_requests_with_token(self):
+        """Test only requests carrying the profiling token are profiled, and get the profile id back"""
+        client = TestClient(ProfilingMiddleware(app, self.store))
+
+        plain = client.get("/health")
+        wrong = client.get("/health", headers={"X-Profile": "guess"})
+        profiled = client.get("/health", headers={"X-Profile": "secret"})
+
+        self.assertNotIn("X-Profile-Id", plain.headers)
+        self.assertNotIn("X-Profile-Id", wrong.headers)
+        self.assertEqual(profiled.status_code, 200)
+        self.assertEqual([profile["profile_id"] for profile in self.store.list()], [profiled.headers["X-Profile-Id"]])
+        self.assertIn("GET-health", profiled.headers["X-Profile-Id"])
+
+    def test_middleware_skips_requests_during_capture(self):
+        """Test requests run unprofiled while another profile is captured, and are profiled again after"""
+        client = TestClient(ProfilingMiddleware(app, self.store))
+
+        with self.store.capture("sync-account-test_realm_id"):
+            during = client.get("/health", headers={"X-Profile": "secret"})
+        after = client.get("/health", headers={"X-Profile": "secret"})
+
+        self.assertEqual(during.status_code, 200)
+        self.assertNotIn("X-Profile-Id", during.headers)
+        self.assertIn("X-Profile-Id", after.headers)
+
+    def test_middleware_saves_off_the_event_loop(self):
+        """Test profiles are written from a worker thread rather than the event loop thread"""
+        threads = {}
+        save = self.store.save
+
+        async def endpoint(scope, receive, send):
+            threads["loop"] = threading.get_ident()
+            await send({"type": "http.response.start", "status": 204, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        def record_save(capture):
+            threads["save"] = threading.get_ident()
+            save(capture)
+
+        with patch.object(self.store, 'save', side_effect=record_save):
+            TestClient(ProfilingMiddleware(endpoint, self.store)).get("/", headers={"X-Profile": "secret"})
+
+        self.assertNotEqual(threads["save"], threads["loop"])
+        self.assertEqual(len(self.store.list()), 1)
+
+    def test_middleware_not_installed_by_default(self):
+        """Test requests pass through no profiling middleware unless profiling is enabled"""
+        self.assertNotIn(ProfilingMiddleware, [middleware.cls for middleware in app.user_middleware])
@@ -0,0 +1,94 @@
+from unittest.mock import MagicMock, patch
+
+import httpx
+
+from utils.metrics import qbo_errors
+from utils.qbo import QboClient, RetryBudget, retry_after_seconds
+from utils.rate_limit import RealmRateLimiter
+from tests.base import BaseTestCase
+
+
+def response(status_code: int, headers=None, json=None) -> httpx.Response:
+    return httpx.Response(status_code, headers=headers, json=json, request=httpx.Request("GET", "https://qbo.test"))
+
+
+class TestQboClient(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sleeps = []
+        self.limiter = RealmRateLimiter(requests_per_minute=60000, burst=100)
+        self.client = QboClient(
+            self.mock_http_client, limiter=self.limiter, retry_budget=RetryBudget(3), sleep=self.sleeps.append
+        )
+
+    def test_returns_successful_response(self):
+        """Test a successful response is returned without retrying"""
+        self.mock_http_client.request.return_value = response(200)
+
+        self.assertEqual(self.client.request("realm_a", "GET", "https://qbo.test").status_code, 200)
+        self.assertEqual(self.sleeps, [])
+
+    def test_does_not_retry_client_errors(self):
+        """Test errors that retrying cannot fix are returned to the caller straight away"""
+        self.mock_http_client.request.return_value = response(400)
+
+        self.assertEqual(self.client.request("realm_a", "GET", "https://qbo.test").status_code, 400)
+        self.assertEqual(self.mock_http_client.request.call_count, 1)
+
+    def test_counts_errors_by_fault_code(self):
+        """Test failed responses are counted by status and QuickBooks fault code"""
+        errors = qbo_errors.value(status="401", code="3200")
+        self.mock_http_client.request.return_value = response(
+            401, json={"Fault": {"Error": [{"Message": "AuthenticationFailed", "code": "3200"}], "type": "AUTHENTICATION"}}
+        )
+
+        self.client.request("realm_a", "GET", "https://qbo.test")
+
+        self.assertEqual(qbo_errors.value(status="401", code="3200"), errors + 1)
+
+    @patch('utils.qbo.random.uniform', return_value=0.25)
+    def test_honours_retry_after(self, mock_uniform):
+        """Test a throttled request waits as long as Retry-After asks and holds back the realm"""
+        self.mock_http_client.request.side_effect = [response(429, {"Retry-After": "7"}), response(200)]
+
+        with patch.object(self.limiter, 'throttle') as mock_throttle:
+            result = self.client.request("realm_a", "GET", "https://qbo.test")
+
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(self.sleeps, [7.25])
+        mock_throttle.assert_called_once_with("realm_a", 7.25)
+
+    @patch('utils.qbo.random.uniform', side_effect=lambda low, high: high)
+    @patch('utils.qbo.settings.QBO_RETRY_MAX_DELAY_SECONDS', 3)
+    def test_backs_off_exponentially(self, mock_uniform):
+        """Test server errors are retried with exponentially growing, capped delays"""
+        self.mock_http_client.request.side_effect = [response(503), response(502), response(500), response(200)]
+
+        self.assertEqual(self.client.request("realm_a", "GET", "https://qbo.test").status_code, 200)
+        self.assertEqual(self.sleeps, [1, 2, 3])
+
+    def test_retry_budget_is_shared(self):
+        """Test retries stop once the client's budget is spent, across requests"""
+        self.mock_http_client.request.return_value = response(503)
+
+        self.assertEqual(self.client.request("realm_a", "GET", "https://qbo.test").status_code, 503)
+        self.assertEqual(self.mock_http_client.request.call_count, 4)
+        self.client.request("realm_a", "GET", "https://qbo.test")
+
+        self.assertEqual(self.mock_http_client.request.call_count, 5)
+
+    @patch('utils.qbo.settings.QBO_MAX_RETRIES', 1)
+    def test_raises_transport_errors_once_retries_run_out(self):
+        """Test connection failures are retried, then raised"""
+        self.mock_http_client.request.side_effect = httpx.ConnectError("connection refused")
+
+        with self.assertRaises(httpx.ConnectError):
+            self.client.request("realm_a", "GET", "https://qbo.test")
+
+        self.assertEqual(self.mock_http_client.request.call_count, 2)
+
+    def test_retry_after_http_date(self):
+        """Test Retry-After given as a date in the past means no wait"""
+        self.assertEqual(retry_after_seconds(response(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})), 0.0)
+        self.assertIsNone(retry_after_seconds(response(429, {"Retry-After": "soon"})))
+        self.assertIsNone(retry_after_seconds(response(503)))
@@ -0,0 +1,94 @@
+import threading
+import time
+
+from utils.rate_limit import RealmRateLimiter, TokenBucket
+from tests.base import BaseTestCase
+
+
+class FakeClock:
+    """Clock that only moves when sleep is called"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clock = FakeClock()
+        self.bucket = TokenBucket(rate=2, capacity=3, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_bursts_then_waits_for_refill(self):
+        """Test a full bucket serves a burst at once, then one token per 1/rate seconds"""
+        for _ in range(3):
+            self.bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [])
+
+        self.bucket.acquire()
+        self.bucket.acquire()
+
+        self.assertEqual(self.clock.sleeps, [0.5, 0.5])
+
+    def test_refill_is_capped_at_capacity(self):
+        """Test an idle bucket does not save up more than capacity"""
+        self.clock.now = 100
+        for _ in range(4):
+            self.bucket.acquire()
+
+        self.assertEqual(self.clock.sleeps, [0.5])
+
+    def test_pause(self):
+        """Test a paused bucket waits out the pause and restarts empty"""
+        self.bucket.pause(10)
+        self.bucket.acquire()
+
+        self.assertEqual(self.clock.sleeps, [10, 0.5])
+
+
+class TestRealmRateLimiter(BaseTestCase):
+    def test_caps_concurrent_requests_per_realm(self):
+        """Test no more than max_concurrent requests of one realm are in flight, while other realms are unaffected"""
+        limiter = RealmRateLimiter(requests_per_minute=6000, burst=10, max_concurrent=2)
+        active = {"realm_a": 0, "realm_b": 0}
+        peak = {"realm_a": 0, "realm_b": 0}
+        lock = threading.Lock()
+
+        def request(realm_id):
+            with limiter.acquire(realm_id):
+                with lock:
+                    active[realm_id] += 1
+                    peak[realm_id] = max(peak[realm_id], active[realm_id])
+                time.sleep(0.05)
+                with lock:
+                    active[realm_id] -= 1
+
+        threads = [threading.Thread(target=request, args=("realm_a",)) for _ in range(5)]
+        threads.append(threading.Thread(target=request, args=("realm_b",)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(peak, {"realm_a": 2, "realm_b": 1})
+
+    def test_throttle_only_holds_back_the_realm(self):
+        """Test a throttled realm waits while other realms keep their budget"""
+        clock = FakeClock()
+        limiter = RealmRateLimiter(requests_per_minute=60, burst=1, clock=clock, sleep=clock.sleep)
+
+        limiter.throttle("realm_a", 30)
+        with limiter.acquire("realm_b"):
+            pass
+        self.assertEqual(clock.sleeps, [])
+        with limiter.acquire("realm_a"):
+            pass
+
+        self.assertEqual(clock.sleeps, [30, 1])
@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+import asyncpg
+
+from config.settings import settings
+from utils.logger import logger
+
+ACCOUNT_CACHE_CHANNEL = "account_cache"
+
+
+class CachedResponse(NamedTuple):
+    """A serialized response body with the headers needed to replay it"""
+    body: bytes
+    headers: Dict[str, str]
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of serialized responses with a TTL and a byte budget.
+
+    Keys are tuples whose first element is the realm the response was read for, or None
+    for responses spanning every realm, so a sync only invalidates what it can affect.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = settings.ACCOUNT_CACHE_MAX_BYTES,
+        ttl: float = settings.ACCOUNT_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[Hashable, ...], Tuple[float, CachedResponse]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[CachedResponse]:
+        """Get a fresh cached response and mark it as recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Tuple[Hashable, ...], response: CachedResponse, generation: int):
+        """Store a response read at generation, unless an invalidation happened since"""
+        size = len(response.body)
+        with self._lock:
+            # A sync that committed while this response was being read makes it stale already
+            if generation != self.generation or size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self._clock() + self.ttl, response)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, realm_id: Optional[str] = None):
+        """Drop responses of realm_id, and those spanning every realm; drop everything without one"""
+        with self._lock:
+            self.generation += 1
+            for key in list(self._entries):
+                if realm_id is None or key[0] in (realm_id, None):
+                    self._remove(key)
+
+    def clear(self):
+        """Drop every response and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.generation += 1
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss and eviction counters with the current size"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._size
+            }
+
+    def _remove(self, key: Tuple[Hashable, ...]):
+        """Remove key; the caller holds the lock"""
+        _, response = self._entries.pop(key)
+        self._size -= len(response.body)
+
+
+account_cache = ResponseCache()
+
+
+class CacheInvalidationListener:
+    """Invalidate account_cache when any worker's sync commits, via Postgres LISTEN/NOTIFY"""
+
+    def __init__(self, dsn: str, cache: ResponseCache = account_cache, retry_delay: float = 5):
+        self.dsn = dsn
+        self.cache = cache
+        self.retry_delay = retry_delay
+        self._task: Optional[asyncio.Task] = None
+
+    def _on_notify(self, connection, pid, channel, payload):
+        """Invalidate the realm named in the notification"""
+        self.cache.invalidate(payload or None)
+
+    async def _listen_once(self):
+        """Listen on one connection until it is lost"""
+        connection = await asyncpg.connect(self.dsn)
+        lost = asyncio.Event()
+        connection.add_termination_listener(lambda _: lost.set())
+        try:
+            await connection.add_listener(ACCOUNT_CACHE_CHANNEL, self._on_notify)
+            # Notifications sent before LISTEN took effect were missed
+            self.cache.invalidate()
+            await lost.wait()
+        finally:
+            await connection.close()
+
+    async def _run(self):
+        """Keep listening, reconnecting after the connection drops"""
+        while True:
+            try:
+                await self._listen_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Account cache invalidation listener failed, reconnecting")
+            await asyncio.sleep(self.retry_delay)
+
+    def start(self):
+        """Start listening on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop listening and wait for the listener to finish"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+__all__ = ['ACCOUNT_CACHE_CHANNEL', 'CachedResponse', 'ResponseCache', 'account_cache', 'CacheInvalidationListener']
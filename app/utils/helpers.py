@@ -1,18 +1,61 @@
+from typing import Optional
+
+import httpx
 from fastapi import Depends
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from services.account import AccountService
-from services.auth import AuthService
-from database import get_db
+from services.account import AccountService, AsyncAccountService
+from services.auth import AuthService, AsyncAuthService
+from services.hierarchy import AsyncHierarchyService
+from services.orchestrator import SyncOrchestrator
+from services.webhook import AsyncWebhookService
+from database import get_db, get_async_db
+from utils.http import get_http_client, get_async_http_client
 
 
-def get_auth_service(db: Session = Depends(get_db)):
-    return AuthService(db)
+def get_auth_service(
+    db: Session = Depends(get_db),
+    http_client: httpx.Client = Depends(get_http_client)
+):
+    return AuthService(db, http_client)
 
 
 def get_account_service(
+    realm_id: Optional[str] = None,
     db: Session = Depends(get_db),
-    token_service: AuthService = Depends(get_auth_service)
+    token_service: AuthService = Depends(get_auth_service),
+    http_client: httpx.Client = Depends(get_http_client)
+):
+    return AccountService(db, token_service, http_client, realm_id)
+
+
+def get_sync_orchestrator():
+    return SyncOrchestrator()
+
+
+def get_async_auth_service(
+    db: AsyncSession = Depends(get_async_db),
+    http_client: httpx.AsyncClient = Depends(get_async_http_client)
 ):
-    return AccountService(db, token_service)
+    return AsyncAuthService(db, http_client)
+
+
+def get_async_account_service(
+    db: AsyncSession = Depends(get_async_db),
+    account_service: AccountService = Depends(get_account_service),
+    orchestrator: SyncOrchestrator = Depends(get_sync_orchestrator)
+):
+    return AsyncAccountService(db, account_service, orchestrator)
+
+
+def get_async_hierarchy_service(
+    realm_id: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    return AsyncHierarchyService(db, realm_id)
+
+
+def get_async_webhook_service(db: AsyncSession = Depends(get_async_db)):
+    return AsyncWebhookService(db)
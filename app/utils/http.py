@@ -0,0 +1,72 @@
+import threading
+from typing import Optional
+
+import httpx
+
+from config.settings import settings
+
+_http_client: Optional[httpx.Client] = None
+_http_client_lock = threading.Lock()
+_async_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _client_options() -> dict:
+    """Timeouts and pool limits shared by the sync and async clients"""
+    return {
+        "timeout": httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS),
+        "limits": httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS
+        )
+    }
+
+
+def create_http_client() -> httpx.Client:
+    """Create a pooled, keep-alive HTTP client for QuickBooks and OAuth calls"""
+    return httpx.Client(**_client_options())
+
+
+def create_async_http_client() -> httpx.AsyncClient:
+    """Create a pooled, keep-alive HTTP client for calls made from the event loop"""
+    return httpx.AsyncClient(**_client_options())
+
+
+def get_http_client() -> httpx.Client:
+    """Get the process-wide HTTP client, creating it on first use"""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None or _http_client.is_closed:
+            _http_client = create_http_client()
+        return _http_client
+
+
+def close_http_client():
+    """Close the process-wide HTTP client and its pooled connections"""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Get the process-wide async HTTP client, creating it on first use"""
+    global _async_http_client
+    if _async_http_client is None or _async_http_client.is_closed:
+        _async_http_client = create_async_http_client()
+    return _async_http_client
+
+
+async def close_async_http_client():
+    """Close the process-wide async HTTP client and its pooled connections"""
+    global _async_http_client
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+        _async_http_client = None
+
+
+__all__ = [
+    'create_http_client', 'get_http_client', 'close_http_client',
+    'create_async_http_client', 'get_async_http_client', 'close_async_http_client'
+]
@@ -0,0 +1,55 @@
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+_local_locks: Dict[str, threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+
+
+def _get_local_lock(key: str) -> threading.Lock:
+    """Get the process-wide lock for key, creating it on first use"""
+    with _local_locks_guard:
+        return _local_locks.setdefault(key, threading.Lock())
+
+
+@contextmanager
+def single_flight(bind: Engine, key: str, blocking: bool = True) -> Iterator[bool]:
+    """Hold a process-local lock and a Postgres advisory lock for key.
+
+    Yields True once both locks are held. With blocking=False it yields False straight
+    away when another thread, worker or pod already holds the key.
+    """
+    local_lock = _get_local_lock(key)
+    if not local_lock.acquire(blocking=blocking):
+        yield False
+        return
+
+    try:
+        with bind.connect() as connection:
+            if blocking:
+                connection.execute(text("SELECT pg_advisory_lock(hashtext(:key))"), {"key": key})
+                acquired = True
+            else:
+                acquired = connection.execute(
+                    text("SELECT pg_try_advisory_lock(hashtext(:key))"), {"key": key}
+                ).scalar()
+            # Advisory locks are session-scoped, so commit instead of holding a transaction open
+            connection.commit()
+
+            if not acquired:
+                yield False
+                return
+
+            try:
+                yield True
+            finally:
+                connection.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {"key": key})
+                connection.commit()
+    finally:
+        local_lock.release()
+
+
+__all__ = ['single_flight']
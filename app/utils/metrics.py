@@ -0,0 +1,291 @@
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request latencies: milliseconds for cached reads up to seconds for forced syncs
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Sync phases range from hashing one page to fetching every page of a large realm
+SYNC_PHASE_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# An idle pooled connection is handed out in microseconds; anything slower is queueing or connecting
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the Prometheus text format"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    """Format label pairs as {name="value",...}, or nothing without labels"""
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value or bucket bound"""
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class Metric(ABC):
+    """A named metric whose samples are kept per combination of label values"""
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Label values in labelnames order, rejecting missing or unknown labels"""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _pairs(self, key: Tuple[str, ...]) -> List[Tuple[str, str]]:
+        return list(zip(self.labelnames, key))
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Sample lines in the Prometheus text format"""
+
+    def render(self) -> str:
+        """HELP and TYPE lines followed by the samples"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    """Monotonically increasing count, such as rows written or errors seen"""
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        """Add amount to the count of the given label values"""
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Current count of the given label values"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self._pairs(key))} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(Metric):
+    """Distribution of observed values over cumulative buckets, with their count and sum"""
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: observations per bucket (the last one past every bound), then the sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        """Record one observation for the given label values"""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe how long the block takes, including when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        """Number of observations of the given label values"""
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return sum(entry[0]) if entry else 0
+
+    def total(self, **labels: str) -> float:
+        """Sum of the observations of the given label values"""
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[1][0] if entry else 0.0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            pairs = self._pairs(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics of this process, rendered for Prometheus to scrape"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """Add a metric to the exposition, refusing a second metric of the same name"""
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() + "\n" for metric in metrics)
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Time to answer HTTP requests, until the last byte of the body is sent",
+    ("method", "route", "status")
+)
+sync_phase_duration = registry.histogram(
+    "sync_phase_duration_seconds",
+    "Time syncs spend per phase: fetch (QuickBooks requests), validate (schema mapping), "
+    "diff (content hashing and the staged merge), write (upserts and COPY) and commit",
+    ("entity", "phase"),
+    SYNC_PHASE_BUCKETS
+)
+sync_rows = registry.counter(
+    "sync_rows_total",
+    "Rows handled by syncs, by operation: fetched, inserted, updated, unchanged or deleted",
+    ("entity", "operation")
+)
+token_refreshes = registry.counter(
+    "qbo_token_refreshes_total",
+    "OAuth access token refreshes, by outcome",
+    ("outcome",)
+)
+qbo_errors = registry.counter(
+    "qbo_errors_total",
+    "Failed QuickBooks API responses, by HTTP status and QuickBooks fault code, including retried ones",
+    ("status", "code")
+)
+db_pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a database connection from the pool, including opening a new one",
+    ("pool",),
+    POOL_WAIT_BUCKETS
+)
+
+
+class _TimedCheckoutMixin:
+    """Observe how long each checkout waits for a connection"""
+    metrics_label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - start, pool=self.metrics_label)
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    """QueuePool that records checkout waits"""
+
+
+class TimedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records checkout waits"""
+    metrics_label = "async"
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing each HTTP request by method, route template and status"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            # Route templates keep path parameters such as qbo_ids out of the labels
+            route = getattr(scope.get("route"), "path", "unmatched")
+            http_request_duration.observe(
+                time.perf_counter() - start, method=scope["method"], route=route, status=str(status)
+            )
+
+        async def send_with_metrics(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            # Streamed bodies are timed until their last chunk is sent
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            record()
+
+
+__all__ = [
+    'PROMETHEUS_CONTENT_TYPE', 'Counter', 'Histogram', 'MetricsRegistry', 'registry',
+    'http_request_duration', 'sync_phase_duration', 'sync_rows', 'token_refreshes', 'qbo_errors',
+    'db_pool_checkout_wait', 'TimedQueuePool', 'TimedAsyncQueuePool', 'RequestMetricsMiddleware'
+]
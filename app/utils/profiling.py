@@ -0,0 +1,158 @@
+import asyncio
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import re
+import secrets
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from config.settings import settings
+from utils.logger import logger
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]{8}T[0-9]{6}-[A-Za-z0-9_.-]+-[0-9a-f]{8}$")
+
+# Only one profiler may be active per process; from Python 3.12 a second one raises ValueError
+_profiler_lock = threading.Lock()
+
+
+def token_matches(token: Optional[str]) -> bool:
+    """Check a profiling token against PROFILING_TOKEN; nothing matches while none is configured"""
+    return bool(settings.PROFILING_TOKEN and token) and hmac.compare_digest(token, settings.PROFILING_TOKEN)
+
+
+class Capture:
+    """A profile being captured, named before it is saved so the id can be handed out up front"""
+
+    def __init__(self, label: str):
+        label = re.sub(r"[^A-Za-z0-9_.]+", "-", label).strip("-")[:80] or "profile"
+        self.profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{label}-{secrets.token_hex(4)}"
+        self.profiler = cProfile.Profile()
+
+
+class ProfileStore:
+    """cProfile dumps kept on disk for download, pruned to the newest max_files"""
+
+    def __init__(self, directory: str = settings.PROFILE_DIR, max_files: int = settings.PROFILE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def path(self, profile_id: str) -> Optional[str]:
+        """Path of a stored profile, or None for unknown or malformed ids"""
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.prof")
+        return path if os.path.isfile(path) else None
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Stored profiles, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in os.listdir(self.directory):
+            profile_id, extension = os.path.splitext(name)
+            if extension == ".prof" and PROFILE_ID_PATTERN.match(profile_id):
+                stat = os.stat(os.path.join(self.directory, name))
+                profiles.append({
+                    "profile_id": profile_id,
+                    "size": stat.st_size,
+                    "created_at": datetime.utcfromtimestamp(stat.st_mtime)
+                })
+        return sorted(profiles, key=lambda profile: profile["profile_id"], reverse=True)
+
+    def save(self, capture: Capture):
+        """Write a finished capture to disk and drop the oldest profiles past max_files"""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            capture.profiler.dump_stats(os.path.join(self.directory, f"{capture.profile_id}.prof"))
+            for profile in self.list()[self.max_files:]:
+                os.remove(os.path.join(self.directory, f"{profile['profile_id']}.prof"))
+        logger.info(f"Saved profile {capture.profile_id}")
+
+    def report(self, profile_id: str, sort: str = "cumulative", limit: int = 50) -> Optional[str]:
+        """Render a stored profile as pstats text, its top limit functions by sort"""
+        path = self.path(profile_id)
+        if not path:
+            return None
+        output = io.StringIO()
+        pstats.Stats(path, stream=output).sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    @contextmanager
+    def capture(self, label: str) -> Iterator[Optional[Capture]]:
+        """Profile the block and save it, including when the block raises; yields None while another profile runs"""
+        if not _profiler_lock.acquire(blocking=False):
+            yield None
+            return
+        capture = Capture(label)
+        try:
+            capture.profiler.enable()
+            yield capture
+        finally:
+            capture.profiler.disable()
+            _profiler_lock.release()
+            self.save(capture)
+
+
+profile_store = ProfileStore()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that carry the profiling token in the X-Profile header.
+
+    Up to Python 3.11 the profiler follows the event loop thread, so it sees the request's async
+    work (and that of requests interleaved with it) but not work handed to the threadpool; from
+    3.12 it records every thread, the threadpool and other requests included. One profile is
+    captured at a time per process; requests carrying the token meanwhile run unprofiled. Only
+    installed while PROFILING_ENABLED is set.
+    """
+
+    def __init__(self, app, store: ProfileStore = profile_store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = next(
+            (value.decode("latin-1") for name, value in scope["headers"] if name == PROFILE_HEADER.lower().encode()),
+            None
+        )
+        if not token_matches(token) or not _profiler_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        capture = Capture(f"{scope['method']}-{scope['path']}")
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []), (PROFILE_ID_HEADER.lower().encode(), capture.profile_id.encode())
+                    ]
+                }
+            await send(message)
+
+        try:
+            capture.profiler.enable()
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            capture.profiler.disable()
+            _profiler_lock.release()
+            # Writing the dump and pruning old ones is file I/O, kept off the event loop
+            await asyncio.to_thread(self.store.save, capture)
+
+
+__all__ = [
+    'PROFILE_HEADER', 'PROFILE_ID_HEADER', 'token_matches', 'Capture', 'ProfileStore',
+    'profile_store', 'ProfilingMiddleware'
+]
@@ -0,0 +1,125 @@
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+import httpx
+
+from config.settings import settings
+from utils.logger import logger
+from utils.metrics import qbo_errors
+from utils.rate_limit import RealmRateLimiter, qbo_rate_limiter
+
+# Throttles and transient server errors; anything else is the caller's to handle
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RetryBudget:
+    """Retries one sync may spend across all of its requests, so a struggling API is not hammered"""
+
+    def __init__(self, retries: int = settings.QBO_SYNC_RETRY_BUDGET):
+        self.remaining = retries
+
+    def spend(self) -> bool:
+        """Take one retry, returning False once the budget is exhausted"""
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Seconds to wait from a Retry-After header given as seconds or an HTTP date"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def fault_code(response: httpx.Response) -> str:
+    """QuickBooks fault code of an error response, such as 3200 for rejected credentials, or "" without one"""
+    try:
+        return str(response.json()["Fault"]["Error"][0]["code"])
+    except (ValueError, KeyError, IndexError, TypeError):
+        return ""
+
+
+class QboClient:
+    """Send QuickBooks API requests within each realm's rate limits, retrying throttles and transient errors.
+
+    Retries back off exponentially with full jitter, or wait as long as Retry-After asks, and
+    draw from a retry budget shared by every request of the client. Create one client per sync.
+    """
+
+    def __init__(
+        self,
+        http_client: httpx.Client,
+        limiter: RealmRateLimiter = qbo_rate_limiter,
+        retry_budget: Optional[RetryBudget] = None,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.http_client = http_client
+        self.limiter = limiter
+        self.retry_budget = retry_budget or RetryBudget()
+        self._sleep = sleep
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Delay before retry number attempt + 1"""
+        retry_after = retry_after_seconds(response) if response is not None else None
+        if retry_after is not None:
+            # Spread the clients that were throttled together instead of retrying in lockstep
+            return retry_after + random.uniform(0, settings.QBO_RETRY_BASE_DELAY_SECONDS)
+        ceiling = min(settings.QBO_RETRY_MAX_DELAY_SECONDS, settings.QBO_RETRY_BASE_DELAY_SECONDS * 2 ** attempt)
+        return random.uniform(0, ceiling)
+
+    def request(self, realm_id: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request for realm_id, returning the last response once retries run out.
+
+        Transport errors are raised once they can no longer be retried.
+        """
+        attempt = 0
+        while True:
+            error = None
+            response = None
+            with self.limiter.acquire(realm_id):
+                try:
+                    response = self.http_client.request(method, url, **kwargs)
+                except httpx.TransportError as e:
+                    error = e
+            if error is not None:
+                qbo_errors.inc(status="transport", code=type(error).__name__)
+            elif response.status_code >= 400:
+                qbo_errors.inc(status=str(response.status_code), code=fault_code(response))
+            if response is not None and response.status_code not in RETRYABLE_STATUS_CODES:
+                return response
+
+            if attempt >= settings.QBO_MAX_RETRIES or not self.retry_budget.spend():
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self._backoff(attempt, response)
+            reason = f"HTTP {response.status_code}" if response is not None else type(error).__name__
+            if response is not None and response.status_code == 429:
+                # Everything else sent for the realm now would be throttled too
+                self.limiter.throttle(realm_id, delay)
+            logger.warning(
+                f"QuickBooks request for realm {realm_id} failed with {reason}, "
+                f"retrying in {delay:.1f}s (attempt {attempt + 1} of {settings.QBO_MAX_RETRIES})"
+            )
+            self._sleep(delay)
+            attempt += 1
+
+
+__all__ = ['RETRYABLE_STATUS_CODES', 'RetryBudget', 'retry_after_seconds', 'fault_code', 'QboClient']
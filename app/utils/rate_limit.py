@@ -0,0 +1,111 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Tuple
+
+from config.settings import settings
+
+
+class TokenBucket:
+    """Thread-safe token bucket: rate tokens per second, bursting up to capacity"""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._updated_at = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """Add the tokens earned since the last update; the caller holds the lock"""
+        if now > self._updated_at:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+    def _reserve(self) -> float:
+        """Take a token, or return how long to wait before one is available"""
+        with self._lock:
+            now = self._clock()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Take a token, waiting until one is available"""
+        while True:
+            delay = self._reserve()
+            if not delay:
+                return
+            self._sleep(delay)
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for seconds and start empty afterwards, as after a throttle"""
+        with self._lock:
+            now = self._clock()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0.0
+            self._updated_at = self._paused_until
+
+
+class RealmRateLimiter:
+    """Keep each realm's QuickBooks requests within its rate and concurrency limits.
+
+    Entities of a realm sync concurrently, but QuickBooks throttles requests per realm and
+    app, so every sync of a realm draws from the same budget. The budget is per process.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = settings.QBO_REQUESTS_PER_MINUTE,
+        burst: int = settings.QBO_REQUEST_BURST,
+        max_concurrent: int = settings.QBO_MAX_CONCURRENT_REQUESTS,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self._clock = clock
+        self._sleep = sleep
+        self._realms: Dict[str, Tuple[TokenBucket, threading.BoundedSemaphore]] = {}
+        self._lock = threading.Lock()
+
+    def _limits(self, realm_id: str) -> Tuple[TokenBucket, threading.BoundedSemaphore]:
+        with self._lock:
+            if realm_id not in self._realms:
+                self._realms[realm_id] = (
+                    TokenBucket(self.requests_per_minute / 60, self.burst, self._clock, self._sleep),
+                    threading.BoundedSemaphore(self.max_concurrent)
+                )
+            return self._realms[realm_id]
+
+    @contextmanager
+    def acquire(self, realm_id: str) -> Iterator[None]:
+        """Hold one of the realm's request slots once its rate allows another request"""
+        bucket, slots = self._limits(realm_id)
+        with slots:
+            bucket.acquire()
+            yield
+
+    def throttle(self, realm_id: str, seconds: float):
+        """Hold back every request of the realm for seconds after QuickBooks throttled one"""
+        self._limits(realm_id)[0].pause(seconds)
+
+
+qbo_rate_limiter = RealmRateLimiter()
+
+
+__all__ = ['TokenBucket', 'RealmRateLimiter', 'qbo_rate_limiter']
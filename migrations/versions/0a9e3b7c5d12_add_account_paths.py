@@ -0,0 +1,53 @@
+"""Add materialized hierarchy paths to accounts
+
+Revision ID: 0a9e3b7c5d12
+Revises: f2c8d06b7e51
+Create Date: 2026-10-17 16:10:31.884215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '0a9e3b7c5d12'
+down_revision: Union[str, None] = 'f2c8d06b7e51'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fresh databases get these tables from Base.metadata.create_all on startup
+    if not sa.inspect(op.get_bind()).has_table('accounts'):
+        return
+
+    op.add_column('accounts', sa.Column('path', postgresql.ARRAY(sa.String()), nullable=True))
+    op.create_index('ix_accounts_realm_id_parent_id', 'accounts', ['realm_id', 'parent_id'])
+    # Backfill every realm at once; later syncs keep the paths up to date
+    op.execute("""
+        WITH RECURSIVE tree (id, realm_id, qbo_id, path) AS (
+            SELECT id, realm_id, qbo_id, ARRAY[qbo_id]::varchar[]
+            FROM accounts
+            WHERE parent_id IS NULL
+            UNION ALL
+            SELECT child.id, child.realm_id, child.qbo_id, tree.path || child.qbo_id
+            FROM accounts child
+            JOIN tree ON child.realm_id = tree.realm_id AND child.parent_id = tree.qbo_id
+            WHERE child.qbo_id <> ALL(tree.path)
+        )
+        UPDATE accounts SET path = tree.path FROM tree WHERE accounts.id = tree.id
+    """)
+    op.create_index('ix_accounts_path', 'accounts', ['path'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('accounts'):
+        return
+
+    op.drop_index('ix_accounts_path', table_name='accounts')
+    op.drop_index('ix_accounts_realm_id_parent_id', table_name='accounts')
+    op.drop_column('accounts', 'path')
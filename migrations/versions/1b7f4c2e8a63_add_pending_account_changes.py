@@ -0,0 +1,43 @@
+"""Add pending_account_changes webhook queue
+
+Revision ID: 1b7f4c2e8a63
+Revises: 0a9e3b7c5d12
+Create Date: 2026-10-17 17:24:56.390118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '1b7f4c2e8a63'
+down_revision: Union[str, None] = '0a9e3b7c5d12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fresh databases get these tables from Base.metadata.create_all on startup
+    if not sa.inspect(op.get_bind()).has_table('accounts'):
+        return
+
+    op.create_table(
+        'pending_account_changes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('realm_id', sa.String(), nullable=False),
+        sa.Column('qbo_id', sa.String(), nullable=False),
+        sa.Column('operation', sa.String(), nullable=False),
+        sa.Column('received_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('realm_id', 'qbo_id', name='uq_pending_account_changes_realm_id_qbo_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('pending_account_changes'):
+        return
+
+    op.drop_table('pending_account_changes')
@@ -0,0 +1,34 @@
+"""Add cdc_cursor to sync_logs
+
+Revision ID: 2c5a9d17e4f8
+Revises: 1b7f4c2e8a63
+Create Date: 2026-10-17 18:05:41.302917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '2c5a9d17e4f8'
+down_revision: Union[str, None] = '1b7f4c2e8a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fresh databases get these tables from Base.metadata.create_all on startup
+    if not sa.inspect(op.get_bind()).has_table('sync_logs'):
+        return
+
+    op.add_column('sync_logs', sa.Column('cdc_cursor', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('sync_logs'):
+        return
+
+    op.drop_column('sync_logs', 'cdc_cursor')
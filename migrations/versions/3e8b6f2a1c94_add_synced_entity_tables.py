@@ -0,0 +1,88 @@
+"""Add customers, vendors, items and invoices
+
+Revision ID: 3e8b6f2a1c94
+Revises: 2c5a9d17e4f8
+Create Date: 2026-10-17 19:12:30.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '3e8b6f2a1c94'
+down_revision: Union[str, None] = '2c5a9d17e4f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('customers', 'vendors', 'items', 'invoices')
+
+
+def _entity_columns():
+    """Columns every synced entity table shares"""
+    return [
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('realm_id', sa.String(), nullable=False),
+        sa.Column('qbo_id', sa.String(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+        sa.Column('content_hash', sa.String(length=32), nullable=True),
+    ]
+
+
+def _create_entity_table(name, *columns):
+    """Create a synced entity table with the shared columns and its realm-scoped key"""
+    op.create_table(
+        name,
+        *_entity_columns(),
+        *columns,
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('realm_id', 'qbo_id', name=f'uq_{name}_realm_id_qbo_id')
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fresh databases get these tables from Base.metadata.create_all on startup
+    if not sa.inspect(op.get_bind()).has_table('accounts'):
+        return
+
+    for name in ('customers', 'vendors'):
+        _create_entity_table(
+            name,
+            sa.Column('display_name', sa.String(), nullable=False),
+            sa.Column('company_name', sa.String(), nullable=True),
+            sa.Column('primary_email', sa.String(), nullable=True),
+            sa.Column('currency_ref', sa.String(), nullable=True),
+            sa.Column('active', sa.Boolean(), nullable=True),
+            sa.Column('balance', sa.Float(), nullable=True)
+        )
+    _create_entity_table(
+        'items',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('item_type', sa.String(), nullable=True),
+        sa.Column('active', sa.Boolean(), nullable=True),
+        sa.Column('unit_price', sa.Float(), nullable=True),
+        sa.Column('purchase_cost', sa.Float(), nullable=True),
+        sa.Column('quantity_on_hand', sa.Float(), nullable=True),
+        sa.Column('income_account_id', sa.String(), nullable=True),
+        sa.Column('parent_id', sa.String(), nullable=True)
+    )
+    _create_entity_table(
+        'invoices',
+        sa.Column('doc_number', sa.String(), nullable=True),
+        sa.Column('customer_id', sa.String(), nullable=True),
+        sa.Column('txn_date', sa.Date(), nullable=True),
+        sa.Column('due_date', sa.Date(), nullable=True),
+        sa.Column('currency_ref', sa.String(), nullable=True),
+        sa.Column('total_amount', sa.Float(), nullable=True),
+        sa.Column('balance', sa.Float(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    for name in reversed(TABLES):
+        if inspector.has_table(name):
+            op.drop_table(name)
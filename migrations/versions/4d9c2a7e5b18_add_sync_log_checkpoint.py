@@ -0,0 +1,39 @@
+"""Add checkpoint to sync_logs and allow a null last_sync_at
+
+Revision ID: 4d9c2a7e5b18
+Revises: 3e8b6f2a1c94
+Create Date: 2026-10-17 21:42:16.518304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '4d9c2a7e5b18'
+down_revision: Union[str, None] = '3e8b6f2a1c94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fresh databases get these tables from Base.metadata.create_all on startup
+    if not sa.inspect(op.get_bind()).has_table('sync_logs'):
+        return
+
+    op.add_column('sync_logs', sa.Column('checkpoint', postgresql.JSONB(), nullable=True))
+    # A sync interrupted before it finished leaves its log without a completed sync time
+    op.alter_column('sync_logs', 'last_sync_at', existing_type=sa.DateTime(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('sync_logs'):
+        return
+
+    op.execute("UPDATE sync_logs SET last_sync_at = to_timestamp(0) WHERE last_sync_at IS NULL")
+    op.alter_column('sync_logs', 'last_sync_at', existing_type=sa.DateTime(), nullable=False)
+    op.drop_column('sync_logs', 'checkpoint')
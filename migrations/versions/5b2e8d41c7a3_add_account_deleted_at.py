@@ -0,0 +1,30 @@
+"""Add deleted_at to accounts
+
+Revision ID: 5b2e8d41c7a3
+Revises: 921446c4b9ec
+Create Date: 2026-10-17 09:12:40.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '5b2e8d41c7a3'
+down_revision: Union[str, None] = '921446c4b9ec'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fresh databases get the column from Base.metadata.create_all on startup
+    if not sa.inspect(op.get_bind()).has_table('accounts'):
+        return
+    op.add_column('accounts', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('accounts', 'deleted_at')
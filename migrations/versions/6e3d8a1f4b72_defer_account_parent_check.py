@@ -0,0 +1,35 @@
+"""Check account parents at commit
+
+Revision ID: 6e3d8a1f4b72
+Revises: 9b4e2d7f1a60
+Create Date: 2026-10-18 14:21:09.518304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '6e3d8a1f4b72'
+down_revision: Union[str, None] = '9b4e2d7f1a60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fresh databases get these tables from Base.metadata.create_all on startup
+    if not sa.inspect(op.get_bind()).has_table('accounts'):
+        return
+
+    # Databases that ran 8c4f1e2a9d57 before it created the constraint deferred
+    op.execute("ALTER TABLE accounts ALTER CONSTRAINT fk_accounts_parent DEFERRABLE INITIALLY DEFERRED")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('accounts'):
+        return
+
+    op.execute("ALTER TABLE accounts ALTER CONSTRAINT fk_accounts_parent NOT DEFERRABLE")
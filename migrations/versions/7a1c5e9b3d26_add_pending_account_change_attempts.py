@@ -0,0 +1,37 @@
+"""Count failed attempts to apply queued webhook changes
+
+Revision ID: 7a1c5e9b3d26
+Revises: 4d9c2a7e5b18
+Create Date: 2026-10-18 09:12:37.204581
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '7a1c5e9b3d26'
+down_revision: Union[str, None] = '4d9c2a7e5b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fresh databases get these tables from Base.metadata.create_all on startup
+    if not sa.inspect(op.get_bind()).has_table('pending_account_changes'):
+        return
+
+    op.add_column(
+        'pending_account_changes',
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('pending_account_changes'):
+        return
+
+    op.drop_column('pending_account_changes', 'attempts')
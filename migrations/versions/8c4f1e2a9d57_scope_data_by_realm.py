@@ -0,0 +1,67 @@
+"""Scope tokens, sync logs and accounts by realm
+
+Revision ID: 8c4f1e2a9d57
+Revises: 5b2e8d41c7a3
+Create Date: 2026-10-17 11:40:12.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '8c4f1e2a9d57'
+down_revision: Union[str, None] = '5b2e8d41c7a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Single-company installs only ever had one token, so its realm owns all existing rows
+EXISTING_REALM_ID = "(SELECT realm_id FROM tokens ORDER BY id LIMIT 1)"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fresh databases get these tables from Base.metadata.create_all on startup
+    if not sa.inspect(op.get_bind()).has_table('accounts'):
+        return
+
+    op.create_unique_constraint('tokens_realm_id_key', 'tokens', ['realm_id'])
+
+    op.add_column('sync_logs', sa.Column('realm_id', sa.String(), nullable=True))
+    op.execute(f"UPDATE sync_logs SET realm_id = {EXISTING_REALM_ID}")
+    op.execute("DELETE FROM sync_logs WHERE realm_id IS NULL")
+    op.alter_column('sync_logs', 'realm_id', nullable=False)
+    op.drop_constraint('sync_logs_entity_type_key', 'sync_logs', type_='unique')
+    op.create_unique_constraint(
+        'uq_sync_logs_realm_id_entity_type', 'sync_logs', ['realm_id', 'entity_type']
+    )
+
+    op.add_column('accounts', sa.Column('realm_id', sa.String(), nullable=True))
+    op.execute(f"UPDATE accounts SET realm_id = {EXISTING_REALM_ID}")
+    # Without a token there is no company to attribute accounts to; the first sync after connecting reloads them
+    op.execute("DELETE FROM accounts WHERE realm_id IS NULL")
+    op.alter_column('accounts', 'realm_id', nullable=False)
+    op.drop_constraint('accounts_parent_id_fkey', 'accounts', type_='foreignkey')
+    op.drop_constraint('accounts_qbo_id_key', 'accounts', type_='unique')
+    op.create_unique_constraint('uq_accounts_realm_id_qbo_id', 'accounts', ['realm_id', 'qbo_id'])
+    op.create_foreign_key(
+        'fk_accounts_parent', 'accounts', 'accounts',
+        ['realm_id', 'parent_id'], ['realm_id', 'qbo_id'],
+        deferrable=True, initially='DEFERRED'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('fk_accounts_parent', 'accounts', type_='foreignkey')
+    op.drop_constraint('uq_accounts_realm_id_qbo_id', 'accounts', type_='unique')
+    op.create_unique_constraint('accounts_qbo_id_key', 'accounts', ['qbo_id'])
+    op.create_foreign_key('accounts_parent_id_fkey', 'accounts', 'accounts', ['parent_id'], ['qbo_id'])
+    op.drop_column('accounts', 'realm_id')
+
+    op.drop_constraint('uq_sync_logs_realm_id_entity_type', 'sync_logs', type_='unique')
+    op.create_unique_constraint('sync_logs_entity_type_key', 'sync_logs', ['entity_type'])
+    op.drop_column('sync_logs', 'realm_id')
+
+    op.drop_constraint('tokens_realm_id_key', 'tokens', type_='unique')
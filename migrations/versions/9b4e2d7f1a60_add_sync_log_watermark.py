@@ -0,0 +1,36 @@
+"""Keep the LastUpdatedTime watermark apart from the CDC cursor
+
+Revision ID: 9b4e2d7f1a60
+Revises: 7a1c5e9b3d26
+Create Date: 2026-10-18 10:05:48.731920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '9b4e2d7f1a60'
+down_revision: Union[str, None] = '7a1c5e9b3d26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fresh databases get these tables from Base.metadata.create_all on startup
+    if not sa.inspect(op.get_bind()).has_table('sync_logs'):
+        return
+
+    op.add_column('sync_logs', sa.Column('watermark', sa.String(), nullable=True))
+    # Paged syncs stored their latest LastUpdatedTime as the CDC cursor; it stays a valid watermark
+    op.execute("UPDATE sync_logs SET watermark = cdc_cursor")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('sync_logs'):
+        return
+
+    op.drop_column('sync_logs', 'watermark')
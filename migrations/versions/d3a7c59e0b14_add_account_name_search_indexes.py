@@ -0,0 +1,45 @@
+"""Add account name search indexes
+
+Revision ID: d3a7c59e0b14
+Revises: 8c4f1e2a9d57
+Create Date: 2026-10-17 13:05:47.218904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'd3a7c59e0b14'
+down_revision: Union[str, None] = '8c4f1e2a9d57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fresh databases get these tables from Base.metadata.create_all on startup
+    if not sa.inspect(op.get_bind()).has_table('accounts'):
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Build without blocking syncs that are writing to accounts
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_accounts_name_lower_pattern "
+            "ON accounts (lower(name) text_pattern_ops)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_accounts_name_trgm "
+            "ON accounts USING gin (name gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('accounts'):
+        return
+
+    op.execute("DROP INDEX IF EXISTS ix_accounts_name_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_accounts_name_lower_pattern")
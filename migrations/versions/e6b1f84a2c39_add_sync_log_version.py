@@ -0,0 +1,34 @@
+"""Add version to sync_logs
+
+Revision ID: e6b1f84a2c39
+Revises: d3a7c59e0b14
+Create Date: 2026-10-17 14:22:09.671530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'e6b1f84a2c39'
+down_revision: Union[str, None] = 'd3a7c59e0b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fresh databases get these tables from Base.metadata.create_all on startup
+    if not sa.inspect(op.get_bind()).has_table('sync_logs'):
+        return
+
+    op.add_column('sync_logs', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('sync_logs'):
+        return
+
+    op.drop_column('sync_logs', 'version')
@@ -0,0 +1,35 @@
+"""Add content_hash to accounts
+
+Revision ID: f2c8d06b7e51
+Revises: e6b1f84a2c39
+Create Date: 2026-10-17 15:03:44.102937
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'f2c8d06b7e51'
+down_revision: Union[str, None] = 'e6b1f84a2c39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fresh databases get these tables from Base.metadata.create_all on startup
+    if not sa.inspect(op.get_bind()).has_table('accounts'):
+        return
+
+    # Existing rows have no hash yet, so the next sync rewrites them once
+    op.add_column('accounts', sa.Column('content_hash', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('accounts'):
+        return
+
+    op.drop_column('accounts', 'content_hash')